@@ -1,15 +1,117 @@
 """GoogleAds Authentication."""
 
+import threading
+from datetime import datetime, timezone
+from typing import Optional
+from weakref import WeakKeyDictionary
 
-from singer_sdk.authenticators import OAuthAuthenticator, SingletonMeta
+from singer_sdk.authenticators import OAuthAuthenticator
+from singer_sdk.streams import RESTStream
+from singer_sdk.tap_base import Tap
 
+# Tokens are refreshed this many seconds before they expire
+REFRESH_MARGIN_SECONDS = 5 * 60
 
-# The SingletonMeta metaclass makes your streams reuse the same authenticator instance.
-# If this behaviour interferes with your use-case, you can remove the metaclass.
-class GoogleAdsAuthenticator(OAuthAuthenticator, metaclass=SingletonMeta):
-    """Authenticator class for GoogleAds."""
+
+class GoogleAdsAuthenticator(OAuthAuthenticator):
+    """Authenticator class for GoogleAds.
+
+    Streams get the authenticator of their tap from `for_tap_of`, so
+    every stream and worker thread of a tap shares one access token.
+    Refreshes are serialised, and the token is refreshed in the background
+    before it expires, until `stop_refreshing` is called at the end of the
+    sync.
+    """
+
+    _instances: "WeakKeyDictionary[Tap, GoogleAdsAuthenticator]" = WeakKeyDictionary()
+    _instances_lock = threading.Lock()
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._refresh_lock = threading.Lock()
+        self._refresh_timer: Optional[threading.Timer] = None
+
+    @classmethod
+    def for_tap_of(
+        cls, stream: RESTStream, auth_endpoint: str
+    ) -> "GoogleAdsAuthenticator":
+        """Return the authenticator shared by the streams of the tap of `stream`.
+
+        The streams of a tap all have the same credentials. The authenticator
+        is forgotten along with the tap.
+        """
+        tap = stream._tap
+        with cls._instances_lock:
+            if tap not in cls._instances:
+                cls._instances[tap] = cls(stream=stream, auth_endpoint=auth_endpoint)
+            return cls._instances[tap]
 
     @property
     def oauth_request_body(self) -> dict:
         """Define the OAuth request body for the GoogleAds API."""
         return {}
+
+    @property
+    def refresh_margin(self) -> float:
+        """Seconds before expiry from which the token is no longer used."""
+        return min(REFRESH_MARGIN_SECONDS, int(self.expires_in or 0) / 4)
+
+    def is_token_valid(self) -> bool:
+        """Return whether the token is valid for at least `refresh_margin` seconds."""
+        if self.last_refreshed is None or not self.access_token:
+            return False
+        if not self.expires_in:
+            return True
+        age = (datetime.now(timezone.utc) - self.last_refreshed).total_seconds()
+        return age < int(self.expires_in) - self.refresh_margin
+
+    def update_access_token(self) -> None:
+        """Refresh the access token, unless another thread just did."""
+        with self._refresh_lock:
+            if not self.is_token_valid():
+                self._refresh()
+
+    def invalidate(self, access_token: Optional[str]) -> None:
+        """Drop `access_token`, e.g. after the API rejected it.
+
+        Nothing is dropped if another thread already refreshed it.
+        """
+        with self._refresh_lock:
+            if self.access_token == access_token:
+                self.access_token = None
+
+    def stop_refreshing(self) -> None:
+        """Stop refreshing the token in the background.
+
+        Requests still refresh it themselves, which schedules background
+        refreshes again.
+        """
+        with self._refresh_lock:
+            if self._refresh_timer is not None:
+                self._refresh_timer.cancel()
+                self._refresh_timer = None
+
+    def _refresh(self) -> None:
+        super().update_access_token()
+        if self.expires_in is not None:
+            self.expires_in = int(self.expires_in)
+            self._schedule_refresh()
+
+    def _schedule_refresh(self) -> None:
+        if self._refresh_timer is not None:
+            self._refresh_timer.cancel()
+        # Refresh while requests still use the current token
+        delay = self.expires_in - 2 * self.refresh_margin
+        self._refresh_timer = threading.Timer(delay, self._refresh_in_background)
+        self._refresh_timer.daemon = True
+        self._refresh_timer.start()
+
+    def _refresh_in_background(self) -> None:
+        try:
+            with self._refresh_lock:
+                # Unless stopped or rescheduled in the meantime
+                if self._refresh_timer is threading.current_thread():
+                    self._refresh()
+        except Exception as e:
+            # Requests refresh the token themselves once it is no longer valid
+            self.logger.warning("Background access token refresh failed: %s", e)
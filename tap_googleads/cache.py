@@ -0,0 +1,128 @@
+"""Local file caches shared across tap runs."""
+
+import hashlib
+import json
+import os
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Dict, Iterator, Optional
+from uuid import uuid4
+
+
+class JSONLinesCache:
+    """Records cached on disk as JSON lines.
+
+    The first line of the file is a header holding the cache version and the
+    time it was written. A cache is fresh while its version matches and it is
+    younger than its TTL.
+    """
+
+    def __init__(self, path: Path, version: str, ttl_seconds: float):
+        self.path = Path(path)
+        self.version = version
+        self.ttl_seconds = ttl_seconds
+
+    def _tmp_path(self) -> Path:
+        # Per process, as the shards of a sync share their cache_dir
+        return self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+
+    def _read_header(self) -> Optional[dict]:
+        try:
+            with self.path.open(encoding="utf-8") as cache_file:
+                return json.loads(cache_file.readline())
+        except (OSError, ValueError):
+            return None
+
+    def is_fresh(self) -> bool:
+        """Return whether the cache exists, has the right version and has not expired."""
+        header = self._read_header()
+        return bool(
+            header
+            and header.get("version") == self.version
+            and time.time() - header.get("written_at", 0) < self.ttl_seconds
+        )
+
+    def read(self) -> Iterator[dict]:
+        """Yield the cached records in the order they were written."""
+        with self.path.open(encoding="utf-8") as cache_file:
+            cache_file.readline()
+            for line in cache_file:
+                yield json.loads(line)
+
+    @contextmanager
+    def writer(self) -> Iterator[Callable[[dict], None]]:
+        """Open the cache for rewriting and yield a function writing one record.
+
+        Records go to a temporary file which only replaces the cache once the
+        block exits cleanly, so an interrupted sync never leaves a partial cache.
+        """
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self._tmp_path()
+        try:
+            with tmp_path.open("w", encoding="utf-8") as cache_file:
+                header = {"version": self.version, "written_at": time.time()}
+                cache_file.write(json.dumps(header) + "\n")
+                yield lambda record: cache_file.write(json.dumps(record) + "\n")
+            os.replace(tmp_path, self.path)
+        finally:
+            if tmp_path.exists():
+                tmp_path.unlink()
+
+    def remove(self, predicate: Callable[[dict], bool]) -> None:
+        """Rewrite the cache without the records matching `predicate`.
+
+        The header is kept, so removing records does not extend the TTL.
+        """
+        with self.path.open(encoding="utf-8") as cache_file:
+            header = cache_file.readline()
+            lines = [line for line in cache_file if not predicate(json.loads(line))]
+        tmp_path = self._tmp_path()
+        with tmp_path.open("w", encoding="utf-8") as cache_file:
+            cache_file.write(header)
+            cache_file.writelines(lines)
+        os.replace(tmp_path, self.path)
+
+
+def fingerprint(record: dict) -> str:
+    """Return a short hash of a record's values."""
+    serialized = json.dumps(record, sort_keys=True, default=str).encode("utf-8")
+    return hashlib.blake2b(serialized, digest_size=12).hexdigest()
+
+
+class FingerprintStore:
+    """The fingerprints of the records last emitted, keyed by primary key.
+
+    Each save is tagged with a generation, which the stream records in its
+    state. Fingerprints are only loaded for the generation found in the
+    incoming state, so that records whose state the target never committed,
+    or whose state was reset, are emitted again.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+
+    def load(self, generation: Optional[str]) -> Dict[str, str]:
+        """Return the fingerprints saved as `generation`, empty if there are none."""
+        if generation is None:
+            return {}
+        try:
+            with self.path.open(encoding="utf-8") as store_file:
+                store = json.load(store_file)
+        except (OSError, ValueError):
+            return {}
+        if not isinstance(store, dict) or store.get("generation") != generation:
+            return {}
+        return store["fingerprints"]
+
+    def save(self, fingerprints: Dict[str, str]) -> str:
+        """Replace the stored fingerprints and return their new generation."""
+        generation = uuid4().hex
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+        with tmp_path.open("w", encoding="utf-8") as store_file:
+            json.dump(
+                {"generation": generation, "fingerprints": fingerprints}, store_file
+            )
+        os.replace(tmp_path, self.path)
+        return generation
@@ -1,46 +1,230 @@
 """REST client handling, including GoogleAdsStream base class."""
 
+import itertools
+import queue
+import threading
+import time
+from datetime import date, datetime, timedelta, timezone
+from concurrent.futures import Executor, Future
+from functools import cached_property
 from urllib.parse import urlencode, urljoin
 from pathlib import Path
-from typing import Any, Dict, Optional, Union, List, Iterable
+from typing import (
+    Any,
+    Dict,
+    Optional,
+    Union,
+    List,
+    Iterable,
+    Iterator,
+    NamedTuple,
+    Set,
+    Tuple,
+)
 
-from memoization import cached
+import requests
 
+from singer_sdk.helpers._state import (
+    finalize_state_progress_markers,
+    get_state_if_exists,
+)
+from singer_sdk.helpers._batch import BaseBatchFileEncoding, BatchConfig
+from singer_sdk import metrics
 from singer_sdk.helpers.jsonpath import extract_jsonpath
 from singer_sdk.streams import RESTStream
-from singer_sdk.exceptions import FatalAPIError, RetriableAPIError
-from singer_sdk.pagination import JSONPathPaginator
+from singer_sdk.exceptions import (
+    ConfigValidationError,
+    FatalAPIError,
+    RetriableAPIError,
+)
+from singer_sdk.pagination import (
+    BaseAPIPaginator,
+    JSONPathPaginator,
+    SinglePagePaginator,
+)
 
 from tap_googleads.auth import GoogleAdsAuthenticator
-from tap_googleads.utils import replicate_pk_at_root
+from tap_googleads.cache import FingerprintStore, fingerprint
+from tap_googleads.instrumentation import StreamStats, SyncMetrics
+from tap_googleads.output import JSONLinesBatcher
+from tap_googleads.rate_limiter import AdaptiveRateLimiter, get_retry_delay
+from tap_googleads.utils import (
+    DATE_SEGMENTS,
+    GAQLQuery,
+    camel_case,
+    camel_case_field,
+    compile_pk_builder,
+    compile_row_projector,
+    context_key,
+    is_field_selected,
+    iter_search_results,
+    parse_gaql,
+)
 
 
 SCHEMAS_DIR = Path(__file__).parent / Path("./schemas")
+SEARCH_RESPONSE_CHUNK_SIZE = 64 * 1024
+# Request context key carrying a GAQL query run instead of the stream's own,
+# such as the combined query of a SharedQuery
+SHARED_GAQL_KEY = "shared_gaql"
+# Request context key listing the resource names to query, see use_change_status
+CHANGED_RESOURCES_KEY = "changed_resources"
+# State key of the last change_status timestamp synced for a customer
+CHANGE_STATUS_BOOKMARK_KEY = "change_status_bookmark"
+# change_status only covers the last 90 days and returns at most 10000 rows
+CHANGE_STATUS_MAX_DAYS = 89
+CHANGE_STATUS_LIMIT = 10000
+# Resource names per IN filter, keeping search URLs well under their size limit
+CHANGED_RESOURCES_BATCH_SIZE = 200
+CHANGE_STATUS_DATE_TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+# Errors of a search body broken off while it is read, see request_records
+BODY_READ_ERRORS = (
+    ConnectionResetError,
+    requests.exceptions.ConnectionError,
+    requests.exceptions.ReadTimeout,
+    requests.exceptions.ChunkedEncodingError,
+    requests.exceptions.ContentDecodingError,
+)
+# State key of the generation of a customer's fingerprints, see FingerprintStore
+FINGERPRINT_GENERATION_KEY = "fingerprint_generation"
+# Records a prefetching worker hands over at a time, and how many of these
+# chunks it fetches ahead of the stream writing them, see PrefetchedRecords
+PREFETCH_CHUNK_SIZE = 1000
+PREFETCH_MAX_CHUNKS = 10
+# Quota errors asking to wait longer than this fail the sync instead
+MAX_RETRY_DELAY_SECONDS = 10 * 60
 
 
 class GoogleAdsStream(RESTStream):
     """GoogleAds stream class."""
 
     url_base = "https://googleads.googleapis.com/v14"
+    auth_url_base = "https://www.googleapis.com/oauth2/v4/token"
 
     records_jsonpath = "$[*]"  # Or override `parse_response`.
     next_page_token_jsonpath = "$.nextPageToken"
     primary_keys_jsonpaths = None
+    replication_key_jsonpath: Optional[str] = None
+    # Whether the GAQL SELECT list is narrowed down to the selected properties
+    select_catalog_fields: bool = False
+    # Whether records can be emitted only when they changed, see change_detection
+    supports_change_detection: bool = False
+    # change_status resource_type of the rows, e.g. CAMPAIGN, see use_change_status
+    change_status_resource_type: Optional[str] = None
     _LOG_REQUEST_METRIC_URLS: bool = True
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._prefetched_records: Dict[str, PrefetchedRecords] = {}
+        # GAQL segments replaced, or dropped when None, see stream_granularity
+        self._segment_rewrites: Dict[str, Optional[str]] = {}
+        if self.granularity:
+            self._apply_granularity()
+        if self.detects_changes:
+            if self.cache_dir is None:
+                raise ConfigValidationError("change_detection needs a cache_dir")
+            if self.config.get("change_detection_tombstones"):
+                self._schema["properties"]["_sdc_deleted_at"] = {
+                    "type": ["string", "null"],
+                    "format": "date-time",
+                }
+        self._build_primary_key = compile_pk_builder(self.primary_keys_jsonpaths)
+        self._replication_key_levels = (
+            self.replication_key_jsonpath.split(".")
+            if self.replication_key_jsonpath
+            else None
+        )
+        # client_ids that raised CustomerNotEnabledError during this run
+        self.customers_not_enabled: Set[str] = set()
+        self.shared_query: Optional[SharedQuery] = None
+        self._record_stats: Optional[StreamStats] = None
+        self._selected_fields: Dict[Tuple[str, ...], List[str]] = {}
+        self._change_status_plans: Dict[str, ChangeStatusPlan] = {}
+
+    @property
+    def granularity(self) -> dict:
+        """The `stream_granularity` entry of this stream, empty if there is none."""
+        for entry in self.config.get("stream_granularity", []):
+            if entry["stream"] == self.name:
+                return entry
+        return {}
+
     @property
-    @cached
+    def date_granularity(self) -> str:
+        """Period the rows are aggregated over, one of DATE_SEGMENTS."""
+        return self.granularity.get("date_granularity", "day")
+
+    def _apply_granularity(self) -> None:
+        """Drop segments and roll dates up in the queries, keys and schema.
+
+        Google then aggregates the rows over the remaining segments itself.
+        With a week or month granularity, `segments.date` is replaced by
+        `segments.week` or `segments.month`, the first day of the period.
+        """
+        rewrites: Dict[str, Optional[str]] = dict.fromkeys(
+            self.granularity.get("drop_segments", [])
+        )
+        if self.date_granularity != "day":
+            rewrites["segments.date"] = DATE_SEGMENTS[self.date_granularity]
+        for field, rewrite in rewrites.items():
+            if not field.startswith("segments.") or field.count(".") != 1:
+                raise ConfigValidationError(f"{field} is not a segment of {self.name}")
+            if field == self.replication_key_jsonpath and rewrite is None:
+                raise ConfigValidationError(
+                    f"{field} is the replication key of {self.name}, use "
+                    "date_granularity to aggregate it instead"
+                )
+        if self.date_granularity != "day" and (
+            self.replication_key_jsonpath != "segments.date"
+        ):
+            raise ConfigValidationError(f"{self.name} is not segmented by date")
+        self._segment_rewrites = rewrites
+
+        paths = {
+            camel_case_field(field): rewrite and camel_case_field(rewrite)
+            for field, rewrite in rewrites.items()
+        }
+        self.primary_keys_jsonpaths = [
+            paths.get(path, path)
+            for path in self.primary_keys_jsonpaths or []
+            if paths.get(path, path)
+        ]
+        if self.replication_key_jsonpath:
+            self.replication_key_jsonpath = paths.get(
+                self.replication_key_jsonpath, self.replication_key_jsonpath
+            )
+        segments = self._schema["properties"].get("segments", {})
+        for field, rewrite in paths.items():
+            schema = segments.get("properties", {}).pop(field.split(".")[1], None)
+            if rewrite and schema is not None:
+                segments["properties"][rewrite.split(".")[1]] = schema
+
+    @cached_property
     def authenticator(self) -> GoogleAdsAuthenticator:
-        """Return a new authenticator object."""
-        base_auth_url = "https://www.googleapis.com/oauth2/v4/token"
+        """Return the authenticator shared by every stream of the tap."""
         auth_params = {
             "refresh_token": self.config["refresh_token"],
             "client_id": self.config["client_id"],
             "client_secret": self.config["client_secret"],
             "grant_type": "refresh_token",
         }
-        auth_url = urljoin(base_auth_url, "?" + urlencode(auth_params))
-        return GoogleAdsAuthenticator(stream=self, auth_endpoint=auth_url)
+        auth_url = urljoin(self.auth_url_base, "?" + urlencode(auth_params))
+        return GoogleAdsAuthenticator.for_tap_of(self, auth_url)
+
+    @property
+    def requests_session(self) -> requests.Session:
+        """HTTP session shared by every stream of the tap, see `build_session`."""
+        return self._tap.requests_session
+
+    @property
+    def rate_limiter(self) -> AdaptiveRateLimiter:
+        """Request rate limiter shared by every stream of the tap."""
+        return self._tap.rate_limiter
+
+    @property
+    def sync_metrics(self) -> SyncMetrics:
+        """Per stream and customer metrics of the tap, see `SyncMetrics`."""
+        return self._tap.sync_metrics
 
     @property
     def http_headers(self) -> dict:
@@ -52,9 +236,195 @@ class GoogleAdsStream(RESTStream):
         headers["login-customer-id"] = self.config["login_customer_id"]
         return headers
 
-    def get_new_paginator(self) -> JSONPathPaginator:
+    def prepare_request(
+        self, context: Optional[dict], next_page_token: Optional[Any]
+    ) -> requests.PreparedRequest:
+        request = super().prepare_request(context, next_page_token)
+        if context and context.get("login_customer_id"):
+            # Customers found under another manager than login_customer_id
+            request.headers["login-customer-id"] = context["login_customer_id"]
+        return request
+
+    @property
+    def api_version(self) -> str:
+        """Google Ads API version of `url_base`, e.g. v14."""
+        return self.url_base.rsplit("/", 1)[-1]
+
+    @property
+    def cache_dir(self) -> Optional[Path]:
+        """Directory of the local caches, None when caching is disabled."""
+        cache_dir = self.config.get("cache_dir")
+        return Path(cache_dir) if cache_dir else None
+
+    @property
+    def detects_changes(self) -> bool:
+        """Whether only new and changed records are emitted, see `_emit_changes`."""
+        return self.supports_change_detection and bool(
+            self.config.get("change_detection")
+        )
+
+    @property
+    def uses_change_status(self) -> bool:
+        """Whether only the resources in change_status are queried."""
+        return self.change_status_resource_type is not None and bool(
+            self.config.get("use_change_status")
+        )
+
+    @property
+    def is_search_query(self) -> bool:
+        """Whether the stream runs a GAQL query against googleAds:search."""
+        return (self.path or "").endswith("googleAds:search")
+
+    @property
+    def use_search_stream(self) -> bool:
+        """Whether the query is sent to googleAds:searchStream in a single request."""
+        return self.is_search_query and bool(self.config.get("use_search_stream"))
+
+    def get_url(self, context: Optional[dict]) -> str:
+        url = super().get_url(context)
+        if self.use_search_stream:
+            url += "Stream"
+        return url
+
+    def get_new_paginator(self) -> BaseAPIPaginator:
+        if self.use_search_stream:
+            return SinglePagePaginator()
+        if self.is_search_query:
+            return SearchPagePaginator()
         return JSONPathPaginator(self.next_page_token_jsonpath)
 
+    def prepare_request_payload(
+        self, context: Optional[dict], next_page_token: Optional[Any]
+    ) -> Optional[dict]:
+        if self.use_search_stream:
+            return {"query": self.get_query(context)}
+        return None
+
+    def _request(
+        self, prepared_request: requests.PreparedRequest, context: Optional[dict]
+    ) -> requests.Response:
+        # Retries resend this request, with the token as it is now
+        prepared_request.headers.update(self.authenticator.auth_headers)
+        stats = self.sync_metrics.get(self.name, context)
+        sent_at = self.rate_limiter.acquire()
+        started = time.perf_counter()
+        # Search bodies are decoded as they arrive, see parse_response
+        response = self.requests_session.send(
+            prepared_request, timeout=self.timeout, stream=self.is_search_query
+        )
+        stats.add_request(time.perf_counter() - started)
+        response.sync_stats = stats  # type: ignore[attr-defined]
+        if response.status_code == 429:
+            retry_delay = get_retry_delay(response)
+            response.retry_delay = retry_delay  # type: ignore[attr-defined]
+            self.rate_limiter.throttled(sent_at, retry_delay)
+            self.logger.warning(
+                "Rate limited, lowering the request rate to %.2f/s and "
+                "waiting %s seconds before retrying",
+                self.rate_limiter.rate,
+                retry_delay or 0,
+            )
+        elif 200 <= response.status_code < 300:
+            self.rate_limiter.succeeded()
+        if context and (SHARED_GAQL_KEY in context or CHANGED_RESOURCES_KEY in context):
+            context = {
+                k: v
+                for k, v in context.items()
+                if k not in (SHARED_GAQL_KEY, CHANGED_RESOURCES_KEY)
+            }
+        self._write_request_duration_log(
+            endpoint=self.path,
+            response=response,
+            context=context,
+            extra_tags={"url": prepared_request.path_url}
+            if self._LOG_REQUEST_METRIC_URLS
+            else None,
+        )
+        self.validate_response(response)
+        stats.add(pages=1)
+        return response
+
+    def request_records(self, context: Optional[dict]) -> Iterable[dict]:
+        """Request the records of a context, yielding search rows as they arrive.
+
+        The body of a search response is read after the retried `_request`
+        returned. Should the connection break it off, the page, or the
+        searchStream query, is requested again with backoff and the rows
+        already yielded from it are skipped, as Google returns them in the
+        same order.
+        """
+        if not self.is_search_query:
+            yield from super().request_records(context)
+            return
+        paginator = self.get_new_paginator()
+        decorated_request = self.request_decorator(self._request)
+        with metrics.http_request_counter(self.name, self.path) as request_counter:
+            request_counter.context = context
+            while not paginator.finished:
+                yielded = 0
+                wait = self.backoff_wait_generator()
+                next(wait)
+                for tries in itertools.count(1):
+                    prepared_request = self.prepare_request(
+                        context, next_page_token=paginator.current_value
+                    )
+                    response = decorated_request(prepared_request, context)
+                    request_counter.increment()
+                    try:
+                        rows = self.parse_response(response)
+                        for row in itertools.islice(rows, yielded, None):
+                            yielded += 1
+                            yield row
+                        break
+                    except BODY_READ_ERRORS:
+                        response.close()
+                        if tries >= self.backoff_max_tries():
+                            raise
+                        seconds = next(wait)
+                        self.backoff_handler(
+                            {
+                                "target": self.request_records,
+                                "args": (prepared_request, context),
+                                "kwargs": {},
+                                "tries": tries,
+                                "elapsed": 0,
+                                "wait": seconds,
+                            }
+                        )
+                        time.sleep(seconds)
+                self.update_sync_costs(prepared_request, response, context)
+                paginator.advance(response)
+
+    def backoff_handler(self, details) -> None:
+        """Count the retry, then log it."""
+        _, context = details["args"]
+        self.sync_metrics.get(self.name, context).add(retries=1)
+        super().backoff_handler(details)
+
+    def parse_response(self, response: requests.Response) -> Iterable[dict]:
+        """Yield each row of a search response as it is decoded from the socket.
+
+        Everything around the rows, such as `nextPageToken`, is kept on
+        `response.search_metadata` for `SearchPagePaginator`.
+        """
+        stats: Optional[StreamStats] = getattr(response, "sync_stats", None)
+        if not self.is_search_query:
+            if stats is not None:
+                stats.add(bytes=len(response.content))
+            yield from super().parse_response(response)
+            return
+
+        metadata: dict = {}
+        response.search_metadata = metadata  # type: ignore[attr-defined]
+        chunks = response.iter_content(chunk_size=SEARCH_RESPONSE_CHUNK_SIZE)
+        if stats is not None:
+            chunks = _count_bytes(chunks, stats)
+        yield from iter_search_results(chunks, metadata)
+        if "error" in metadata:
+            raise FatalAPIError(
+                f"searchStream failed for path: {self.path}. {metadata['error']}"
+            )
+
     def get_url_params(
         self, context: Optional[dict], next_page_token: Optional[Any]
     ) -> Dict[str, Any]:
@@ -62,11 +432,102 @@ class GoogleAdsStream(RESTStream):
         params: dict = {}
         if next_page_token:
             params["pageToken"] = next_page_token
-        if self.replication_key:
-            params["sort"] = "asc"
-            params["order_by"] = self.replication_key
         return params
 
+    def get_gaql(self, context: Optional[dict]) -> str:
+        """Return the GAQL query to run for the given context.
+
+        With `use_change_status`, only the resources listed in the context's
+        CHANGED_RESOURCES_KEY are queried.
+        """
+        if context and CHANGED_RESOURCES_KEY in context:
+            query = parse_gaql(self.gaql)
+            names = ", ".join(f"'{name}'" for name in context[CHANGED_RESOURCES_KEY])
+            condition = f"{query.resource}.resource_name IN ({names})"
+            return query.with_condition(condition).to_gaql()
+        return self.gaql
+
+    def get_query(self, context: Optional[dict]) -> str:
+        """Return the GAQL query to send for a request context.
+
+        This is the stream's own query, unless the context belongs to a
+        `SharedQuery` run on behalf of several streams.
+        """
+        if context and SHARED_GAQL_KEY in context:
+            return context[SHARED_GAQL_KEY]
+        return self.get_selected_gaql(context)
+
+    def get_selected_gaql(self, context: Optional[dict]) -> str:
+        """Return `get_gaql`, without the fields that wouldn't reach the records.
+
+        Segments are first dropped or rolled up following `stream_granularity`.
+        Then with `select_catalog_fields`, fields whose properties are
+        deselected in the catalog or missing from the schema aren't requested.
+        Segments are always kept, as they decide which rows are returned, and
+        so are the fields of the primary and replication keys. Should every
+        metric be deselected, one is kept so that rows without metrics stay out.
+        """
+        gaql = self.get_gaql(context)
+        if not self.select_catalog_fields and not self._segment_rewrites:
+            return gaql
+        query = parse_gaql(gaql)
+        fields = tuple(query.fields)
+        if fields not in self._selected_fields:
+            self._selected_fields[fields] = self._select_fields(query)
+        selected = self._selected_fields[fields]
+        if selected == list(fields):
+            return gaql
+        return query._replace(fields=selected).to_gaql()
+
+    def _select_fields(self, query: GAQLQuery) -> List[str]:
+        fields = [
+            rewrite
+            for rewrite in (
+                self._segment_rewrites.get(field, field) for field in query.fields
+            )
+            if rewrite
+        ]
+        if not self.select_catalog_fields:
+            return fields
+
+        key_paths = set(self.primary_keys_jsonpaths or [])
+        if self.replication_key_jsonpath:
+            key_paths.add(self.replication_key_jsonpath)
+        selected = [
+            field
+            for field in fields
+            if field.startswith("segments.")
+            or camel_case_field(field) in key_paths
+            or is_field_selected(field, self.schema, self.mask)
+        ]
+        metrics = [field for field in query.fields if field.startswith("metrics.")]
+        if metrics and not any(field in selected for field in metrics):
+            selected.append(metrics[0])
+        if not selected:
+            selected.append(f"{query.resource}.resource_name")
+        if len(selected) < len(fields):
+            self.logger.info(
+                "Not requesting fields of %s that aren't selected: %s",
+                self.name,
+                [field for field in fields if field not in selected],
+            )
+        return selected
+
+    def get_bookmark(self, context: Optional[dict]) -> Optional[Any]:
+        """Return the replication key bookmark of a context, if there is one.
+
+        Unlike `get_starting_replication_key_value` this never creates state, so
+        it is safe to call from the worker threads of `prefetch_records`.
+        """
+        if self.replication_method != "INCREMENTAL":
+            return None
+        return get_state_if_exists(
+            self.tap_state,
+            self.name,
+            state_partition_context=self._get_state_partition_context(context),
+            key="replication_key_value",
+        )
+
     def validate_response(self, response):
         # Still catch error status codes
         if response.status_code == 403:
@@ -75,6 +536,9 @@ class GoogleAdsStream(RESTStream):
                 f"{response.reason} for url: {response.url}"
             )
             data = response.json()
+            if isinstance(data, list):
+                # searchStream wraps its errors in a list of batches
+                data = data[0]
             details: dict = data.get("error").get("details")
 
             if (
@@ -84,12 +548,25 @@ class GoogleAdsStream(RESTStream):
             ):
                 raise CustomerNotEnabledError(msg)
 
+        if response.status_code == 401:
+            # The token expired or was revoked, retry with a new one
+            authorization = response.request.headers.get("Authorization", "")
+            self.authenticator.invalidate(authorization.split(" ")[-1])
+            raise RetriableAPIError(
+                f"{response.status_code} Client Error: "
+                f"{response.reason} for path: {self.path}"
+            )
+
         if response.status_code == 429:
             msg = (
                 f"{response.status_code} Client Error: "
                 f"{response.reason} for path: {self.path}."
                 f"response.json() {response.json()}:"
             )
+            retry_delay = getattr(response, "retry_delay", None)
+            if retry_delay and retry_delay > MAX_RETRY_DELAY_SECONDS:
+                # e.g. the daily operations quota of the developer token
+                raise FatalAPIError(f"Quota exhausted for {retry_delay}s. {msg}")
             raise RetriableAPIError(msg)
 
         if 400 <= response.status_code < 500:
@@ -111,6 +588,12 @@ class GoogleAdsStream(RESTStream):
         """Return a generator of row-type dictionary objects.
 
         Each row emitted should be a dictionary of property names to their values.
+        Records already fetched by `prefetch_records` for this context are
+        served from memory instead of being requested again. When the context
+        takes several queries, state is checkpointed after each of them.
+        With `change_detection`, unchanged records are left out. With
+        `use_change_status`, the customer's change_status bookmark is moved
+        forward once its records were all yielded.
 
         Args:
             context: Stream partition or context dictionary.
@@ -118,24 +601,507 @@ class GoogleAdsStream(RESTStream):
         Yields:
             One item per (possibly processed) record in the API.
         """
+        self._record_stats = self.sync_metrics.get(self.name, context)
+        records = self._get_all_records(context)
+        if self.detects_changes:
+            records = self._emit_changes(records, context)
+        yield from records
+        plan = self._change_status_plans.pop(context_key(context), None)
+        if plan is not None and not self._is_customer_not_enabled(context):
+            state = self.get_context_state(context)
+            state[CHANGE_STATUS_BOOKMARK_KEY] = plan.bookmark
+
+    def _get_all_records(self, context: Optional[dict]) -> Iterable[Dict[str, Any]]:
+        prefetched = self._prefetched_records.pop(context_key(context), None)
+        batches: Iterable[Iterable[dict]]
+        if prefetched is not None:
+            batches = prefetched.batches()
+        else:
+            batches = self._request_batches(context)
+        try:
+            for index, records in enumerate(batches):
+                if index and not self.get_batch_config(self.config):
+                    # A BATCH message must come before the state covering it
+                    self._write_checkpoint(context)
+                yield from records
+        except CustomerNotEnabledError as e:
+            self._handle_customer_not_enabled(context, e)
+
+    def _emit_changes(
+        self, records: Iterable[Dict[str, Any]], context: Optional[dict]
+    ) -> Iterable[Dict[str, Any]]:
+        """Yield the records whose fingerprint changed since they were last emitted.
+
+        Fingerprints are kept per customer in cache_dir, and only replaced once
+        every record of the customer was yielded. They are used as long as the
+        incoming state holds their generation, so every record is emitted
+        again if the state they were saved with never reached the target. With
+        `change_detection_tombstones`, records that are no longer returned are
+        yielded with just their primary key and `_sdc_deleted_at`. Records
+        left out of the query by `use_change_status` keep their fingerprint.
+        """
+        client_id = (context or {}).get("client_id")
+        file_name = (
+            f"{self.name}_{client_id}.json" if client_id else f"{self.name}.json"
+        )
+        store = FingerprintStore(self.cache_dir / "fingerprints" / file_name)
+        state = self.get_context_state(context)
+        previous = store.load(state.get(FINGERPRINT_GENERATION_KEY))
+        current: Dict[str, str] = {}
+        changed = 0
+        for record in records:
+            key = record["_sdc_primary_key"]
+            current[key] = fingerprint(record)
+            if previous.get(key) != current[key]:
+                changed += 1
+                yield record
+        if self._is_customer_not_enabled(context):
+            # Its records are unknown, not removed
+            return
+
+        removed = previous.keys() - current.keys()
+        plan = self._change_status_plans.get(context_key(context))
+        if plan is not None and plan.partial:
+            # Only the changed resources were queried, removed ones included
+            current = {**previous, **current}
+            removed = set()
+        if removed and self.config.get("change_detection_tombstones"):
+            deleted_at = datetime.now(timezone.utc).isoformat()
+            for key in sorted(removed):
+                yield {"_sdc_primary_key": key, "_sdc_deleted_at": deleted_at}
+        state[FINGERPRINT_GENERATION_KEY] = store.save(current)
+        self.logger.info(
+            "%s changed records of %s: %d, removed: %d, unchanged: %d",
+            self.name,
+            context,
+            changed,
+            len(removed),
+            len(current) - changed,
+        )
+
+    def _is_customer_not_enabled(self, context: Optional[dict]) -> bool:
+        client_id = (context or {}).get("client_id")
+        return client_id is not None and str(client_id) in self.customers_not_enabled
+
+    def get_request_contexts(self, context: Optional[dict]) -> List[Optional[dict]]:
+        """Return the contexts of the queries needed to sync the given context.
+
+        With `use_change_status`, these are the batches of resources changed
+        since the customer's change_status bookmark, see `plan_change_status`.
+        """
+        if self.uses_change_status:
+            key = context_key(context)
+            if key not in self._change_status_plans:
+                self._change_status_plans[key] = self.plan_change_status(context)
+            return self._change_status_plans[key].request_contexts
+        return [context]
+
+    def plan_change_status(self, context: Optional[dict]) -> "ChangeStatusPlan":
+        """Query the customer's change_status for the resources to sync.
+
+        Without a bookmark, or with one older than change_status goes back,
+        every resource is queried. So are they when more resources changed
+        than a change_status query returns. The next bookmark is the latest
+        change seen, or a day before now if that is later: change_status
+        timestamps are in the customer's time zone, which is never a day
+        behind UTC. Only reads state, as it runs on prefetching threads.
+        """
+        now = datetime.now(timezone.utc)
+        next_bookmark = (now - timedelta(days=1)).strftime(
+            CHANGE_STATUS_DATE_TIME_FORMAT
+        )
+        bookmark = get_state_if_exists(
+            self.tap_state,
+            self.name,
+            state_partition_context=self._get_state_partition_context(context),
+            key=CHANGE_STATUS_BOOKMARK_KEY,
+        )
+        oldest = date.today() - timedelta(days=CHANGE_STATUS_MAX_DAYS)
+        if not bookmark or bookmark < oldest.isoformat():
+            self.logger.info(
+                "No recent change_status bookmark for %s of %s, querying every "
+                "resource",
+                self.name,
+                context,
+            )
+            return ChangeStatusPlan([context], next_bookmark, partial=False)
+
+        resource_field = self.change_status_resource_type.lower()
+        until = (now + timedelta(days=1)).strftime("%Y-%m-%d 23:59:59")
+        gaql = (
+            f"SELECT change_status.{resource_field}, "
+            "change_status.last_change_date_time "
+            "FROM change_status "
+            f"WHERE change_status.resource_type = '{self.change_status_resource_type}' "
+            f"AND change_status.last_change_date_time BETWEEN '{bookmark}' "
+            f"AND '{until}' "
+            "ORDER BY change_status.last_change_date_time "
+            f"LIMIT {CHANGE_STATUS_LIMIT}"
+        )
+        rows = list(self.request_records({**(context or {}), SHARED_GAQL_KEY: gaql}))
+        if len(rows) >= CHANGE_STATUS_LIMIT:
+            self.logger.info(
+                "Over %d changes for %s of %s, querying every resource",
+                CHANGE_STATUS_LIMIT,
+                self.name,
+                context,
+            )
+            return ChangeStatusPlan([context], next_bookmark, partial=False)
+
+        changes = [row["changeStatus"] for row in rows]
+        resource_names = sorted(
+            {change[camel_case(resource_field)] for change in changes}
+        )
+        latest = max((change["lastChangeDateTime"] for change in changes), default="")
+        self.logger.info(
+            "%d resources of %s changed since %s for %s",
+            len(resource_names),
+            self.name,
+            bookmark,
+            context,
+        )
+        request_contexts: List[Optional[dict]] = [
+            {
+                **(context or {}),
+                CHANGED_RESOURCES_KEY: resource_names[
+                    start : start + CHANGED_RESOURCES_BATCH_SIZE
+                ],
+            }
+            for start in range(0, len(resource_names), CHANGED_RESOURCES_BATCH_SIZE)
+        ]
+        return ChangeStatusPlan(
+            request_contexts, max(latest, next_bookmark), partial=True
+        )
+
+    def prefetch_records(self, context: Optional[dict], executor: Executor) -> None:
+        """Start fetching the records of `context` on `executor`.
+
+        The next `get_records` call for the same context waits for and yields
+        these records, so Singer messages are still written by the caller.
+        The worker only fetches a bounded number of records ahead of it, see
+        `PrefetchedRecords`.
+        """
+        prefetched = PrefetchedRecords()
+        self._prefetched_records[context_key(context)] = prefetched
+        executor.submit(prefetched.fill, self._request_batches(context))
+
+    def cancel_prefetches(self) -> None:
+        """Stop the workers fetching records that no `get_records` call will read."""
+        for prefetched in self._prefetched_records.values():
+            prefetched.cancel()
+        self._prefetched_records.clear()
+
+    def _request_batches(self, context: Optional[dict]) -> Iterable[Iterable[dict]]:
+        shared = None
+        if self.shared_query is not None:
+            shared = self.shared_query.request_batches(self, context)
+        if shared is not None:
+            for request_context, records in shared:
+                yield self._process_records(records, request_context)
+            return
+        for request_context in self.get_request_contexts(context):
+            records = self.request_records(request_context)
+            yield self._process_records(records, request_context)
+
+    def _process_records(
+        self, records: Iterable[dict], context: Optional[dict]
+    ) -> Iterable[dict]:
+        stats = self.sync_metrics.get(self.name, context)
+        rows = 0
+        post_process_seconds = 0.0
         try:
-            for record in self.request_records(context):
+            for record in records:
+                started = time.perf_counter()
                 transformed_record = self.post_process(record, context)
+                post_process_seconds += time.perf_counter() - started
                 if transformed_record is None:
                     # Record filtered out during post_process()
                     continue
+                rows += 1
                 yield transformed_record
-        except CustomerNotEnabledError as e:
-            self.logger.warning(
-                "We hit the Customer Not Enabled error. "
-                "Happens when we get a customer from the hierarchy list that "
-                "isn't enabled anymore, most likely due to a customer being "
-                f"disabled after the API that lists customers is called.  {e=}"
-            )
+        finally:
+            stats.add(rows=rows, post_process_seconds=post_process_seconds)
+
+    def _generate_record_messages(self, record: dict):
+        # Times the SDK dropping deselected properties and conforming the record
+        # to the schema, for the customer whose records get_records is yielding
+        started = time.perf_counter()
+        messages = list(super()._generate_record_messages(record))
+        if self._record_stats is not None:
+            self._record_stats.add(validation_seconds=time.perf_counter() - started)
+        yield from messages
+
+    def _write_record_message(self, record: dict) -> None:
+        # Serialised and written in batches by the tap, see stdout_batch_size
+        for record_message in self._generate_record_messages(record):
+            self._tap.message_writer.write_record(record_message)
+        self._is_state_flushed = False
+
+    def _write_schema_message(self) -> None:
+        self._tap.message_writer.flush()
+        super()._write_schema_message()
+
+    def _write_state_message(self) -> None:
+        self._tap.message_writer.flush()
+        super()._write_state_message()
+
+    def _write_batch_message(self, encoding, manifest: List[str]) -> None:
+        self._tap.message_writer.flush()
+        super()._write_batch_message(encoding=encoding, manifest=manifest)
+
+    def get_batches(
+        self, batch_config: BatchConfig, context: Optional[dict] = None
+    ) -> Iterable[Tuple[BaseBatchFileEncoding, List[str]]]:
+        """Write the records to BATCH files, as they would be in RECORD messages.
+
+        Records are conformed to the schema and mapped like those of RECORD
+        messages, which the SDK's default implementation skips.
+        """
+        batcher = JSONLinesBatcher(
+            tap_name=self.tap_name, stream_name=self.name, batch_config=batch_config
+        )
+        records = (
+            message.record
+            for record in self._sync_records(context, write_messages=False)
+            for message in self._generate_record_messages(record)
+        )
+        for manifest in batcher.get_batches(records=records):
+            yield batch_config.encoding, manifest
+
+    def _write_checkpoint(self, context: Optional[dict]) -> None:
+        # Queries are run in replication key order, so everything seen so far
+        # can be bookmarked before the next one starts. Those within the
+        # lookback window don't move the bookmark back.
+        state = self.get_context_state(context)
+        bookmark = state.get("replication_key_value")
+        finalize_state_progress_markers(state)
+        if bookmark is not None and state.get("replication_key_value", "") < bookmark:
+            state["replication_key_value"] = bookmark
+        self._write_state_message()
+
+    def _handle_customer_not_enabled(
+        self, context: Optional[dict], e: Exception
+    ) -> None:
+        if context and "client_id" in context:
+            self.customers_not_enabled.add(str(context["client_id"]))
+        self.logger.warning(
+            "We hit the Customer Not Enabled error. "
+            "Happens when we get a customer from the hierarchy list that "
+            "isn't enabled anymore, most likely due to a customer being "
+            f"disabled after the API that lists customers is called.  {e=}"
+        )
 
     def post_process(self, row: dict, context: Optional[dict] = None) -> Optional[dict]:
         """As needed, append or transform raw data to match expected structure."""
-        return replicate_pk_at_root(row, self.primary_keys_jsonpaths)
+        if self._build_primary_key:
+            row["_sdc_primary_key"] = self._build_primary_key(row)
+        if self.replication_key and self._replication_key_levels:
+            value = row
+            for level in self._replication_key_levels:
+                value = value[level]
+            row[self.replication_key] = value
+        return row
+
+
+def _count_bytes(chunks: Iterable[bytes], stats: StreamStats) -> Iterable[bytes]:
+    received = 0
+    try:
+        for chunk in chunks:
+            received += len(chunk)
+            yield chunk
+    finally:
+        stats.add(bytes=received)
+
+
+class PrefetchCancelled(Exception):
+    """Raised on a prefetching worker once its records are no longer wanted."""
+
+
+class PrefetchedRecords:
+    """The records of a context, fetched ahead by a worker thread.
+
+    The worker hands them over in chunks of PREFETCH_CHUNK_SIZE through a
+    queue of at most PREFETCH_MAX_CHUNKS, waiting while it is full, so the
+    records held in memory stay bounded however many queries the context
+    takes. Chunks carry the index of their query, so that state can still be
+    checkpointed between queries.
+    """
+
+    _DONE = object()
+
+    def __init__(self, max_chunks: int = PREFETCH_MAX_CHUNKS):
+        self._queue: queue.Queue = queue.Queue(max_chunks)
+        self._cancelled = threading.Event()
+
+    def _put(self, item: Any) -> None:
+        while not self._cancelled.is_set():
+            try:
+                self._queue.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                pass
+        raise PrefetchCancelled()
+
+    def fill(self, batches: Iterable[Iterable[dict]]) -> None:
+        """Hand over the records of each query of `batches`, on the worker thread.
+
+        Errors, such as CustomerNotEnabledError, are raised again by `batches`.
+        """
+        try:
+            try:
+                for index, records in enumerate(batches):
+                    # Marks the start of the query, even if it has no records
+                    self._put((index, []))
+                    chunk: List[dict] = []
+                    for record in records:
+                        chunk.append(record)
+                        if len(chunk) >= PREFETCH_CHUNK_SIZE:
+                            self._put((index, chunk))
+                            chunk = []
+                    if chunk:
+                        self._put((index, chunk))
+            except PrefetchCancelled:
+                raise
+            except BaseException as e:
+                self._put(e)
+                return
+            self._put(self._DONE)
+        except PrefetchCancelled:
+            pass
+
+    def cancel(self) -> None:
+        """Make the worker stop fetching."""
+        self._cancelled.set()
+
+    def _chunks(self) -> Iterator[Tuple[int, List[dict]]]:
+        while True:
+            item = self._queue.get()
+            if item is self._DONE:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+
+    def batches(self) -> Iterator[Iterator[dict]]:
+        """Yield the records of each query as the worker hands them over.
+
+        The worker is cancelled should the records not all be read.
+        """
+        try:
+            for _, chunks in itertools.groupby(self._chunks(), key=lambda c: c[0]):
+                yield (record for _, chunk in chunks for record in chunk)
+        finally:
+            self.cancel()
+
+
+class ChangeStatusPlan(NamedTuple):
+    """The queries syncing a customer with `use_change_status`."""
+
+    request_contexts: List[Optional[dict]]
+    # change_status timestamp to query from next time
+    bookmark: str
+    # Whether only the changed resources are queried
+    partial: bool
+
+
+class SearchPagePaginator(BaseAPIPaginator):
+    """Paginator for googleAds:search pages decoded by `parse_response`."""
+
+    def __init__(self) -> None:
+        super().__init__(None)
+
+    def get_next(self, response: requests.Response) -> Optional[str]:
+        metadata = getattr(response, "search_metadata", {})
+        return metadata.get("nextPageToken")
+
+
+class SharedQuery:
+    """A GAQL query run once per context on behalf of several streams.
+
+    Streams querying the same resource with the same segments and filters get
+    the same rows, whatever else they select, so their SELECT lists can be
+    merged into one query. The first stream to request a context runs the
+    combined query and keeps the rows of the other streams, projected onto
+    their own fields, until they request the context too.
+
+    Whether the queries match is checked again for every context, since
+    bookmarks and date windows can differ between streams. A stream whose
+    queries don't match the first stream's gets None and queries alone.
+    """
+
+    def __init__(self, streams: List[GoogleAdsStream]):
+        self.streams = streams
+        self._lock = threading.Lock()
+        self._results: Dict[str, Future] = {}
+
+    def request_batches(
+        self, stream: GoogleAdsStream, context: Optional[dict]
+    ) -> Optional[List[Tuple[Optional[dict], List[dict]]]]:
+        """Return the (request context, records) pairs of `stream` for `context`.
+
+        Returns None if `stream` has to run its own queries for `context`.
+        """
+        key = context_key(context)
+        with self._lock:
+            future = self._results.get(key)
+            if future is None:
+                future = self._results[key] = Future()
+                run = True
+            else:
+                run = False
+        if run:
+            try:
+                future.set_result(self._run(stream, context))
+            except BaseException as e:
+                future.set_exception(e)
+        # The dict stays behind empty so the combined query never runs twice
+        return future.result().pop(stream.name, None)
+
+    def _run(
+        self, owner: GoogleAdsStream, context: Optional[dict]
+    ) -> Dict[str, List[Tuple[Optional[dict], List[dict]]]]:
+        plans = {
+            stream.name: [
+                (
+                    request_context,
+                    parse_gaql(stream.get_selected_gaql(request_context)),
+                )
+                for request_context in stream.get_request_contexts(context)
+            ]
+            for stream in self.streams
+        }
+        shape = [query.shape for _, query in plans[owner.name]]
+        sharing = [
+            stream
+            for stream in self.streams
+            if [query.shape for _, query in plans[stream.name]] == shape
+        ]
+        if len(sharing) < 2:
+            return {}
+
+        results: Dict[str, List[Tuple[Optional[dict], List[dict]]]] = {
+            stream.name: [] for stream in sharing
+        }
+        for index, (request_context, query) in enumerate(plans[owner.name]):
+            members = []
+            for stream in sharing:
+                member_context, member_query = plans[stream.name][index]
+                records: List[dict] = []
+                results[stream.name].append((member_context, records))
+                members.append((compile_row_projector(member_query), records))
+
+            fields = dict.fromkeys(
+                field
+                for stream in sharing
+                for field in plans[stream.name][index][1].fields
+            )
+            gaql = query._replace(fields=list(fields)).to_gaql()
+            owner.logger.debug("Running shared query %s", gaql)
+            shared_context = {**(request_context or {}), SHARED_GAQL_KEY: gaql}
+            for row in owner.request_records(shared_context):
+                for project, records in members:
+                    records.append(project(row))
+        return results
 
 
 class CustomerNotEnabledError(Exception):
@@ -0,0 +1,130 @@
+"""Report streams defined by GAQL queries in the `custom_queries` setting."""
+
+import json
+import logging
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from singer_sdk import Tap
+
+from tap_googleads.streams import ReportsStream
+from tap_googleads.utils import camel_case, camel_case_field
+
+# Snapshot of GoogleAdsFieldService's name, dataType and isRepeated attributes
+FIELD_METADATA_PATH = Path(__file__).parent / "field_metadata.json"
+
+# How the JSON API renders each GoogleAdsField dataType, e.g. INT64 as strings
+JSON_SCHEMA_TYPES: Dict[str, Dict[str, Any]] = {
+    "BOOLEAN": {"type": "boolean"},
+    "DATE": {"type": "string", "format": "date"},
+    "DOUBLE": {"type": "number"},
+    "ENUM": {"type": "string"},
+    "FLOAT": {"type": "number"},
+    "INT32": {"type": "integer"},
+    "INT64": {"type": "string"},
+    "MESSAGE": {"type": "object"},
+    "RESOURCE_NAME": {"type": "string"},
+    "STRING": {"type": "string"},
+    "UINT64": {"type": "string"},
+}
+
+logger = logging.getLogger(__name__)
+
+
+@lru_cache(maxsize=None)
+def load_field_metadata() -> Dict[str, dict]:
+    """Return the bundled GoogleAdsField metadata, keyed by field name."""
+    with open(FIELD_METADATA_PATH) as metadata_file:
+        return json.load(metadata_file)["fields"]
+
+
+def get_field_schema(field: str) -> dict:
+    """Return the JSON schema of a GAQL field's value.
+
+    Fields missing from the metadata snapshot accept any value.
+    """
+    metadata = load_field_metadata().get(field)
+    if metadata is None:
+        logger.warning("Field %s is not in %s", field, FIELD_METADATA_PATH.name)
+        return {}
+    schema = dict(JSON_SCHEMA_TYPES.get(metadata["dataType"], {}))
+    if metadata.get("isRepeated"):
+        if metadata["dataType"] == "MESSAGE":
+            # The SDK only conforms array items of objects with properties
+            schema = {}
+        return {"type": "array", "items": schema}
+    return schema
+
+
+def build_schema(resource: str, fields: List[str], replication_key: Optional[str]):
+    """Build the schema of the rows of a GAQL query.
+
+    Arguments:
+        resource: The FROM resource of the query.
+        fields: The fields of its SELECT list.
+        replication_key: The root copy of segments.date, if any.
+
+    Returns:
+        The JSON schema of the rows, with their `_sdc_primary_key`.
+    """
+    properties: Dict[str, Any] = {"_sdc_primary_key": {"type": "string"}}
+    if replication_key:
+        properties[replication_key] = {"type": "string", "format": "date"}
+    resources = [resource] + [
+        field.split(".")[0]
+        for field in fields
+        if field.split(".")[0] not in ("metrics", "segments")
+    ]
+    # The API returns the resource name of every resource a row is made of
+    paths = [f"{name}.resource_name" for name in resources] + fields
+    for field in dict.fromkeys(paths):
+        *parents, name = [camel_case(level) for level in field.split(".")]
+        node = properties
+        for parent in parents:
+            node = node.setdefault(parent, {"type": "object", "properties": {}})
+            node = node["properties"]
+        node[name] = (
+            {"type": "string"}
+            if field.endswith(".resource_name")
+            else get_field_schema(field)
+        )
+    return {"type": "object", "properties": properties}
+
+
+class CustomQueryStream(ReportsStream):
+    """Report stream of one of the `custom_queries`.
+
+    Its records are identified by the resource name of the FROM resource and
+    by every segment, as each combination of them is a separate row. Queries
+    segmented by date are incremental, like the built-in performance streams.
+    """
+
+    records_jsonpath = "$.results[*]"
+    primary_keys = ["_sdc_primary_key"]
+    replication_key = None
+
+    def __init__(self, tap: Tap, query: dict):
+        self.resource = query["resource"]
+        self.query_fields = list(
+            dict.fromkeys([*query["fields"], *query.get("segments", [])])
+        )
+        self.conditions = query.get("conditions", [])
+        segments = [
+            field for field in self.query_fields if field.startswith("segments.")
+        ]
+        self.primary_keys_jsonpaths = [f"{camel_case(self.resource)}.resourceName"] + [
+            camel_case_field(segment) for segment in segments
+        ]
+        if "segments.date" in segments:
+            self.replication_key = "segments_date"
+            self.replication_key_jsonpath = "segments.date"
+        schema = build_schema(self.resource, self.query_fields, self.replication_key)
+        super().__init__(tap=tap, name=query["name"], schema=schema)
+
+    def get_gaql(self, context: Optional[dict]) -> str:
+        conditions = list(self.conditions)
+        if self.replication_key:
+            conditions.append(f"segments.date {self.get_between_filter(context)}")
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+        return f"SELECT {', '.join(self.query_fields)} FROM {self.resource}{where}"
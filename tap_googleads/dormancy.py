@@ -0,0 +1,82 @@
+"""Skipping the performance queries of customers without recent impressions.
+
+Customers with no spend still cost an empty query per performance stream and
+run. With `skip_dormant_customers`, each customer's impressions over the last
+`dormant_window_days` are checked once per run with a single `customer`
+query, and incremental performance streams skip the customers that had none,
+as long as every date since they last synced the customer, less the lookback
+window, lies within that window. Each stream still syncs a dormant customer
+every `dormant_sweep_days`, in case Google restates its data.
+"""
+
+import threading
+from concurrent.futures import Future
+from datetime import date, timedelta
+from typing import TYPE_CHECKING, Dict, Optional
+
+from tap_googleads.client import SHARED_GAQL_KEY
+
+if TYPE_CHECKING:
+    from tap_googleads.client import GoogleAdsStream
+
+DEFAULT_DORMANT_WINDOW_DAYS = 30
+DEFAULT_DORMANT_SWEEP_DAYS = 7
+# State key of the last time a stream synced a customer, see dormant_sweep_days
+LAST_SYNCED_AT_KEY = "last_synced_at"
+
+
+class CustomerActivity:
+    """Whether customers had any impressions over the last `window_days` days.
+
+    Each customer is checked once per run, by whichever stream asks first.
+    Other streams asking at the same time wait for its answer.
+    """
+
+    def __init__(self, window_days: int = DEFAULT_DORMANT_WINDOW_DAYS):
+        self.window_days = window_days
+        self._lock = threading.Lock()
+        self._checks: Dict[str, Future] = {}
+
+    @property
+    def window_start(self) -> date:
+        """First day whose impressions are checked."""
+        return date.today() - timedelta(days=self.window_days)
+
+    def is_dormant(self, stream: "GoogleAdsStream", context: dict) -> bool:
+        """Return whether the customer of `context` had no impressions.
+
+        Raises CustomerNotEnabledError for customers that aren't enabled.
+        """
+        client_id = str(context["client_id"])
+        with self._lock:
+            future: Optional[Future] = self._checks.get(client_id)
+            if future is None:
+                future = self._checks[client_id] = Future()
+                run = True
+            else:
+                run = False
+        if run:
+            try:
+                future.set_result(self._check(stream, context))
+            except BaseException as e:
+                future.set_exception(e)
+        return future.result()
+
+    def _check(self, stream: "GoogleAdsStream", context: dict) -> bool:
+        # A day past today, for customers whose time zone is ahead of ours
+        until = date.today() + timedelta(days=1)
+        gaql = (
+            "SELECT metrics.impressions FROM customer "
+            f"WHERE segments.date BETWEEN '{self.window_start}' AND '{until}'"
+        )
+        rows = stream.request_records({**context, SHARED_GAQL_KEY: gaql})
+        impressions = sum(
+            int(row.get("metrics", {}).get("impressions", 0)) for row in rows
+        )
+        stream.logger.info(
+            "Customer %s had %d impressions since %s",
+            context["client_id"],
+            impressions,
+            self.window_start,
+        )
+        return impressions == 0
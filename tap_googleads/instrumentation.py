@@ -0,0 +1,166 @@
+"""Per stream and customer metrics of a sync."""
+
+import enum
+import math
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from singer_sdk import metrics
+
+LATENCY_QUANTILES = (0.5, 0.9, 0.99)
+
+
+class StreamMetric(str, enum.Enum):
+    """Metrics logged for each stream and customer at the end of a sync."""
+
+    REQUEST_COUNT = "request_count"
+    PAGE_COUNT = "page_count"
+    ROW_COUNT = "row_count"
+    RESPONSE_BYTES = "response_bytes"
+    RETRY_COUNT = "retry_count"
+    REQUEST_LATENCY = "request_latency"
+    POST_PROCESS_DURATION = "post_process_duration"
+    RECORD_VALIDATION_DURATION = "record_validation_duration"
+
+
+COUNTERS = {
+    "requests": StreamMetric.REQUEST_COUNT,
+    "pages": StreamMetric.PAGE_COUNT,
+    "rows": StreamMetric.ROW_COUNT,
+    "bytes": StreamMetric.RESPONSE_BYTES,
+    "retries": StreamMetric.RETRY_COUNT,
+}
+DURATIONS = {
+    "post_process_seconds": StreamMetric.POST_PROCESS_DURATION,
+    "validation_seconds": StreamMetric.RECORD_VALIDATION_DURATION,
+}
+
+
+class StreamStats:
+    """Counters of one stream for one customer, updated from any thread."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.values: Dict[str, float] = dict.fromkeys([*COUNTERS, *DURATIONS], 0)
+        self.latencies: List[float] = []
+
+    def add(self, **values: float) -> None:
+        """Add to the counters, e.g. `add(rows=10, post_process_seconds=0.1)`."""
+        with self._lock:
+            for name, value in values.items():
+                self.values[name] += value
+
+    def add_request(self, latency: float) -> None:
+        """Count a request whose response headers took `latency` seconds."""
+        with self._lock:
+            self.values["requests"] += 1
+            self.latencies.append(latency)
+
+    def latency_quantiles(self) -> Dict[float, float]:
+        """Return the LATENCY_QUANTILES of the request latencies, in seconds."""
+        with self._lock:
+            latencies = sorted(self.latencies)
+        if not latencies:
+            return {}
+        return {
+            quantile: latencies[max(0, math.ceil(quantile * len(latencies)) - 1)]
+            for quantile in LATENCY_QUANTILES
+        }
+
+
+class SyncMetrics:
+    """The StreamStats of every stream and customer of a sync.
+
+    At the end of the sync they are logged as Singer metric lines, and
+    optionally written to a JSON lines file and a Prometheus textfile.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._stats: Dict[Tuple[str, Optional[str]], StreamStats] = {}
+
+    def get(self, stream_name: str, context: Optional[dict]) -> StreamStats:
+        """Return the stats of a stream for the customer of `context`."""
+        client_id = context.get("client_id") if context else None
+        key = (stream_name, None if client_id is None else str(client_id))
+        with self._lock:
+            if key not in self._stats:
+                self._stats[key] = StreamStats()
+            return self._stats[key]
+
+    def points(self) -> Iterator[metrics.Point]:
+        """Yield the metric points of every stream and customer."""
+        with self._lock:
+            stats = sorted(self._stats.items(), key=lambda item: str(item[0]))
+        for (stream_name, client_id), stream_stats in stats:
+            tags = {metrics.Tag.STREAM: stream_name}
+            if client_id is not None:
+                tags["client_id"] = client_id
+            for name, metric in COUNTERS.items():
+                yield metrics.Point(
+                    "counter", metric, int(stream_stats.values[name]), tags
+                )
+            for quantile, latency in stream_stats.latency_quantiles().items():
+                yield metrics.Point(
+                    "timer",
+                    StreamMetric.REQUEST_LATENCY,
+                    latency,
+                    {**tags, "quantile": quantile},
+                )
+            for name, metric in DURATIONS.items():
+                yield metrics.Point("timer", metric, stream_stats.values[name], tags)
+
+    def report(
+        self, json_path: Optional[str] = None, prometheus_path: Optional[str] = None
+    ) -> None:
+        """Log the metrics, and write them to the given files."""
+        points = list(self.points())
+        logger = metrics.get_metrics_logger()
+        for point in points:
+            metrics.log(logger, point)
+        if json_path:
+            with open(json_path, "a") as json_file:
+                for point in points:
+                    json_file.write(point.to_json() + "\n")
+        if prometheus_path:
+            write_prometheus_textfile(Path(prometheus_path), points)
+
+
+def write_prometheus_textfile(path: Path, points: List[metrics.Point]) -> None:
+    """Write metric points in the Prometheus text format.
+
+    Counters are suffixed with `_total`. Timers, including the request latency
+    quantiles, are written as gauges, since the quantiles don't come with the
+    sum and count of a summary.
+
+    The file is replaced atomically, as expected by the textfile collector of
+    the node exporter.
+    """
+    lines: Dict[str, List[str]] = {}
+    for point in points:
+        name = f"tap_googleads_{point.metric.value}"
+        if point.metric_type == "counter":
+            kind = "counter"
+            name += "_total"
+        else:
+            kind = "gauge"
+        if name not in lines:
+            lines[name] = [f"# TYPE {name} {kind}"]
+        labels = ",".join(
+            f'{getattr(key, "value", key)}="{escape_label_value(value)}"'
+            for key, value in point.tags.items()
+        )
+        lines[name].append(f"{name}{{{labels}}} {point.value}")
+
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with open(tmp_path, "w") as prometheus_file:
+        for metric_lines in lines.values():
+            prometheus_file.write("\n".join(metric_lines) + "\n")
+    os.replace(tmp_path, path)
+
+
+def escape_label_value(value: Any) -> str:
+    """Escape a label value for the Prometheus text format."""
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
@@ -0,0 +1,102 @@
+"""Serialising Singer messages, written to stdout in batches or to BATCH files."""
+
+import gzip
+import sys
+from decimal import Decimal
+from typing import Any, Iterator, List
+from uuid import uuid4
+
+import simplejson
+from singer_sdk._singerlib import RecordMessage
+from singer_sdk.batch import BaseBatcher, lazy_chunked_generator
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _default(value: Any) -> str:
+    if isinstance(value, Decimal):
+        # Left to simplejson, which writes them as numbers like the SDK
+        raise TypeError("Decimal")
+    return str(value)
+
+
+def serialize(data: dict) -> bytes:
+    """Serialise a message or record into a line of JSON.
+
+    orjson is used when installed, with the tap-googleads[fast_json] extra.
+    Values it can't serialise fall back to simplejson, as used by the SDK.
+    """
+    if orjson is not None:
+        try:
+            return orjson.dumps(
+                data,
+                default=_default,
+                option=orjson.OPT_APPEND_NEWLINE | orjson.OPT_PASSTHROUGH_DATETIME,
+            )
+        except TypeError:
+            pass
+    line = simplejson.dumps(data, use_decimal=True, default=str) + "\n"
+    return line.encode("utf-8")
+
+
+class MessageWriter:
+    """Writes RECORD messages to stdout `batch_size` at a time.
+
+    Streams flush the writer before writing any other message, so that the
+    order of the messages is kept.
+    """
+
+    def __init__(self, batch_size: int = 1) -> None:
+        self.batch_size = max(batch_size, 1)
+        self._lines: List[bytes] = []
+
+    def write_record(self, message: RecordMessage) -> None:
+        """Buffer a RECORD message, writing the buffer once it is full."""
+        self._lines.append(serialize(message.to_dict()))
+        if len(self._lines) >= self.batch_size:
+            self.flush()
+
+    def flush(self) -> None:
+        """Write the buffered RECORD messages.
+
+        They are written to the binary buffer of stdout, once messages written
+        as text are flushed, or as text if stdout has no buffer.
+        """
+        if self._lines:
+            lines, self._lines = self._lines, []
+            buffer = getattr(sys.stdout, "buffer", None)
+            if buffer is None:
+                sys.stdout.write(b"".join(lines).decode("utf-8"))
+                sys.stdout.flush()
+            else:
+                sys.stdout.flush()
+                buffer.write(b"".join(lines))
+                buffer.flush()
+
+
+class JSONLinesBatcher(BaseBatcher):
+    """Writes records to JSON lines BATCH files with `serialize`.
+
+    Unlike the SDK's batcher, it leaves the files uncompressed unless the
+    encoding's compression is gzip.
+    """
+
+    def get_batches(self, records: Iterator[dict]) -> Iterator[List[str]]:
+        sync_id = f"{self.tap_name}--{self.stream_name}-{uuid4()}"
+        prefix = self.batch_config.storage.prefix or ""
+        compressed = self.batch_config.encoding.compression == "gzip"
+        chunks = lazy_chunked_generator(records, self.batch_config.batch_size)
+        for index, chunk in enumerate(chunks, start=1):
+            filename = f"{prefix}{sync_id}-{index}.json" + (".gz" if compressed else "")
+            with self.batch_config.storage.fs(create=True) as fs:
+                with fs.open(filename, "wb") as batch_file:
+                    if compressed:
+                        with gzip.GzipFile(fileobj=batch_file, mode="wb") as gz:
+                            gz.writelines(serialize(record) for record in chunk)
+                    else:
+                        batch_file.writelines(serialize(record) for record in chunk)
+                file_url = fs.geturl(filename)
+            yield [file_url]
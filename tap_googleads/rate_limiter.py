@@ -0,0 +1,139 @@
+"""Request rate limiting shared by every stream of the tap."""
+
+import re
+import threading
+import time
+from collections import deque
+from typing import Any, Optional
+
+import requests
+
+# Rate is halved on each 429 and grows back by this fraction per success
+THROTTLED_RATE_FACTOR = 0.5
+RECOVERY_RATE_FACTOR = 0.01
+MIN_RATE = 0.1
+# Requests of the last OBSERVED_WINDOW_SECONDS give the rate that hit the quota
+OBSERVED_WINDOW_SECONDS = 10.0
+
+_DURATION_RE = re.compile(r"^(\d+(?:\.\d+)?)s$")
+
+
+class AdaptiveRateLimiter:
+    """Token bucket throttling requests across threads.
+
+    The bucket starts at `max_rate` requests per second, or unlimited when it
+    is None. Each throttled request halves the rate, from the rate actually
+    observed if that is lower, and pauses every request until the retry delay
+    suggested by the server has passed. Each successful request then raises
+    the rate a little again, up to `max_rate`.
+    """
+
+    def __init__(self, max_rate: Optional[float] = None):
+        self.max_rate = max_rate
+        self.rate = max_rate
+        self._tokens = max(max_rate or 1.0, 1.0)
+        self._refilled_at = time.monotonic()
+        self._paused_until = 0.0
+        self._throttled_at = float("-inf")
+        self._sent: deque = deque()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """Block until a request may be sent and return the time it was allowed."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                wait = self._paused_until - now
+                if wait <= 0:
+                    wait = self._take_token(now)
+                    if wait <= 0:
+                        self._trim_sent(now)
+                        self._sent.append(now)
+                        return now
+            time.sleep(wait)
+
+    def _take_token(self, now: float) -> float:
+        if self.rate is None:
+            return 0
+        capacity = max(self.rate, 1.0)
+        elapsed = now - self._refilled_at
+        self._tokens = min(capacity, self._tokens + elapsed * self.rate)
+        self._refilled_at = now
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return 0
+        return (1 - self._tokens) / self.rate
+
+    def _trim_sent(self, now: float) -> None:
+        while self._sent and self._sent[0] < now - OBSERVED_WINDOW_SECONDS:
+            self._sent.popleft()
+
+    def _observed_rate(self, now: float) -> float:
+        self._trim_sent(now)
+        if not self._sent:
+            return MIN_RATE
+        return len(self._sent) / max(now - self._sent[0], 1.0)
+
+    def throttled(self, sent_at: float, retry_delay: Optional[float] = None) -> None:
+        """Slow down after a request was rejected for exceeding a rate limit.
+
+        Args:
+            sent_at: When the rejected request was allowed by `acquire`.
+                Requests sent before the last slow down don't slow it down
+                further, so a burst of concurrent 429s halves the rate once.
+            retry_delay: Seconds the server asked to wait before retrying.
+        """
+        with self._lock:
+            now = time.monotonic()
+            if retry_delay:
+                self._paused_until = max(self._paused_until, now + retry_delay)
+            if sent_at < self._throttled_at:
+                return
+            self._throttled_at = now
+            rate = self._observed_rate(now)
+            if self.rate is not None:
+                rate = min(rate, self.rate)
+            self.rate = max(rate * THROTTLED_RATE_FACTOR, MIN_RATE)
+            self._tokens = min(self._tokens, 1.0)
+
+    def succeeded(self) -> None:
+        """Speed up again after a request went through."""
+        with self._lock:
+            if self.rate is None:
+                return
+            self.rate += self.rate * RECOVERY_RATE_FACTOR
+            if self.max_rate is not None:
+                self.rate = min(self.rate, self.max_rate)
+
+
+def get_retry_delay(response: requests.Response) -> Optional[float]:
+    """Return the retry delay in seconds suggested by a rejected response.
+
+    Google Ads quota errors carry it as a `retryDelay` duration, such as
+    "30s", in the quota error details or in a google.rpc.RetryInfo detail.
+    The Retry-After header is used otherwise.
+    """
+    try:
+        delay = _find_retry_delay(response.json())
+    except ValueError:
+        delay = None
+    if delay is None and response.headers.get("Retry-After", "").isdigit():
+        delay = float(response.headers["Retry-After"])
+    return delay
+
+
+def _find_retry_delay(data: Any) -> Optional[float]:
+    if isinstance(data, list):
+        values = data
+    elif isinstance(data, dict):
+        match = _DURATION_RE.match(str(data.get("retryDelay", "")))
+        if match:
+            return float(match.group(1))
+        values = list(data.values())
+    else:
+        return None
+    for value in values:
+        delay = _find_retry_delay(value)
+        if delay is not None:
+            return delay
+    return None
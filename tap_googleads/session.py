@@ -0,0 +1,251 @@
+"""HTTP session shared by every stream of the tap."""
+
+import os
+import socket
+import ssl
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+import requests
+from requests.adapters import BaseAdapter, HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import (
+    DEFAULT_CA_BUNDLE_PATH,
+    get_encoding_from_headers,
+    select_proxy,
+)
+from urllib3.connection import HTTPConnection
+
+DEFAULT_POOL_SIZE = 10
+# Connection specific headers, which HTTP/2 doesn't allow
+HOP_BY_HOP_HEADERS = {"connection", "keep-alive", "proxy-connection", "upgrade"}
+
+
+class PooledHTTPAdapter(HTTPAdapter):
+    """HTTP/1.1 adapter keeping up to `pool_size` connections open per host."""
+
+    def __init__(self, pool_size: int, tcp_keepalive_seconds: Optional[int] = None):
+        self.socket_options = list(HTTPConnection.default_socket_options)
+        if tcp_keepalive_seconds:
+            # Probe idle connections so the pool doesn't hand out dead ones
+            self.socket_options.append((socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1))
+            if hasattr(socket, "TCP_KEEPIDLE"):
+                self.socket_options.append(
+                    (socket.IPPROTO_TCP, socket.TCP_KEEPIDLE, tcp_keepalive_seconds)
+                )
+        super().__init__(pool_connections=pool_size, pool_maxsize=pool_size)
+
+    def init_poolmanager(self, *args: Any, **kwargs: Any) -> None:
+        kwargs["socket_options"] = self.socket_options
+        super().init_poolmanager(*args, **kwargs)
+
+    def connection_stats(self) -> Dict[str, int]:
+        """Return the number of requests sent and of connections opened."""
+        stats = {"requests": 0, "connections": 0}
+        pools = self.poolmanager.pools
+        for key in pools.keys():
+            pool = pools.get(key)
+            if pool is not None:
+                stats["requests"] += pool.num_requests
+                stats["connections"] += pool.num_connections
+        return stats
+
+
+class HTTP2Adapter(BaseAdapter):
+    """Adapter sending requests over HTTP/2 with httpx.
+
+    Concurrent requests to a host are multiplexed over a single connection.
+    Connections are kept per TLS verification, client certificate and proxy,
+    as requests passes them to each request. httpx errors are raised as
+    their requests counterpart, so they are retried like those of the
+    default adapter. Needs the optional `httpx[http2]` dependency.
+    """
+
+    def __init__(self, pool_size: int):
+        super().__init__()
+        try:
+            import httpx
+        except ImportError as e:
+            raise ImportError(
+                "use_http2 needs httpx, install tap-googleads[http2]"
+            ) from e
+        self._httpx = httpx
+        self.pool_size = pool_size
+        self._clients: Dict[Tuple[Any, Any, Optional[str]], Any] = {}
+        self._lock = threading.Lock()
+        self._requests = 0
+        self._connections: set = set()
+
+    def _get_client(self, verify: Any, cert: Any, proxy: Optional[str]) -> Any:
+        key = (verify, tuple(cert) if isinstance(cert, list) else cert, proxy)
+        with self._lock:
+            client = self._clients.get(key)
+            if client is None:
+                transport = self._httpx.HTTPTransport(
+                    http2=True,
+                    verify=_ssl_context(verify, cert),
+                    # A Proxy rather than a URL, which httpx only takes from 0.26
+                    proxy=self._httpx.Proxy(proxy) if proxy else None,
+                    limits=self._httpx.Limits(
+                        max_connections=self.pool_size,
+                        max_keepalive_connections=self.pool_size,
+                    ),
+                )
+                # requests already applied the environment's proxies and CA bundle
+                client = self._clients[key] = self._httpx.Client(
+                    transport=transport, trust_env=False
+                )
+            return client
+
+    def send(
+        self,
+        request: requests.PreparedRequest,
+        stream: bool = False,
+        timeout: Any = None,
+        verify: Any = True,
+        cert: Any = None,
+        proxies: Any = None,
+    ) -> requests.Response:
+        if isinstance(timeout, tuple):
+            connect_timeout, read_timeout = timeout
+            timeout = self._httpx.Timeout(read_timeout, connect=connect_timeout)
+        client = self._get_client(verify, cert, select_proxy(request.url, proxies))
+        http2_request = client.build_request(
+            request.method,
+            request.url,
+            headers={
+                name: value
+                for name, value in request.headers.items()
+                if name.lower() not in HOP_BY_HOP_HEADERS
+            },
+            content=request.body,
+            timeout=timeout,
+        )
+        with _raise_as_requests_error(self._httpx, request):
+            http2_response = client.send(http2_request, stream=True)
+        with self._lock:
+            self._requests += 1
+            self._connections.add(http2_response.extensions.get("network_stream"))
+
+        response = requests.Response()
+        response.status_code = http2_response.status_code
+        response.reason = http2_response.reason_phrase
+        response.headers = CaseInsensitiveDict(http2_response.headers)
+        response.encoding = get_encoding_from_headers(response.headers)
+        response.raw = _HTTP2Body(self._httpx, http2_response, request)
+        response.url = request.url
+        response.request = request
+        response.connection = self
+        return response
+
+    def close(self) -> None:
+        with self._lock:
+            for client in self._clients.values():
+                client.close()
+            self._clients.clear()
+
+    def connection_stats(self) -> Dict[str, int]:
+        """Return the number of requests sent and of connections opened."""
+        with self._lock:
+            return {"requests": self._requests, "connections": len(self._connections)}
+
+
+class _HTTP2Body:
+    """The `raw` body of a response received by HTTP2Adapter."""
+
+    def __init__(self, httpx: Any, response: Any, request: requests.PreparedRequest):
+        self._httpx = httpx
+        self._response = response
+        self._request = request
+
+    def stream(self, chunk_size: int, decode_content: bool = True):
+        with _raise_as_requests_error(self._httpx, self._request, reading_body=True):
+            yield from self._response.iter_bytes(chunk_size)
+
+    def close(self) -> None:
+        self._response.close()
+
+
+def _ssl_context(verify: Any, cert: Any) -> ssl.SSLContext:
+    """Return the SSL context of requests' `verify` and `cert` arguments."""
+    if isinstance(verify, str):
+        if os.path.isdir(verify):
+            context = ssl.create_default_context(capath=verify)
+        else:
+            context = ssl.create_default_context(cafile=verify)
+    else:
+        context = ssl.create_default_context(cafile=DEFAULT_CA_BUNDLE_PATH)
+        if not verify:
+            context.check_hostname = False
+            context.verify_mode = ssl.CERT_NONE
+    if isinstance(cert, str):
+        context.load_cert_chain(cert)
+    elif cert:
+        context.load_cert_chain(*cert)
+    return context
+
+
+@contextmanager
+def _raise_as_requests_error(
+    httpx: Any, request: requests.PreparedRequest, reading_body: bool = False
+) -> Iterator[None]:
+    """Raise httpx errors as the requests exceptions HTTPAdapter would raise.
+
+    Arguments:
+        httpx: The httpx module.
+        request: The request being sent, attached to the exceptions.
+        reading_body: Whether the response body is being read, whose errors
+            requests raises as ConnectionError and ChunkedEncodingError.
+    """
+    try:
+        yield
+    except httpx.TimeoutException as e:
+        if reading_body:
+            raise requests.exceptions.ConnectionError(e, request=request) from e
+        if isinstance(e, httpx.ConnectTimeout):
+            raise requests.exceptions.ConnectTimeout(e, request=request) from e
+        raise requests.exceptions.ReadTimeout(e, request=request) from e
+    except httpx.ProxyError as e:
+        raise requests.exceptions.ProxyError(e, request=request) from e
+    except httpx.DecodingError as e:
+        raise requests.exceptions.ContentDecodingError(e, request=request) from e
+    except (httpx.NetworkError, httpx.ProtocolError) as e:
+        if reading_body and not isinstance(e, httpx.ConnectError):
+            raise requests.exceptions.ChunkedEncodingError(e, request=request) from e
+        raise requests.exceptions.ConnectionError(e, request=request) from e
+
+
+def build_session(config: dict) -> requests.Session:
+    """Return a session whose connections are reused by every stream.
+
+    Arguments:
+        config: The tap config.
+
+    Returns:
+        A session sending requests through a `PooledHTTPAdapter`, or through
+        an `HTTP2Adapter` when `use_http2` is set.
+    """
+    concurrency = config.get("max_concurrent_customers", 1) * config.get(
+        "max_concurrent_streams", 1
+    )
+    pool_size = config.get("http_pool_size") or max(DEFAULT_POOL_SIZE, concurrency)
+    adapter: BaseAdapter
+    if config.get("use_http2"):
+        adapter = HTTP2Adapter(pool_size)
+    else:
+        adapter = PooledHTTPAdapter(pool_size, config.get("tcp_keepalive_seconds"))
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def get_connection_stats(session: requests.Session) -> Dict[str, int]:
+    """Return requests sent, connections opened and connection reuses of a session."""
+    stats = {"requests": 0, "connections": 0}
+    for adapter in set(session.adapters.values()):
+        for key, value in adapter.connection_stats().items():
+            stats[key] += value
+    stats["reused"] = stats["requests"] - stats["connections"]
+    return stats
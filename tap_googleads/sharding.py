@@ -0,0 +1,92 @@
+"""Splitting customers across tap invocations, and merging their states.
+
+Each of `shard_count` invocations of the tap, given its own `shard_index`,
+syncs a disjoint set of customers. As every shard starts from the merged
+state of the previous run, its state also holds the partitions of the other
+shards' customers, as they were then. The states, given in shard order,
+merge into one state by taking each customer's partition from the shard
+syncing it, which every shard can then start from on the next run:
+
+    python -m tap_googleads.sharding state-0.json state-1.json > state.json
+"""
+
+import argparse
+import json
+from typing import Any, Dict, List, Set, Tuple
+
+from tap_googleads.utils import context_key
+
+
+def get_shard(customer_id: Any, shard_count: int) -> int:
+    """Return the index of the shard syncing a customer."""
+    return int(customer_id) % shard_count
+
+
+def merge_states(states: List[dict]) -> dict:
+    """Merge the states written by the shards of a sync.
+
+    Partitions of a customer are taken from the state of the shard syncing
+    it. Partitions that shard's state doesn't hold, such as those of
+    customers that left the hierarchy, or without a customer, are taken from
+    the state furthest ahead. Other bookmark values are taken from the first
+    state holding them, i.e. from shard 0 for geo_target_constant.
+
+    Arguments:
+        states: The states to merge, that of shard 0 first.
+
+    Returns:
+        The merged state.
+    """
+    bookmarks: Dict[str, dict] = {}
+    owned: Set[Tuple[str, str]] = set()
+    for shard_index, state in enumerate(states):
+        for stream_name, stream_state in state.get("bookmarks", {}).items():
+            merged = bookmarks.setdefault(stream_name, {})
+            for key, value in stream_state.items():
+                if key != "partitions":
+                    merged.setdefault(key, value)
+
+            partitions = {
+                context_key(partition.get("context")): partition
+                for partition in merged.get("partitions", [])
+            }
+            for partition in stream_state.get("partitions", []):
+                key = context_key(partition.get("context"))
+                client_id = (partition.get("context") or {}).get("client_id")
+                if (
+                    client_id is not None
+                    and get_shard(client_id, len(states)) == shard_index
+                ):
+                    partitions[key] = partition
+                    owned.add((stream_name, key))
+                elif (stream_name, key) not in owned and (
+                    key not in partitions or _is_ahead(partition, partitions[key])
+                ):
+                    partitions[key] = partition
+            if partitions:
+                merged["partitions"] = list(partitions.values())
+    return {"bookmarks": bookmarks}
+
+
+def _is_ahead(partition: dict, other: dict) -> bool:
+    value = partition.get("replication_key_value")
+    other_value = other.get("replication_key_value")
+    return value is not None and (other_value is None or value > other_value)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Merge the states of tap shards.")
+    parser.add_argument(
+        "states", nargs="+", help="state JSON files, that of shard 0 first"
+    )
+    args = parser.parse_args()
+
+    states = []
+    for path in args.states:
+        with open(path) as state_file:
+            states.append(json.load(state_file))
+    print(json.dumps(merge_states(states), indent=2))
+
+
+if __name__ == "__main__":
+    main()
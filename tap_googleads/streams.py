@@ -1,14 +1,36 @@
 """Stream type classes for tap-googleads."""
 
+import hashlib
+from concurrent.futures import Executor, ThreadPoolExecutor
 from pathlib import Path
-from typing import Any, Dict, Optional, Iterable
-from datetime import datetime
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Iterable, Set, Tuple
+from datetime import date, datetime, timedelta, timezone
 
 from singer_sdk import typing as th  # JSON Schema typing helpers
-
-from tap_googleads.client import GoogleAdsStream
+from singer_sdk.helpers._state import get_state_if_exists
+
+from tap_googleads.cache import JSONLinesCache
+from tap_googleads.client import (
+    CustomerNotEnabledError,
+    GoogleAdsStream,
+    SharedQuery,
+)
+from tap_googleads.dormancy import DEFAULT_DORMANT_SWEEP_DAYS, LAST_SYNCED_AT_KEY
+from tap_googleads.sharding import get_shard
+from tap_googleads.utils import (
+    context_key,
+    floor_date,
+    iter_date_windows,
+    parse_gaql,
+)
 
 SCHEMAS_DIR = Path(__file__).parent / Path("./schemas")
+DEFAULT_LOOKBACK_WINDOW_DAYS = 14
+DEFAULT_GEOTARGETS_CACHE_TTL_DAYS = 30
+# Bumped whenever the rows cached for the hierarchy change, e.g. once nested
+# managers were walked and each row got its login_customer_id
+HIERARCHY_CACHE_REVISION = 2
 
 
 class AccessibleCustomers(GoogleAdsStream):
@@ -50,12 +72,32 @@ class CustomerHierarchyStream(GoogleAdsStream):
     parent_stream_type = AccessibleCustomers
     schema_filepath = SCHEMAS_DIR / "customer_hierarchy.json"
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # (child stream, customer) pairs prefetching, synced oldest first
+        self._child_jobs: Deque[Tuple[GoogleAdsStream, dict]] = deque()
+        self._child_executor: Optional[ThreadPoolExecutor] = None
+
+    @property
+    def max_concurrent_customers(self) -> int:
+        return self.config.get("max_concurrent_customers", 1)
+
+    @property
+    def max_concurrent_jobs(self) -> int:
+        """Number of (child stream, customer) pairs fetched in parallel."""
+        return self.max_concurrent_customers * self.config.get(
+            "max_concurrent_streams", 1
+        )
+
     def get_url_params(
         self, context: Optional[dict], next_page_token: Optional[Any]
     ) -> Dict[str, Any]:
         params = super().get_url_params(context, next_page_token)
+        if self.use_search_stream:
+            # searchStream takes the query in the body and has no pages
+            return params
         params["pageSize"] = "10000"
-        params["query"] = self.gaql
+        params["query"] = self.get_gaql(context)
         return params
 
     @property
@@ -72,12 +114,31 @@ class CustomerHierarchyStream(GoogleAdsStream):
             WHERE customer_client.level <= 1
             """
 
+    @property
+    def cache(self) -> Optional[JSONLinesCache]:
+        """On-disk copy of the hierarchy, None unless hierarchy caching is enabled."""
+        ttl_hours = self.config.get("hierarchy_cache_ttl_hours")
+        if self.cache_dir is None or not ttl_hours:
+            return None
+        gaql_hash = hashlib.sha1(self.gaql.encode("utf-8")).hexdigest()[:12]
+        login_customer_id = self.config["login_customer_id"]
+        return JSONLinesCache(
+            self.cache_dir / f"{self.name}_{login_customer_id}.jsonl",
+            version=f"{self.api_version}:{gaql_hash}:{HIERARCHY_CACHE_REVISION}",
+            ttl_seconds=ttl_hours * 60 * 60,
+        )
+
     # Goal of this stream is to send to children stream a dict of
     # login-customer-id:customer-id to query for all queries downstream
     def get_records(self, context: Optional[dict]) -> Iterable[Dict[str, Any]]:
         """Return a generator of row-type dictionary objects.
 
         Each row emitted should be a dictionary of property names to their values.
+        When hierarchy caching is enabled the customers come from the cache
+        while it is fresh, and customers that turned out not to be enabled are
+        evicted from it once the child streams are synced. With
+        `max_concurrent_jobs` above 1, child streams are fetched by a pool of
+        workers as customers are found, see `_sync_children`.
 
         Args:
             context: Stream partition or context dictionary.
@@ -85,26 +146,168 @@ class CustomerHierarchyStream(GoogleAdsStream):
         Yields:
             One item per (possibly processed) record in the API.
         """
-        client_ids = []
+        self._plan_shared_queries()
+        cache = self.cache
+        if self.max_concurrent_jobs > 1:
+            self._child_executor = ThreadPoolExecutor(
+                max_workers=self.max_concurrent_jobs
+            )
+        try:
+            for row in self._read_customers(context, cache):
+                if self.in_shard(row["customerClient"]["id"]):
+                    yield row
+            self._sync_child_jobs(keep=0)
+        finally:
+            self._close_child_executor()
+        if cache is not None:
+            self._evict_customers_not_enabled(cache)
+
+    def _read_customers(
+        self, context: Optional[dict], cache: Optional[JSONLinesCache]
+    ) -> Iterable[Dict[str, Any]]:
+        if cache is None:
+            yield from self._request_customers(context)
+        elif cache.is_fresh() and not self.config.get("refresh_hierarchy_cache"):
+            self.logger.info("Reading %s from cache %s", self.name, cache.path)
+            yield from list(cache.read())
+        else:
+            with cache.writer() as write:
+                for row in self._request_customers(context):
+                    write(row)
+                    yield row
+
+    def in_shard(self, customer_id: Any) -> bool:
+        """Whether this invocation of the tap syncs the customer, see sharding."""
+        shard_count = self.config.get("shard_count", 1)
+        return get_shard(customer_id, shard_count) == self.config.get("shard_index", 0)
+
+    def _request_customers(self, context: Optional[dict]) -> Iterable[Dict[str, Any]]:
+        """Walk the manager hierarchy and yield every client account under it.
+
+        Each level of sub-managers is expanded with up to
+        `max_concurrent_customers` concurrent queries, using the root manager as
+        login-customer-id. Clients reachable through several managers are
+        yielded once.
+        """
         if self.config["login_customer_id"]:
-            client_ids = [self.config["login_customer_id"]]
+            roots = [self.config["login_customer_id"]]
         else:
-            # TODO when implementing this the headers need to be set properly
-            client_ids = context["resourceNames"]
-
-        for client in client_ids:
-            client_id = client.split("/")[-1]
-            context["client_id"] = client_id
-            for row in self.request_records(context):
-                row = self.post_process(row, context)
-                # Don't search Manager accounts as we can't query them for everything
-                if row["customerClient"]["manager"] is True:
-                    continue
-                yield row
+            roots = [client.split("/")[-1] for client in context["resourceNames"]]
+
+        expanded = set(roots)
+        emitted: Set[str] = set()
+        managers = [(root, root) for root in roots]
+        with ThreadPoolExecutor(max_workers=self.max_concurrent_customers) as executor:
+            while managers:
+                results = executor.map(
+                    lambda manager: self._request_client_links(*manager), managers
+                )
+                next_managers = []
+                for (_, login_customer_id), rows in zip(managers, results):
+                    for row in rows:
+                        client_id = str(row["customerClient"]["id"])
+                        # Don't search Manager accounts as we can't query them for
+                        # everything, expand them instead
+                        if row["customerClient"]["manager"] is True:
+                            if client_id not in expanded:
+                                expanded.add(client_id)
+                                next_managers.append((client_id, login_customer_id))
+                        elif client_id not in emitted:
+                            emitted.add(client_id)
+                            row["login_customer_id"] = login_customer_id
+                            yield row
+                managers = next_managers
+
+    def _request_client_links(
+        self, customer_id: str, login_customer_id: str
+    ) -> List[Dict[str, Any]]:
+        context = {"client_id": customer_id, "login_customer_id": login_customer_id}
+        try:
+            return [
+                self.post_process(row, context) for row in self.request_records(context)
+            ]
+        except CustomerNotEnabledError as e:
+            self._handle_customer_not_enabled(context, e)
+            return []
+
+    def _plan_shared_queries(self) -> None:
+        """Give selected child streams that can share their queries a SharedQuery.
+
+        Streams are grouped when they query the same resource with the same
+        segments, see `GAQLQuery.shape`. Their filters are compared for each
+        customer by the SharedQuery itself.
+        """
+        for child_stream in self.child_streams:
+            child_stream.shared_query = None
+        if not self.config.get("share_report_queries"):
+            return
+
+        groups: Dict[tuple, List[GoogleAdsStream]] = {}
+        for child_stream in self.child_streams:
+            if child_stream.selected and child_stream.is_search_query:
+                resource, segments, has_metrics, _ = parse_gaql(
+                    child_stream.get_selected_gaql(None)
+                ).shape
+                key = (child_stream.path, resource, segments, has_metrics)
+                groups.setdefault(key, []).append(child_stream)
+
+        for streams in groups.values():
+            if len(streams) > 1:
+                self.logger.info(
+                    "Sharing queries between streams %s", [s.name for s in streams]
+                )
+                shared_query = SharedQuery(streams)
+                for stream in streams:
+                    stream.shared_query = shared_query
+
+    def _evict_customers_not_enabled(self, cache: JSONLinesCache) -> None:
+        not_enabled: Set[str] = set()
+        for child_stream in self.child_streams:
+            not_enabled.update(child_stream.customers_not_enabled)
+        if not_enabled and cache.path.exists():
+            self.logger.info("Evicting customers %s from %s", not_enabled, cache.path)
+            cache.remove(lambda row: str(row["customerClient"]["id"]) in not_enabled)
 
     def get_child_context(self, record: dict, context: Optional[dict]) -> dict:
         """Return a context dictionary for child streams."""
-        return {"client_id": record["customerClient"]["id"]}
+        child_context = {"client_id": record["customerClient"]["id"]}
+        login_customer_id = record.get("login_customer_id")
+        if login_customer_id and login_customer_id != self.config["login_customer_id"]:
+            child_context["login_customer_id"] = login_customer_id
+        return child_context
+
+    def _sync_children(self, child_context: Optional[dict]) -> None:
+        """Sync the child streams of a customer, fetching them ahead on workers.
+
+        With `max_concurrent_jobs` above 1, the customer's child streams start
+        fetching on the pool as soon as it is found. The oldest (child stream,
+        customer) pairs are then synced on this thread, in customer order so
+        Singer messages stay ordered, until at most `max_concurrent_jobs` are
+        left fetching ahead.
+        """
+        if self._child_executor is None or child_context is None:
+            super()._sync_children(child_context)
+            return
+        for child_stream in self.child_streams:
+            if child_stream.selected or child_stream.has_selected_descendents:
+                child_stream.prefetch_records(child_context, self._child_executor)
+                self._child_jobs.append((child_stream, child_context))
+        self._sync_child_jobs(keep=self.max_concurrent_jobs)
+
+    def _sync_child_jobs(self, keep: int) -> None:
+        while len(self._child_jobs) > keep:
+            child_stream, child_context = self._child_jobs.popleft()
+            child_stream.sync(context=child_context)
+
+    def _close_child_executor(self) -> None:
+        executor, self._child_executor = self._child_executor, None
+        if executor is None:
+            return
+        # Otherwise workers blocked on unread records would never exit
+        self._child_jobs.clear()
+        for child_stream in self.child_streams:
+            child_stream.cancel_prefetches()
+        executor.shutdown(wait=True)
 
 
 class GeotargetsStream(GoogleAdsStream):
@@ -125,8 +328,11 @@ class GeotargetsStream(GoogleAdsStream):
         self, context: Optional[dict], next_page_token: Optional[Any]
     ) -> Dict[str, Any]:
         params = super().get_url_params(context, next_page_token)
+        if self.use_search_stream:
+            # searchStream takes the query in the body and has no pages
+            return params
         params["pageSize"] = "10000"
-        params["query"] = self.gaql
+        params["query"] = self.get_gaql(context)
         return params
 
     gaql = """
@@ -139,18 +345,133 @@ class GeotargetsStream(GoogleAdsStream):
         FROM geo_target_constant
     """
 
+    @property
+    def cache(self) -> Optional[JSONLinesCache]:
+        """On-disk copy of the stream, None unless cache_dir is set.
+
+        The cache is versioned on the API version and the query, so upgrading
+        either refreshes it.
+        """
+        if self.cache_dir is None:
+            return None
+        gaql_hash = hashlib.sha1(self.gaql.encode("utf-8")).hexdigest()[:12]
+        ttl_days = self.config.get(
+            "geotargets_cache_ttl_days", DEFAULT_GEOTARGETS_CACHE_TTL_DAYS
+        )
+        return JSONLinesCache(
+            self.cache_dir / f"{self.name}.jsonl",
+            version=f"{self.api_version}:{gaql_hash}",
+            ttl_seconds=ttl_days * 24 * 60 * 60,
+        )
+
+    @property
+    def synced_by_shard(self) -> bool:
+        """Geotargets don't belong to any customer, so only the first shard syncs them."""
+        return self.config.get("shard_index", 0) == 0
+
+    def prefetch_records(self, context: Optional[dict], executor: Executor) -> None:
+        cache = self.cache
+        if self.synced_by_shard and (cache is None or not cache.is_fresh()):
+            super().prefetch_records(context, executor)
+
+    def get_records(self, context: Optional[dict]) -> Iterable[Dict[str, Any]]:
+        cache = self.cache
+        if not self.synced_by_shard:
+            self.logger.info("Skipping %s, synced by shard 0", self.name)
+        elif cache is None:
+            yield from super().get_records(context)
+        elif cache.is_fresh():
+            self.logger.info("Reading %s from cache %s", self.name, cache.path)
+            yield from cache.read()
+        else:
+            with cache.writer() as write:
+                for record in super().get_records(context):
+                    write(record)
+                    yield record
+
 
 class ReportsStream(GoogleAdsStream):
     rest_method = "POST"
     parent_stream_type = CustomerHierarchyStream
     path = "/customers/{client_id}/googleAds:search"
+    select_catalog_fields = True
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Contexts of dormant customers this run skips, see skip_dormant_customers
+        self._dormant_skips: Set[str] = set()
+
+    @property
+    def skips_dormant_customers(self) -> bool:
+        """Whether dormant customers may be skipped, see `tap_googleads.dormancy`.
+
+        Only incremental streams querying metrics are skipped, as their rows
+        are only returned for days with activity.
+        """
+        if not self.config.get("skip_dormant_customers"):
+            return False
+        if not self.replication_key_jsonpath:
+            return False
+        query = parse_gaql(self.get_selected_gaql(None))
+        return any(field.startswith("metrics.") for field in query.fields)
+
+    def is_dormant(self, context: Optional[dict]) -> bool:
+        """Return whether the stream can skip the customer of `context`.
+
+        The customer must have had no impressions within the dormant window,
+        and the stream must have synced the customer in the last
+        `dormant_sweep_days`, late enough that every date it could have missed
+        since, lookback window included, lies within the dormant window. The
+        bookmark itself doesn't move while the customer is dormant. Only reads
+        state, as it runs on prefetching threads.
+        """
+        if not context or "client_id" not in context:
+            return False
+        last_synced_at = get_state_if_exists(
+            self.tap_state,
+            self.name,
+            state_partition_context=self._get_state_partition_context(context),
+            key=LAST_SYNCED_AT_KEY,
+        )
+        sweep_days = self.config.get("dormant_sweep_days", DEFAULT_DORMANT_SWEEP_DAYS)
+        sweep_after = datetime.now(timezone.utc) - timedelta(days=sweep_days)
+        if not last_synced_at or last_synced_at < sweep_after.isoformat():
+            return False
+        activity = self._tap.customer_activity
+        lookback = timedelta(
+            days=self.config.get("lookback_window_days", DEFAULT_LOOKBACK_WINDOW_DAYS)
+        )
+        if datetime.fromisoformat(last_synced_at).date() - lookback < (
+            activity.window_start
+        ):
+            return False
+        return activity.is_dormant(self, context)
+
+    def get_records(self, context: Optional[dict]) -> Iterable[Dict[str, Any]]:
+        """Return the records of `context`, see `GoogleAdsStream.get_records`.
+
+        With `skip_dormant_customers`, the time of every sync that wasn't
+        skipped is kept in the customer's state.
+        """
+        yield from super().get_records(context)
+        key = context_key(context)
+        if key in self._dormant_skips:
+            self._dormant_skips.discard(key)
+        elif self.skips_dormant_customers and not self._is_customer_not_enabled(
+            context
+        ):
+            state = self.get_context_state(context)
+            state[LAST_SYNCED_AT_KEY] = datetime.now(timezone.utc).isoformat()
 
     def get_url_params(
         self, context: Optional[dict], next_page_token: Optional[Any]
     ) -> Dict[str, Any]:
         params = super().get_url_params(context, next_page_token)
+        if self.use_search_stream:
+            # searchStream takes the query in the body and has no pages
+            return params
         params["pageSize"] = "10000"
-        params["query"] = self.gaql
+        params["query"] = self.get_query(context)
         return params
 
     @property
@@ -173,14 +494,70 @@ class ReportsStream(GoogleAdsStream):
         )
         return format_date
 
-    @property
-    def between_filter(self):
-        return f"BETWEEN '{self.start_date}' AND '{self.end_date}'"
+    def get_start_date(self, context: Optional[dict]) -> str:
+        """Return the first date to query for the given context.
+
+        Incremental streams restart from the customer's bookmark, less the
+        lookback window so that restated conversions are pulled again, but
+        never before start_date. With a week or month `date_granularity`, the
+        date is moved back to the first day of its period.
+        """
+        start_date = self.start_date
+        bookmark = self.get_bookmark(context)
+        if bookmark:
+            lookback = timedelta(
+                days=self.config.get(
+                    "lookback_window_days", DEFAULT_LOOKBACK_WINDOW_DAYS
+                )
+            )
+            restart_date = datetime.strptime(bookmark, "%Y-%m-%d") - lookback
+            start_date = max(start_date, restart_date.strftime("%Y-%m-%d"))
+        # Rows rolled up by week or month cover whole periods
+        return floor_date(
+            date.fromisoformat(start_date), self.date_granularity
+        ).isoformat()
+
+    def get_request_contexts(self, context: Optional[dict]) -> List[Optional[dict]]:
+        """Split the date range of date filtered streams into date_window_size windows.
+
+        Each window is queried on its own, oldest first, with its range in the
+        `start_date` and `end_date` keys of the request context. Dormant
+        customers, see `is_dormant`, aren't queried at all.
+        """
+        if self.skips_dormant_customers and self.is_dormant(context):
+            self.logger.info("Skipping %s of dormant customer %s", self.name, context)
+            self._dormant_skips.add(context_key(context))
+            return []
+        window_size = self.config.get("date_window_size")
+        if not window_size or not self.replication_key_jsonpath:
+            return super().get_request_contexts(context)
+        if self.date_granularity != "day":
+            # Rows rolled up by week or month mustn't be split across windows
+            window_size = self.date_granularity
+
+        start = date.fromisoformat(self.get_start_date(context))
+        end = date.fromisoformat(self.end_date)
+        return [
+            {
+                **(context or {}),
+                "start_date": window_start.isoformat(),
+                "end_date": window_end.isoformat(),
+            }
+            for window_start, window_end in iter_date_windows(start, end, window_size)
+        ]
+
+    def get_between_filter(self, context: Optional[dict]) -> str:
+        if context and "start_date" in context:
+            return f"BETWEEN '{context['start_date']}' AND '{context['end_date']}'"
+        return f"BETWEEN '{self.get_start_date(context)}' AND '{self.end_date}'"
 
 
 class CampaignsStream(ReportsStream):
     """Define custom stream."""
 
+    supports_change_detection = True
+    change_status_resource_type = "CAMPAIGN"
+
     @property
     def gaql(self):
         return """
@@ -201,6 +578,9 @@ class CampaignsStream(ReportsStream):
 class AdGroupsStream(ReportsStream):
     """Define custom stream."""
 
+    supports_change_detection = True
+    change_status_resource_type = "AD_GROUP"
+
     @property
     def gaql(self):
         return """
@@ -244,8 +624,7 @@ class AdGroupsStream(ReportsStream):
 class AdGroupsPerformance(ReportsStream):
     """AdGroups Performance"""
 
-    @property
-    def gaql(self) -> str:
+    def get_gaql(self, context: Optional[dict]) -> str:
         return f"""
         SELECT campaign.id
              , ad_group.id
@@ -254,22 +633,22 @@ class AdGroupsPerformance(ReportsStream):
              , metrics.cost_micros
              , segments.date
         FROM ad_group
-        WHERE segments.date {self.between_filter}
+        WHERE segments.date {self.get_between_filter(context)}
         """
 
     records_jsonpath = "$.results[*]"
     name = "ad_group_performance"
     primary_keys_jsonpaths = ["campaign.resourceName", "adGroup.id", "segments.date"]
     primary_keys = ["_sdc_primary_key"]
-    replication_key = None
+    replication_key = "segments_date"
+    replication_key_jsonpath = "segments.date"
     schema_filepath = SCHEMAS_DIR / "ad_group_performance.json"
 
 
 class CampaignPerformance(ReportsStream):
     """Campaign Performance"""
 
-    @property
-    def gaql(self) -> str:
+    def get_gaql(self, context: Optional[dict]) -> str:
         return f"""
             SELECT campaign.id
                  , campaign.name
@@ -287,22 +666,22 @@ class CampaignPerformance(ReportsStream):
                  , metrics.average_cpc
                  , metrics.cost_micros 
             FROM campaign 
-            WHERE segments.date {self.between_filter}
+            WHERE segments.date {self.get_between_filter(context)}
             """
 
     records_jsonpath = "$.results[*]"
     name = "campaign_performance"
     primary_keys_jsonpaths = ["campaign.resourceName", "segments.date"]
     primary_keys = ["_sdc_primary_key"]
-    replication_key = None
+    replication_key = "segments_date"
+    replication_key_jsonpath = "segments.date"
     schema_filepath = SCHEMAS_DIR / "campaign_performance.json"
 
 
 class CampaignPerformanceByAgeRangeAndDevice(ReportsStream):
     """Campaign Performance By Age Range and Device"""
 
-    @property
-    def gaql(self) -> str:
+    def get_gaql(self, context: Optional[dict]) -> str:
         return f"""
             SELECT ad_group_criterion.age_range.type
                  , campaign.name
@@ -321,7 +700,7 @@ class CampaignPerformanceByAgeRangeAndDevice(ReportsStream):
                  , metrics.cost_micros
                  , campaign.advertising_channel_type 
             FROM age_range_view 
-            WHERE segments.date {self.between_filter}
+            WHERE segments.date {self.get_between_filter(context)}
            """
 
     records_jsonpath = "$.results[*]"
@@ -334,15 +713,15 @@ class CampaignPerformanceByAgeRangeAndDevice(ReportsStream):
         "segments.date",
     ]
     primary_keys = ["_sdc_primary_key"]
-    replication_key = None
+    replication_key = "segments_date"
+    replication_key_jsonpath = "segments.date"
     schema_filepath = SCHEMAS_DIR / "campaign_performance_by_age_range_and_device.json"
 
 
 class CampaignPerformanceByGenderAndDevice(ReportsStream):
     """Campaign Performance By Age Range and Device"""
 
-    @property
-    def gaql(self) -> str:
+    def get_gaql(self, context: Optional[dict]) -> str:
         return f"""
             SELECT ad_group_criterion.gender.type
                  , campaign.name
@@ -361,7 +740,7 @@ class CampaignPerformanceByGenderAndDevice(ReportsStream):
                  , metrics.cost_micros
                  , campaign.advertising_channel_type 
             FROM gender_view 
-            WHERE segments.date {self.between_filter}
+            WHERE segments.date {self.get_between_filter(context)}
         """
 
     records_jsonpath = "$.results[*]"
@@ -374,15 +753,15 @@ class CampaignPerformanceByGenderAndDevice(ReportsStream):
         "segments.date",
     ]
     primary_keys = ["_sdc_primary_key"]
-    replication_key = None
+    replication_key = "segments_date"
+    replication_key_jsonpath = "segments.date"
     schema_filepath = SCHEMAS_DIR / "campaign_performance_by_gender_and_device.json"
 
 
 class CampaignPerformanceByLocation(ReportsStream):
     """Campaign Performance By Age Range and Device"""
 
-    @property
-    def gaql(self) -> str:
+    def get_gaql(self, context: Optional[dict]) -> str:
         return f"""
             SELECT campaign_criterion.location.geo_target_constant
                  , campaign.name
@@ -395,7 +774,7 @@ class CampaignPerformanceByLocation(ReportsStream):
                  , metrics.average_cpc
                  , metrics.cost_micros 
             FROM location_view 
-            WHERE segments.date {self.between_filter}
+            WHERE segments.date {self.get_between_filter(context)}
               AND campaign_criterion.status != 'REMOVED'
                 """
 
@@ -407,15 +786,15 @@ class CampaignPerformanceByLocation(ReportsStream):
         "segments.date",
     ]
     primary_keys = ["_sdc_primary_key"]
-    replication_key = None
+    replication_key = "segments_date"
+    replication_key_jsonpath = "segments.date"
     schema_filepath = SCHEMAS_DIR / "campaign_performance_by_location.json"
 
 
 class ConversionsByLocation(ReportsStream):
     """Conversions By Location"""
 
-    @property
-    def gaql(self) -> str:
+    def get_gaql(self, context: Optional[dict]) -> str:
         return f"""
             SELECT campaign_criterion.location.geo_target_constant
                  , campaign.name
@@ -425,7 +804,7 @@ class ConversionsByLocation(ReportsStream):
                  , segments.conversion_action_category
                  , metrics.conversions 
             FROM location_view 
-            WHERE segments.date {self.between_filter}
+            WHERE segments.date {self.get_between_filter(context)}
               AND campaign_criterion.status != 'REMOVED'
             """
 
@@ -437,13 +816,16 @@ class ConversionsByLocation(ReportsStream):
         "segments.date",
     ]
     primary_keys = ["_sdc_primary_key"]
-    replication_key = None
+    replication_key = "segments_date"
+    replication_key_jsonpath = "segments.date"
     schema_filepath = SCHEMAS_DIR / "conversion_by_location.json"
 
 
 class CampaignLabel(ReportsStream):
     """Conversions By Location"""
 
+    supports_change_detection = True
+
     gaql = """
         SELECT campaign_label.campaign
              , campaign_label.label
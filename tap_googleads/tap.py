@@ -1,11 +1,23 @@
 """GoogleAds tap class."""
 
+import enum
+from concurrent.futures import ThreadPoolExecutor
 from datetime import date, timedelta
+from functools import cached_property
 from typing import List
 
+import requests
 from singer_sdk import Stream, Tap
+from singer_sdk import metrics
+from singer_sdk.exceptions import ConfigValidationError
 from singer_sdk import typing as th  # JSON schema typing helpers
 
+from tap_googleads.custom_queries import CustomQueryStream
+from tap_googleads.dormancy import DEFAULT_DORMANT_WINDOW_DAYS, CustomerActivity
+from tap_googleads.instrumentation import SyncMetrics
+from tap_googleads.output import MessageWriter
+from tap_googleads.rate_limiter import AdaptiveRateLimiter
+from tap_googleads.session import build_session, get_connection_stats
 from tap_googleads.streams import (
     AccessibleCustomers,
     AdGroupsPerformance,
@@ -37,6 +49,12 @@ STREAM_TYPES = [
 ]
 
 
+class ConnectionMetric(str, enum.Enum):
+    """Metrics logged by the tap on top of the SDK's."""
+
+    HTTP_CONNECTION_REUSE = "http_connection_reuse"
+
+
 class TapGoogleAds(Tap):
     """GoogleAds tap class."""
 
@@ -107,8 +125,397 @@ class TapGoogleAds(Tap):
                 "date. Note that the query is BETWEEN start_date AND end_date"
             ),
         ),
+        th.Property(
+            "lookback_window_days",
+            th.IntegerType,
+            default=14,
+            description=(
+                "Number of days before a customer's segments.date bookmark that "
+                "incremental performance streams query again, so that restated "
+                "conversions are picked up"
+            ),
+        ),
+        th.Property(
+            "date_window_size",
+            th.StringType,
+            allowed_values=["day", "week", "month"],
+            description=(
+                "Split the date range of performance streams into windows of this "
+                "size, each queried separately with state checkpointed after it, so "
+                "an interrupted backfill resumes from the last finished window"
+            ),
+        ),
+        th.Property(
+            "cache_dir",
+            th.StringType,
+            description=(
+                "Directory where data that rarely changes is cached between runs. "
+                "Caching is disabled when unset"
+            ),
+        ),
+        th.Property(
+            "geotargets_cache_ttl_days",
+            th.IntegerType,
+            default=30,
+            description=(
+                "Number of days the cached geo_target_constant stream is served "
+                "from cache_dir before it is downloaded again"
+            ),
+        ),
+        th.Property(
+            "hierarchy_cache_ttl_hours",
+            th.NumberType,
+            description=(
+                "Number of hours the customer hierarchy is served from cache_dir "
+                "before it is queried again. Not cached when unset"
+            ),
+        ),
+        th.Property(
+            "refresh_hierarchy_cache",
+            th.BooleanType,
+            default=False,
+            description="Query the customer hierarchy even if its cache is fresh",
+        ),
+        th.Property(
+            "max_concurrent_customers",
+            th.IntegerType,
+            default=1,
+            description=(
+                "Number of customers whose report streams, or sub-managers whose "
+                "client accounts, are fetched in parallel. Records are still written "
+                "one stream and customer at a time"
+            ),
+        ),
+        th.Property(
+            "max_concurrent_streams",
+            th.IntegerType,
+            default=1,
+            description=(
+                "Number of streams fetched in parallel, for each of the "
+                "max_concurrent_customers customers. Top level streams such as "
+                "geo_target_constant are fetched alongside the report streams. "
+                "Records are still written one stream and customer at a time"
+            ),
+        ),
+        th.Property(
+            "shard_count",
+            th.IntegerType,
+            default=1,
+            description=(
+                "Number of tap invocations the customers are split across. Each "
+                "invocation syncs the customers whose id modulo shard_count is its "
+                "shard_index"
+            ),
+        ),
+        th.Property(
+            "shard_index",
+            th.IntegerType,
+            default=0,
+            description=(
+                "Shard synced by this invocation, from 0 to shard_count - 1. "
+                "geo_target_constant is only synced by shard 0"
+            ),
+        ),
+        th.Property(
+            "use_search_stream",
+            th.BooleanType,
+            default=False,
+            description=(
+                "Query googleAds:searchStream instead of paging through "
+                "googleAds:search, so each query is a single request whose records "
+                "are emitted as its batches arrive. A response broken off is "
+                "requested again, skipping the records already emitted"
+            ),
+        ),
+        th.Property(
+            "share_report_queries",
+            th.BooleanType,
+            default=False,
+            description=(
+                "Run one combined query per customer for selected report streams "
+                "querying the same resource with the same segments and filters. "
+                "The rows of the other streams are kept in memory until they sync "
+                "the customer"
+            ),
+        ),
+        th.Property(
+            "max_requests_per_second",
+            th.NumberType,
+            description=(
+                "Highest rate of requests sent across all streams and customers. "
+                "The rate is lowered whenever Google answers with a rate limit "
+                "error, and raised back gradually. Unlimited until then when unset"
+            ),
+        ),
+        th.Property(
+            "http_pool_size",
+            th.IntegerType,
+            description=(
+                "Number of connections to the Google Ads API kept open and shared "
+                "by every stream. Defaults to max_concurrent_customers times "
+                "max_concurrent_streams, at least 10"
+            ),
+        ),
+        th.Property(
+            "tcp_keepalive_seconds",
+            th.IntegerType,
+            description=(
+                "Send TCP keep-alive probes on connections idle for this many "
+                "seconds, so that pooled connections aren't silently dropped"
+            ),
+        ),
+        th.Property(
+            "use_http2",
+            th.BooleanType,
+            default=False,
+            description=(
+                "Multiplex concurrent requests over HTTP/2 connections. "
+                "Needs the http2 extra, tap-googleads[http2]"
+            ),
+        ),
+        th.Property(
+            "custom_queries",
+            th.ArrayType(
+                th.ObjectType(
+                    th.Property("name", th.StringType, required=True),
+                    th.Property("resource", th.StringType, required=True),
+                    th.Property("fields", th.ArrayType(th.StringType), required=True),
+                    th.Property("segments", th.ArrayType(th.StringType)),
+                    th.Property("conditions", th.ArrayType(th.StringType)),
+                )
+            ),
+            description=(
+                "Additional report streams, each made of a GAQL query on a FROM "
+                "resource, selecting fields and segments, filtered by conditions"
+            ),
+        ),
+        th.Property(
+            "stream_granularity",
+            th.ArrayType(
+                th.ObjectType(
+                    th.Property("stream", th.StringType, required=True),
+                    th.Property("drop_segments", th.ArrayType(th.StringType)),
+                    th.Property(
+                        "date_granularity",
+                        th.StringType,
+                        allowed_values=["day", "week", "month"],
+                    ),
+                )
+            ),
+            description=(
+                "Report streams whose rows Google aggregates over fewer segments: "
+                "drop_segments are left out of the query, and with a week or month "
+                "date_granularity daily rows are rolled up into one row per period"
+            ),
+        ),
+        th.Property(
+            "change_detection",
+            th.BooleanType,
+            default=False,
+            description=(
+                "Only emit the campaign, ad_group and campaign_label records that "
+                "are new or changed since the last sync, going by fingerprints "
+                "kept per customer in cache_dir"
+            ),
+        ),
+        th.Property(
+            "change_detection_tombstones",
+            th.BooleanType,
+            default=False,
+            description=(
+                "With change_detection, also emit records no longer returned by "
+                "the API, with only their _sdc_primary_key and _sdc_deleted_at"
+            ),
+        ),
+        th.Property(
+            "use_change_status",
+            th.BooleanType,
+            default=False,
+            description=(
+                "Only query the campaigns and ad groups that change_status lists "
+                "as changed since the customer's last sync. Every resource is "
+                "queried on the first sync, when the last sync is over 89 days "
+                "old, or when over 10000 resources changed"
+            ),
+        ),
+        th.Property(
+            "skip_dormant_customers",
+            th.BooleanType,
+            default=False,
+            description=(
+                "Skip the incremental performance streams of customers without "
+                "impressions in the last dormant_window_days, checked with one "
+                "query per customer, as long as every date the streams would "
+                "query lies within that window"
+            ),
+        ),
+        th.Property(
+            "dormant_window_days",
+            th.IntegerType,
+            default=30,
+            description=(
+                "Number of days without impressions after which a customer is "
+                "dormant, see skip_dormant_customers"
+            ),
+        ),
+        th.Property(
+            "dormant_sweep_days",
+            th.IntegerType,
+            default=7,
+            description=(
+                "Number of days after which each performance stream syncs a "
+                "dormant customer anyway"
+            ),
+        ),
+        th.Property(
+            "stdout_batch_size",
+            th.IntegerType,
+            default=1,
+            description=(
+                "Number of RECORD messages written to stdout at once. Other "
+                "messages, such as STATE, flush the records written before them"
+            ),
+        ),
+        th.Property(
+            "metrics_log_path",
+            th.StringType,
+            description=(
+                "File the per stream and customer metrics of each sync are "
+                "appended to, as JSON lines. They are always logged as metric lines"
+            ),
+        ),
+        th.Property(
+            "metrics_prometheus_path",
+            th.StringType,
+            description=(
+                "File the per stream and customer metrics of the last sync are "
+                "written to, in the Prometheus text format, e.g. for the textfile "
+                "collector of the node exporter"
+            ),
+        ),
     ).to_dict()
 
+    @cached_property
+    def rate_limiter(self) -> AdaptiveRateLimiter:
+        """Request rate limiter shared by every stream and customer."""
+        return AdaptiveRateLimiter(self.config.get("max_requests_per_second"))
+
+    @cached_property
+    def requests_session(self) -> requests.Session:
+        """HTTP session whose connections are reused by every stream."""
+        return build_session(self.config)
+
+    @cached_property
+    def message_writer(self) -> MessageWriter:
+        """Writer of the RECORD messages of every stream."""
+        return MessageWriter(self.config.get("stdout_batch_size", 1))
+
+    @cached_property
+    def sync_metrics(self) -> SyncMetrics:
+        """Request, row and timing metrics of every stream and customer."""
+        return SyncMetrics()
+
+    @cached_property
+    def customer_activity(self) -> CustomerActivity:
+        """Which customers had impressions recently, see skip_dormant_customers."""
+        return CustomerActivity(
+            self.config.get("dormant_window_days", DEFAULT_DORMANT_WINDOW_DAYS)
+        )
+
+    def sync_all(self) -> None:
+        """Sync all streams, then log how often connections were reused.
+
+        With `max_concurrent_streams` above 1, the records of top level streams
+        without children, such as geo_target_constant, are fetched in the
+        background while the customer hierarchy and its report streams sync.
+
+        The `sync_metrics` are reported even if the sync fails.
+        """
+        shard_index = self.config.get("shard_index", 0)
+        if not 0 <= shard_index < self.config.get("shard_count", 1):
+            raise ConfigValidationError(
+                f"shard_index must be between 0 and shard_count - 1, not {shard_index}"
+            )
+        workers = self.config.get("max_concurrent_streams", 1)
+        independent_streams = [
+            stream
+            for stream in self.streams.values()
+            if stream.selected
+            and not stream.parent_stream_type
+            and not stream.child_streams
+        ]
+        try:
+            if workers > 1 and independent_streams:
+                with ThreadPoolExecutor(max_workers=workers) as executor:
+                    for stream in independent_streams:
+                        stream.prefetch_records(None, executor)
+                    try:
+                        super().sync_all()
+                    finally:
+                        # Otherwise workers blocked on unread records would
+                        # never exit, and the executor never shut down
+                        for stream in independent_streams:
+                            stream.cancel_prefetches()
+            else:
+                super().sync_all()
+        finally:
+            for authenticator in {s.authenticator for s in self.streams.values()}:
+                authenticator.stop_refreshing()
+            self.message_writer.flush()
+            self.sync_metrics.report(
+                self.config.get("metrics_log_path"),
+                self.config.get("metrics_prometheus_path"),
+            )
+        stats = get_connection_stats(self.requests_session)
+        point = metrics.Point(
+            "counter",
+            metric=ConnectionMetric.HTTP_CONNECTION_REUSE,
+            value=stats.pop("reused"),
+            tags=stats,
+        )
+        metrics.log(metrics.get_metrics_logger(), point)
+
     def discover_streams(self) -> List[Stream]:
-        """Return a list of discovered streams."""
-        return [stream_class(tap=self) for stream_class in STREAM_TYPES]
+        """Return a list of discovered streams, then those of `custom_queries`.
+
+        When syncing with a catalog, streams it deselects are left out, unless
+        they are the parent of a stream to sync, so that their schemas are
+        never loaded. Streams missing from the catalog are kept.
+        """
+        queries = self.config.get("custom_queries", [])
+        names = {stream_class.name for stream_class in STREAM_TYPES}
+        for query in queries:
+            if query["name"] in names:
+                raise ConfigValidationError(
+                    f"Custom query name {query['name']} is already used by a stream"
+                )
+            names.add(query["name"])
+
+        stream_types = STREAM_TYPES
+        if self.input_catalog is not None:
+            needed = {
+                stream_class
+                for stream_class in STREAM_TYPES
+                if self._is_in_sync(stream_class.name)
+            }
+            if any(self._is_in_sync(query["name"]) for query in queries):
+                needed.add(CustomQueryStream)
+            for stream_class in list(needed):
+                while stream_class.parent_stream_type:
+                    stream_class = stream_class.parent_stream_type
+                    needed.add(stream_class)
+            stream_types = [cls for cls in STREAM_TYPES if cls in needed]
+            queries = [query for query in queries if self._is_in_sync(query["name"])]
+
+        streams: List[Stream] = [
+            stream_class(tap=self) for stream_class in stream_types
+        ]
+        streams.extend(CustomQueryStream(tap=self, query=query) for query in queries)
+        return streams
+
+    def _is_in_sync(self, stream_name: str) -> bool:
+        # Whether the input catalog selects the stream, or doesn't list it
+        catalog_entry = self.input_catalog.get_stream(stream_name)
+        if catalog_entry is None:
+            return True
+        return catalog_entry.metadata.resolve_selection().get((), True)
@@ -0,0 +1 @@
+"""Performance benchmarks for tap-googleads, run as modules rather than by pytest."""
@@ -0,0 +1,230 @@
+"""End-to-end benchmark of the tap against the local mock Google Ads API.
+
+Each stream is synced in its own worker process so that peak memory and CPU
+time are measured per stream. Results can be saved with `--output` and
+compared against an earlier run with `--baseline`, in which case the command
+exits non-zero when a stream got slower or bigger than `--tolerance` allows.
+
+Run with `poetry run python -m tap_googleads.tests.benchmarks.harness`.
+"""
+
+import argparse
+import json
+import resource
+import subprocess
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import asdict
+from typing import Dict, Iterator, List, Optional
+
+from tap_googleads.tests.benchmarks.mock_server import (
+    ROOT_MANAGER_ID,
+    MockGoogleAdsServer,
+    MockSettings,
+)
+
+DEFAULT_STREAMS = [
+    "campaign",
+    "ad_group",
+    "ad_group_performance",
+    "campaign_performance",
+    "campaign_performance_by_location",
+]
+
+
+class _CountingWriter:
+    """Stand-in for stdout counting the Singer messages written to it."""
+
+    def __init__(self) -> None:
+        self.records = 0
+        self.bytes = 0
+
+    def write(self, data: str) -> int:
+        self.bytes += len(data)
+        # Spaced by simplejson, compact when serialised by orjson
+        self.records += data.count('"type": "RECORD"') + data.count('"type":"RECORD"')
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+
+@contextmanager
+def pointed_at(url: str) -> Iterator[None]:
+    """Send the tap's API and OAuth requests to `url` while the block runs."""
+    from tap_googleads.client import GoogleAdsStream
+
+    url_base, auth_url_base = GoogleAdsStream.url_base, GoogleAdsStream.auth_url_base
+    GoogleAdsStream.url_base = f"{url}/{GoogleAdsStream.url_base.rsplit('/', 1)[-1]}"
+    GoogleAdsStream.auth_url_base = f"{url}/oauth2/v4/token"
+    try:
+        yield
+    finally:
+        GoogleAdsStream.url_base = url_base
+        GoogleAdsStream.auth_url_base = auth_url_base
+
+
+def run_worker(stream_name: str, url: str, config: dict) -> dict:
+    """Sync a single stream against `url` and return its measurements."""
+    from tap_googleads.tap import TapGoogleAds
+
+    config = {
+        "client_id": "benchmark",
+        "client_secret": "benchmark",
+        "developer_token": "benchmark",
+        "refresh_token": "benchmark",
+        "customer_id": ROOT_MANAGER_ID,
+        "login_customer_id": ROOT_MANAGER_ID,
+        "start_date": "2023-01-01T00:00:00Z",
+        "end_date": "2023-01-30T00:00:00Z",
+        **config,
+    }
+    with pointed_at(url):
+        tap = TapGoogleAds(config=config, parse_env_config=False)
+        for stream in tap.streams.values():
+            stream.selected = stream.name == stream_name
+
+        writer = _CountingWriter()
+        stdout, sys.stdout = sys.stdout, writer
+        start = time.perf_counter()
+        try:
+            tap.sync_all()
+        finally:
+            sys.stdout = stdout
+        elapsed = time.perf_counter() - start
+
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return {
+        "records": writer.records,
+        "output_bytes": writer.bytes,
+        "seconds": elapsed,
+        "records_per_second": writer.records / elapsed,
+        "cpu_seconds": usage.ru_utime + usage.ru_stime,
+        "peak_rss_kb": usage.ru_maxrss,
+    }
+
+
+def run_benchmark(
+    settings: MockSettings, streams: List[str], config: Optional[dict] = None
+) -> Dict[str, dict]:
+    """Serve the mock API and benchmark each stream in a separate process."""
+    server = MockGoogleAdsServer(settings)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    results = {}
+    try:
+        for stream_name in streams:
+            requests_before = server.request_count
+            worker = subprocess.run(
+                [
+                    sys.executable,
+                    "-m",
+                    __spec__.name,
+                    "--worker",
+                    stream_name,
+                    "--url",
+                    server.url,
+                    "--config",
+                    json.dumps(config or {}),
+                ],
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+                check=True,
+                text=True,
+            )
+            result = json.loads(worker.stdout)
+            result["requests"] = server.request_count - requests_before
+            result["requests_per_second"] = result["requests"] / result["seconds"]
+            results[stream_name] = result
+    finally:
+        server.shutdown()
+        server.server_close()
+    return results
+
+
+def find_regressions(
+    results: Dict[str, dict], baseline: Dict[str, dict], tolerance: float
+) -> List[str]:
+    """Describe every stream doing worse than `baseline` by more than `tolerance`."""
+    regressions = []
+    for stream_name, result in results.items():
+        previous = baseline.get(stream_name)
+        if not previous:
+            continue
+        throughput = previous["records_per_second"] * (1 - tolerance)
+        if result["records_per_second"] < throughput:
+            regressions.append(
+                f"{stream_name}: {result['records_per_second']:,.0f} records/s, "
+                f"baseline {previous['records_per_second']:,.0f}"
+            )
+        memory = previous["peak_rss_kb"] * (1 + tolerance)
+        if result["peak_rss_kb"] > memory:
+            regressions.append(
+                f"{stream_name}: {result['peak_rss_kb']:,} KB peak RSS, "
+                f"baseline {previous['peak_rss_kb']:,}"
+            )
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--streams", nargs="+", default=DEFAULT_STREAMS)
+    parser.add_argument("--customers", type=int, default=MockSettings.customers)
+    parser.add_argument("--rows", type=int, default=MockSettings.rows_per_customer)
+    parser.add_argument("--page-size", type=int, default=MockSettings.page_size)
+    parser.add_argument("--row-width", type=int, default=MockSettings.row_width)
+    parser.add_argument(
+        "--latency", type=float, default=MockSettings.latency, help="in seconds"
+    )
+    parser.add_argument(
+        "--config", default="{}", help="JSON object merged into the tap config"
+    )
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="results JSON file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    parser.add_argument("--url", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        result = run_worker(args.worker, args.url, json.loads(args.config))
+        print(json.dumps(result))
+        return
+
+    settings = MockSettings(
+        customers=args.customers,
+        rows_per_customer=args.rows,
+        page_size=args.page_size,
+        row_width=args.row_width,
+        latency=args.latency,
+    )
+    results = run_benchmark(settings, args.streams, json.loads(args.config))
+    for stream_name, result in results.items():
+        print(
+            f"{stream_name:40} {result['records']:>9,} records "
+            f"{result['records_per_second']:>10,.0f} records/s "
+            f"{result['requests_per_second']:>7,.1f} requests/s "
+            f"{result['cpu_seconds']:>6.2f} s CPU "
+            f"{result['peak_rss_kb'] / 1024:>7,.1f} MB peak RSS"
+        )
+
+    if args.output:
+        with open(args.output, "w") as output:
+            settings_dict = {**asdict(settings), "start_date": str(settings.start_date)}
+            json.dump({"settings": settings_dict, "streams": results}, output, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as baseline:
+            regressions = find_regressions(
+                results, json.load(baseline)["streams"], args.tolerance
+            )
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+"""Local stand-in for the Google Ads API serving synthetic data.
+
+Serves the OAuth token endpoint, customers:listAccessibleCustomers and
+googleAds:search / googleAds:searchStream. Rows are generated from the SELECT
+list of each GAQL query, so every stream of the tap gets records with the
+fields, resource names and primary keys it expects.
+"""
+
+import json
+import re
+import threading
+import time
+from dataclasses import dataclass
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+from tap_googleads.utils import camel_case, parse_gaql
+
+ROOT_MANAGER_ID = "1000000000"
+
+_SEARCH_PATH_RE = re.compile(r"/customers/(\d+)/googleAds:(search|searchStream)$")
+
+
+@dataclass
+class MockSettings:
+    """Shape of the synthetic account."""
+
+    customers: int = 10
+    rows_per_customer: int = 1000
+    page_size: int = 10000
+    row_width: int = 16
+    latency: float = 0.0
+    start_date: date = date(2023, 1, 1)
+    days: int = 30
+
+
+def _value(levels: List[str], index: int, settings: MockSettings) -> Any:
+    leaf = levels[-1]
+    if levels[0] == "segments" and leaf == "date":
+        day = settings.start_date + timedelta(days=index % settings.days)
+        return day.isoformat()
+    if levels[0] == "metrics":
+        return str(index % 97)
+    if leaf == "id" or leaf.endswith("Micros"):
+        return str(index)
+    return "x" * settings.row_width
+
+
+def make_rows(
+    query: str, customer_id: str, settings: MockSettings
+) -> List[Dict[str, Any]]:
+    """Generate the result rows of a GAQL query for one customer."""
+    parsed = parse_gaql(query)
+    fields = [[camel_case(level) for level in f.split(".")] for f in parsed.fields]
+    resource = parsed.resource
+    if resource == "customer_client":
+        return _customer_client_rows(customer_id, settings)
+
+    rows = []
+    for index in range(settings.rows_per_customer):
+        row: Dict[str, Any] = {}
+        for levels in fields:
+            node = row
+            for level in levels[:-1]:
+                node = node.setdefault(level, {})
+            node[levels[-1]] = _value(levels, index, settings)
+        for name, node in row.items():
+            if name not in ("metrics", "segments"):
+                node["resourceName"] = f"customers/{customer_id}/{name}/{index}"
+        row.setdefault(camel_case(resource), {})[
+            "resourceName"
+        ] = f"customers/{customer_id}/{resource}/{index}"
+        rows.append(row)
+    return rows
+
+
+def _customer_client_rows(customer_id: str, settings: MockSettings) -> List[dict]:
+    rows = [{"customerClient": {"id": customer_id, "manager": True, "level": "0"}}]
+    if customer_id == ROOT_MANAGER_ID:
+        rows.extend(
+            {
+                "customerClient": {
+                    "id": str(index + 1),
+                    "manager": False,
+                    "level": "1",
+                    "descriptiveName": f"Customer {index + 1}",
+                }
+            }
+            for index in range(settings.customers)
+        )
+    return rows
+
+
+class MockGoogleAdsServer(ThreadingHTTPServer):
+    """Threaded HTTP server answering like the Google Ads API."""
+
+    daemon_threads = True
+
+    def __init__(self, settings: MockSettings, port: int = 0):
+        super().__init__(("127.0.0.1", port), _Handler)
+        self.settings = settings
+        self.request_count = 0
+        self._count_lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def count_request(self) -> None:
+        with self._count_lock:
+            self.request_count += 1
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: MockGoogleAdsServer
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+    def _send_json(self, body: Any, status: int = 200) -> None:
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _read_body(self) -> Optional[dict]:
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length)) if length else None
+
+    def do_GET(self) -> None:
+        url = urlparse(self.path)
+        if url.path == "/stats":
+            self._send_json({"requests": self.server.request_count})
+            return
+        self.server.count_request()
+        time.sleep(self.server.settings.latency)
+        if url.path.endswith("/customers:listAccessibleCustomers"):
+            self._send_json({"resourceNames": [f"customers/{ROOT_MANAGER_ID}"]})
+        else:
+            self._send_json({"error": {"code": 404}}, status=404)
+
+    def do_POST(self) -> None:
+        url = urlparse(self.path)
+        body = self._read_body()
+        self.server.count_request()
+        time.sleep(self.server.settings.latency)
+
+        if url.path.endswith("/token"):
+            self._send_json({"access_token": "mock-token", "expires_in": 3600})
+            return
+        match = _SEARCH_PATH_RE.search(url.path)
+        if not match:
+            self._send_json({"error": {"code": 404}}, status=404)
+            return
+
+        params = {key: values[0] for key, values in parse_qs(url.query).items()}
+        query = (body or {}).get("query") or params["query"]
+        rows = make_rows(query, match.group(1), self.server.settings)
+        page_size = self.server.settings.page_size
+        if match.group(2) == "searchStream":
+            batches = [
+                {"results": rows[start : start + page_size]}
+                for start in range(0, len(rows), page_size)
+            ]
+            self._send_json(batches or [{"results": []}])
+            return
+
+        start = int(params.get("pageToken") or 0)
+        page: Dict[str, Any] = {"results": rows[start : start + page_size]}
+        if start + page_size < len(rows):
+            page["nextPageToken"] = str(start + page_size)
+        self._send_json(page)
+
+
+def main() -> None:
+    server = MockGoogleAdsServer(MockSettings(), port=8765)
+    print(f"Serving mock Google Ads API on {server.url}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
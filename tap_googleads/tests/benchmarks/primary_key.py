@@ -0,0 +1,54 @@
+"""Micro-benchmark of primary key extraction.
+
+Compares `replicate_pk_at_root`, the original per-record implementation, with
+the `compile_pk_builder` functions the streams use.
+
+Run with `poetry run python -m tap_googleads.tests.benchmarks.primary_key`.
+"""
+
+import argparse
+import time
+
+from tap_googleads.streams import CampaignPerformanceByAgeRangeAndDevice
+from tap_googleads.utils import compile_pk_builder, replicate_pk_at_root
+
+JSONPATHS = CampaignPerformanceByAgeRangeAndDevice.primary_keys_jsonpaths
+
+
+def make_rows(count: int) -> list:
+    return [
+        {
+            "campaign": {"resourceName": f"customers/1/campaigns/{i % 1000}"},
+            "adGroup": {"id": str(i % 5000)},
+            "adGroupCriterion": {"ageRange": {"type": "AGE_RANGE_25_34"}},
+            "segments": {"device": "MOBILE", "date": "2023-01-01"},
+            "metrics": {"clicks": "1", "impressions": "10"},
+        }
+        for i in range(count)
+    ]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    args = parser.parse_args()
+    rows = make_rows(args.rows)
+
+    start = time.perf_counter()
+    for row in rows:
+        replicate_pk_at_root(row, JSONPATHS)
+    per_row = time.perf_counter() - start
+
+    build_pk = compile_pk_builder(JSONPATHS)
+    start = time.perf_counter()
+    for row in rows:
+        row["_sdc_primary_key"] = build_pk(row)
+    compiled = time.perf_counter() - start
+
+    print(f"replicate_pk_at_root: {args.rows / per_row:,.0f} rows/s")
+    print(f"compile_pk_builder:   {args.rows / compiled:,.0f} rows/s")
+    print(f"speedup:              {per_row / compiled:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""Benchmark of how long the tap takes to start.
+
+Orchestrators run many short invocations of the tap, for discovery and for
+syncing a few streams at a time, each paying for its startup. Every
+measurement is taken in a fresh process, and the median of `--repeat` runs is
+reported. Importing singer_sdk is measured separately, as the tap can't
+start without it.
+
+Run with `poetry run python -m tap_googleads.tests.benchmarks.startup`, and
+compare against an earlier `--output` with `--baseline` like the harness.
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List
+
+from tap_googleads.tests.benchmarks.mock_server import ROOT_MANAGER_ID
+
+# Startup phases measured by each worker, in seconds
+PHASES = [
+    "sdk_import_seconds",
+    "tap_import_seconds",
+    "discover_seconds",
+    "sync_setup_seconds",
+]
+# Synced by the sync setup phase, which also needs its parent streams
+SYNC_STREAM = "campaign_performance"
+
+CONFIG = {
+    "client_id": "benchmark",
+    "client_secret": "benchmark",
+    "developer_token": "benchmark",
+    "refresh_token": "benchmark",
+    "customer_id": ROOT_MANAGER_ID,
+    "login_customer_id": ROOT_MANAGER_ID,
+    "start_date": "2023-01-01T00:00:00Z",
+    "end_date": "2023-01-30T00:00:00Z",
+}
+
+
+def run_worker() -> dict:
+    """Start the tap for discovery, then for syncing SYNC_STREAM, timing each."""
+    start = time.perf_counter()
+    import singer_sdk  # noqa: F401
+
+    sdk_imported = time.perf_counter()
+    from tap_googleads.tap import TapGoogleAds
+
+    tap_imported = time.perf_counter()
+    catalog = TapGoogleAds(config=CONFIG, parse_env_config=False).catalog_dict
+    discovered = time.perf_counter()
+
+    for entry in catalog["streams"]:
+        for metadata in entry["metadata"]:
+            if not metadata["breadcrumb"]:
+                metadata["metadata"]["selected"] = entry["tap_stream_id"] == SYNC_STREAM
+    sync_start = time.perf_counter()
+    tap = TapGoogleAds(config=CONFIG, catalog=catalog, parse_env_config=False)
+    streams = tap.streams
+    synced = time.perf_counter()
+    return {
+        "sdk_import_seconds": sdk_imported - start,
+        "tap_import_seconds": tap_imported - sdk_imported,
+        "discover_seconds": discovered - tap_imported,
+        "sync_setup_seconds": synced - sync_start,
+        "discovered_streams": len(catalog["streams"]),
+        "sync_streams": len(streams),
+    }
+
+
+def run_startup_benchmark(repeat: int = 5) -> Dict[str, float]:
+    """Run the worker `repeat` times and return the median of each measurement."""
+    runs: List[dict] = []
+    for _ in range(repeat):
+        worker = subprocess.run(
+            [sys.executable, "-m", __spec__.name, "--worker"],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            check=True,
+            text=True,
+        )
+        runs.append(json.loads(worker.stdout))
+    return {key: statistics.median(run[key] for run in runs) for key in runs[0]}
+
+
+def find_startup_regressions(
+    results: Dict[str, float], baseline: Dict[str, float], tolerance: float
+) -> List[str]:
+    """Describe every phase of the tap slower than `baseline` by more than `tolerance`.
+
+    singer_sdk's import isn't compared, as it doesn't depend on the tap.
+    """
+    regressions = []
+    for phase in PHASES[1:]:
+        if phase in baseline and results[phase] > baseline[phase] * (1 + tolerance):
+            regressions.append(
+                f"{phase}: {results[phase]:.3f}s, baseline {baseline[phase]:.3f}s"
+            )
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="results JSON file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_worker()))
+        return
+
+    results = run_startup_benchmark(args.repeat)
+    for phase in PHASES:
+        print(f"{phase:20} {results[phase]:>7.3f} s")
+    print(
+        f"{'sync_streams':20} {results['sync_streams']:>7.0f} of "
+        f"{results['discovered_streams']:.0f} streams created to sync {SYNC_STREAM}"
+    )
+
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(results, output, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as baseline:
+            regressions = find_startup_regressions(
+                results, json.load(baseline), args.tolerance
+            )
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
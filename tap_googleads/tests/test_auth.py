@@ -0,0 +1,138 @@
+"""Tests sharing and refreshing the access token."""
+
+import gc
+import json
+import re
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+import responses
+
+import tap_googleads.tap
+from tap_googleads.auth import GoogleAdsAuthenticator
+
+SAMPLE_CONFIG = {
+    "client_id": "auth-test",
+    "client_secret": "12345",
+    "developer_token": "12345",
+    "refresh_token": "auth-test",
+    "customer_id": "12345",
+    "login_customer_id": "12345",
+}
+
+
+@pytest.fixture
+def token_requests():
+    calls = []
+
+    def token_callback(request):
+        calls.append(request)
+        time.sleep(0.05)
+        body = {"access_token": f"token-{len(calls)}", "expires_in": expires_in}
+        return 200, {}, json.dumps(body)
+
+    expires_in = 3600
+    with responses.RequestsMock() as rsps:
+        rsps.add_callback(
+            responses.POST,
+            re.compile(r"https://www.googleapis.com/oauth2/v4/token.*"),
+            callback=token_callback,
+            content_type="application/json",
+        )
+        yield calls
+
+
+def make_tap(**config):
+    config = {**SAMPLE_CONFIG, **config}
+    return tap_googleads.tap.TapGoogleAds(config=config, parse_env_config=False)
+
+
+def get_authenticator(stream_name: str, **config):
+    return make_tap(**config).streams[stream_name].authenticator
+
+
+def test_concurrent_requests_refresh_token_once(token_requests):
+    tap = make_tap(refresh_token="concurrent")
+    authenticator = tap.streams["campaign"].authenticator
+    other = tap.streams["ad_group"].authenticator
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        headers = list(
+            executor.map(
+                lambda a: a.auth_headers["Authorization"], [authenticator, other] * 8
+            )
+        )
+
+    assert other is authenticator
+    assert len(token_requests) == 1
+    assert set(headers) == {"Bearer token-1"}
+
+
+def test_authenticators_are_scoped_per_tap(token_requests):
+    authenticator = get_authenticator("campaign", refresh_token="first")
+    other = get_authenticator("campaign", refresh_token="first")
+
+    assert other is not authenticator
+    assert authenticator.auth_headers != other.auth_headers
+    assert len(token_requests) == 2
+
+
+def test_authenticator_is_forgotten_with_its_tap(token_requests):
+    tap = make_tap(refresh_token="forgotten")
+    authenticator = tap.streams["campaign"].authenticator
+    authenticator.auth_headers
+    tap_ref = weakref.ref(tap)
+
+    del tap
+    gc.collect()
+
+    assert tap_ref() is None
+    assert authenticator not in GoogleAdsAuthenticator._instances.values()
+
+
+def test_invalidated_token_is_refreshed(token_requests):
+    authenticator = get_authenticator("campaign", refresh_token="invalidated")
+    authenticator.auth_headers
+
+    authenticator.invalidate("token-1")
+
+    assert authenticator.auth_headers["Authorization"] == "Bearer token-2"
+
+
+def test_token_refreshed_by_another_thread_is_kept(token_requests):
+    authenticator = get_authenticator("campaign", refresh_token="kept")
+    authenticator.auth_headers
+    authenticator.invalidate("token-1")
+    authenticator.auth_headers
+
+    # A request sent with the first token is rejected after the refresh
+    authenticator.invalidate("token-1")
+
+    assert authenticator.auth_headers["Authorization"] == "Bearer token-2"
+    assert len(token_requests) == 2
+
+
+def test_token_is_refreshed_before_it_expires(token_requests):
+    authenticator = get_authenticator("campaign", refresh_token="background")
+    authenticator.auth_headers
+    authenticator.expires_in = 2
+
+    authenticator._schedule_refresh()
+    time.sleep(1.5)
+
+    assert len(token_requests) == 2
+    assert authenticator.auth_headers["Authorization"] == "Bearer token-2"
+
+
+def test_background_refresh_stops_after_the_sync(token_requests):
+    authenticator = get_authenticator("campaign", refresh_token="stopped")
+    authenticator.auth_headers
+    authenticator.expires_in = 2
+    authenticator._schedule_refresh()
+
+    authenticator.stop_refreshing()
+    time.sleep(1.5)
+
+    assert len(token_requests) == 1
@@ -0,0 +1,52 @@
+"""Tests the benchmark harness against the mock Google Ads API."""
+
+from tap_googleads.tests.benchmarks.harness import find_regressions, run_benchmark
+from tap_googleads.tests.benchmarks.mock_server import MockSettings
+from tap_googleads.tests.benchmarks.startup import (
+    find_startup_regressions,
+    run_startup_benchmark,
+)
+
+
+def test_harness_syncs_stream_from_mock_server():
+    settings = MockSettings(customers=3, rows_per_customer=25, page_size=10)
+
+    results = run_benchmark(settings, ["campaign_performance"])
+
+    result = results["campaign_performance"]
+    assert result["records"] == 75
+    # token, accessible customers, hierarchy, then 3 pages per customer
+    assert result["requests"] == 3 + 3 * 3
+    assert result["peak_rss_kb"] > 0
+
+
+def test_find_regressions():
+    baseline = {"campaign": {"records_per_second": 1000, "peak_rss_kb": 1000}}
+    results = {"campaign": {"records_per_second": 850, "peak_rss_kb": 1300}}
+
+    regressions = find_regressions(results, baseline, tolerance=0.2)
+
+    assert len(regressions) == 1
+    assert "peak RSS" in regressions[0]
+
+
+def test_startup_benchmark():
+    results = run_startup_benchmark(repeat=1)
+
+    assert results["discovered_streams"] == 12
+    # campaign_performance and its parents
+    assert results["sync_streams"] == 3
+
+
+def test_find_startup_regressions():
+    baseline = {"sdk_import_seconds": 0.1, "discover_seconds": 0.1}
+    results = {
+        "sdk_import_seconds": 0.5,
+        "tap_import_seconds": 0.5,
+        "discover_seconds": 0.15,
+        "sync_setup_seconds": 0.1,
+    }
+
+    regressions = find_startup_regressions(results, baseline, tolerance=0.2)
+
+    assert regressions == ["discover_seconds: 0.150s, baseline 0.100s"]
@@ -0,0 +1,142 @@
+"""Tests the local caches."""
+
+import json
+import re
+
+import pytest
+import responses
+
+import tap_googleads.tap
+from tap_googleads.cache import JSONLinesCache
+
+SAMPLE_CONFIG = {
+    "client_id": "12345",
+    "client_secret": "12345",
+    "developer_token": "12345",
+    "refresh_token": "12345",
+    "customer_id": "12345",
+    "login_customer_id": "12345",
+}
+
+
+@pytest.fixture
+def mocked_responses():
+    with responses.RequestsMock(assert_all_requests_are_fired=False) as rsps:
+        yield rsps
+
+
+def test_cache_versions_and_expiry(tmp_path):
+    cache = JSONLinesCache(tmp_path / "cache.jsonl", version="v1", ttl_seconds=60)
+    with cache.writer() as write:
+        write({"id": 1})
+
+    assert cache.is_fresh()
+    assert list(cache.read()) == [{"id": 1}]
+    assert not JSONLinesCache(cache.path, version="v2", ttl_seconds=60).is_fresh()
+    assert not JSONLinesCache(cache.path, version="v1", ttl_seconds=0).is_fresh()
+
+
+def test_cache_not_written_on_error(tmp_path):
+    cache = JSONLinesCache(tmp_path / "cache.jsonl", version="v1", ttl_seconds=60)
+    with pytest.raises(RuntimeError):
+        with cache.writer() as write:
+            write({"id": 1})
+            raise RuntimeError()
+
+    assert not cache.is_fresh()
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_geotargets_served_from_cache(mocked_responses, tmp_path):
+    mocked_responses.add(
+        responses.POST,
+        re.compile(r"https://www.googleapis.com/oauth2/v4/token.*"),
+        json={"access_token": "access_granted", "expires_in": 3600},
+    )
+    mocked_responses.add(
+        responses.POST,
+        re.compile(r"https://googleads.googleapis.com/v14/customers/12345/.*"),
+        body=json.dumps(
+            {"results": [{"geoTargetConstant": {"resourceName": "geo/1"}}]}
+        ),
+        content_type="application/json",
+    )
+    config = {**SAMPLE_CONFIG, "cache_dir": str(tmp_path)}
+
+    for _ in range(2):
+        tap = tap_googleads.tap.TapGoogleAds(config=config, parse_env_config=False)
+        records = list(tap.streams["geo_target_constant"].get_records(None))
+        assert [r["_sdc_primary_key"] for r in records] == ["geo/1"]
+
+    search_calls = [
+        call for call in mocked_responses.calls if "googleAds" in call.request.url
+    ]
+    assert len(search_calls) == 1
+
+
+def hierarchy_callback(request):
+    if "customer_client" in request.url:
+        body = {
+            "results": [
+                {"customerClient": {"id": customer_id, "manager": False}}
+                for customer_id in ["1", "2"]
+            ]
+        }
+        return 200, {}, json.dumps(body)
+    if "/customers/2/" in request.url:
+        body = {
+            "error": {
+                "code": 403,
+                "details": [
+                    {
+                        "errors": [
+                            {
+                                "errorCode": {
+                                    "authorizationError": "CUSTOMER_NOT_ENABLED"
+                                }
+                            }
+                        ]
+                    }
+                ],
+            }
+        }
+        return 403, {}, json.dumps(body)
+    return 200, {}, json.dumps({"results": []})
+
+
+def test_hierarchy_cache_evicts_customers_not_enabled(mocked_responses, tmp_path):
+    mocked_responses.add(
+        responses.POST,
+        re.compile(r"https://www.googleapis.com/oauth2/v4/token.*"),
+        json={"access_token": "access_granted", "expires_in": 3600},
+    )
+    mocked_responses.add_callback(
+        responses.POST,
+        re.compile(r"https://googleads.googleapis.com/v14/customers/\d+/.*"),
+        callback=hierarchy_callback,
+        content_type="application/json",
+    )
+    config = {**SAMPLE_CONFIG, "cache_dir": str(tmp_path)}
+    config["hierarchy_cache_ttl_hours"] = 1
+    tap = tap_googleads.tap.TapGoogleAds(config=config, parse_env_config=False)
+    hierarchy_stream = tap.streams["customer_hierarchy"]
+    for stream in hierarchy_stream.child_streams:
+        stream.selected = stream.name == "campaign"
+
+    hierarchy_stream.sync({"resourceNames": ["customers/12345"]})
+
+    cache = hierarchy_stream.cache
+    assert cache.is_fresh()
+    assert [row["customerClient"]["id"] for row in cache.read()] == ["1"]
+
+
+def test_hierarchy_cache_from_before_the_revision_is_stale(tmp_path):
+    config = {**SAMPLE_CONFIG, "cache_dir": str(tmp_path)}
+    config["hierarchy_cache_ttl_hours"] = 1
+    tap = tap_googleads.tap.TapGoogleAds(config=config, parse_env_config=False)
+    cache = tap.streams["customer_hierarchy"].cache
+    previous_version = cache.version.rsplit(":", 1)[0]
+    with JSONLinesCache(cache.path, previous_version, 3600).writer() as write:
+        write({"customerClient": {"id": "1", "manager": False}})
+
+    assert not cache.is_fresh()
@@ -0,0 +1,93 @@
+"""Tests emitting only the dimension records that changed."""
+
+import copy
+import json
+import re
+
+import pytest
+import responses
+from singer_sdk.exceptions import ConfigValidationError
+
+import tap_googleads.tap
+
+SAMPLE_CONFIG = {
+    "client_id": "12345",
+    "client_secret": "12345",
+    "developer_token": "12345",
+    "refresh_token": "12345",
+    "customer_id": "12345",
+    "login_customer_id": "12345",
+    "change_detection": True,
+    "change_detection_tombstones": True,
+}
+
+
+def campaign(campaign_id: int, name: str) -> dict:
+    resource_name = f"customers/1/campaigns/{campaign_id}"
+    return {"campaign": {"resourceName": resource_name, "name": name}}
+
+
+@pytest.fixture
+def api_rows():
+    rows: list = []
+    with responses.RequestsMock(assert_all_requests_are_fired=False) as rsps:
+        rsps.add(
+            responses.POST,
+            re.compile(r"https://www.googleapis.com/oauth2/v4/token.*"),
+            json={"access_token": "access_granted", "expires_in": 3600},
+        )
+        rsps.add_callback(
+            responses.POST,
+            re.compile(r"https://googleads.googleapis.com/v14/customers/1/.*"),
+            callback=lambda request: (200, {}, json.dumps({"results": rows})),
+            content_type="application/json",
+        )
+        yield rows
+
+
+def sync_campaigns(config: dict, state: dict = None):
+    # The tap updates the state it is given in place
+    tap = tap_googleads.tap.TapGoogleAds(
+        config=config, state=copy.deepcopy(state), parse_env_config=False
+    )
+    records = list(tap.streams["campaign"].get_records({"client_id": "1"}))
+    return records, tap.state
+
+
+def test_only_changes_are_emitted(api_rows, tmp_path):
+    config = {**SAMPLE_CONFIG, "cache_dir": str(tmp_path)}
+    api_rows[:] = [campaign(1, "One"), campaign(2, "Two"), campaign(3, "Three")]
+    records, state = sync_campaigns(config)
+    assert len(records) == 3
+
+    api_rows[:] = [campaign(1, "One"), campaign(2, "Renamed"), campaign(4, "Four")]
+    records, state = sync_campaigns(config, state)
+
+    assert [record["_sdc_primary_key"] for record in records] == [
+        "customers/1/campaigns/2",
+        "customers/1/campaigns/4",
+        "customers/1/campaigns/3",
+    ]
+    assert records[0]["campaign"]["name"] == "Renamed"
+    assert set(records[2]) == {"_sdc_primary_key", "_sdc_deleted_at"}
+
+    assert sync_campaigns(config, state)[0] == []
+
+
+def test_records_are_emitted_again_without_their_state(api_rows, tmp_path):
+    config = {**SAMPLE_CONFIG, "cache_dir": str(tmp_path)}
+    api_rows[:] = [campaign(1, "One"), campaign(2, "Two")]
+    _, first_state = sync_campaigns(config)
+    sync_campaigns(config, first_state)
+
+    # The target failed before committing the state of the second sync
+    records, _ = sync_campaigns(config, first_state)
+    assert len(records) == 2
+    # The state was reset
+    records, _ = sync_campaigns(config)
+    assert len(records) == 2
+
+
+def test_change_detection_needs_cache_dir():
+    with pytest.raises(ConfigValidationError):
+        tap_googleads.tap.TapGoogleAds(config=SAMPLE_CONFIG, parse_env_config=False)
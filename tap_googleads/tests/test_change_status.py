@@ -0,0 +1,161 @@
+"""Tests querying only the resources listed as changed in change_status."""
+
+import json
+import re
+from datetime import datetime, timedelta, timezone
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+import responses
+
+import tap_googleads.tap
+from tap_googleads.utils import parse_gaql
+
+SAMPLE_CONFIG = {
+    "client_id": "12345",
+    "client_secret": "12345",
+    "developer_token": "12345",
+    "refresh_token": "12345",
+    "customer_id": "12345",
+    "login_customer_id": "12345",
+    "use_change_status": True,
+}
+
+
+def campaign(campaign_id: int) -> dict:
+    resource_name = f"customers/1/campaigns/{campaign_id}"
+    return {"campaign": {"resourceName": resource_name, "name": f"{campaign_id}"}}
+
+
+def change(campaign_id: int, changed_at: str) -> dict:
+    return {
+        "changeStatus": {
+            "campaign": f"customers/1/campaigns/{campaign_id}",
+            "lastChangeDateTime": changed_at,
+        }
+    }
+
+
+@pytest.fixture
+def api():
+    api = {"campaigns": [], "changes": [], "queries": []}
+
+    def search(request):
+        query = parse_qs(urlparse(request.url).query)["query"][0]
+        api["queries"].append(query)
+        rows = api["changes"] if "FROM change_status" in query else api["campaigns"]
+        return 200, {}, json.dumps({"results": rows})
+
+    with responses.RequestsMock(assert_all_requests_are_fired=False) as rsps:
+        rsps.add(
+            responses.POST,
+            re.compile(r"https://www.googleapis.com/oauth2/v4/token.*"),
+            json={"access_token": "access_granted", "expires_in": 3600},
+        )
+        rsps.add_callback(
+            responses.POST,
+            re.compile(r"https://googleads.googleapis.com/v14/customers/1/.*"),
+            callback=search,
+            content_type="application/json",
+        )
+        yield api
+
+
+def campaign_state(bookmark: str, **partition_state) -> dict:
+    partition = {
+        "context": {"client_id": "1"},
+        "change_status_bookmark": bookmark,
+        **partition_state,
+    }
+    return {"bookmarks": {"campaign": {"partitions": [partition]}}}
+
+
+def sync_campaigns(config: dict, state: dict = None):
+    tap = tap_googleads.tap.TapGoogleAds(
+        config=config, state=state, parse_env_config=False
+    )
+    stream = tap.streams["campaign"]
+    records = list(stream.get_records({"client_id": "1"}))
+    return records, stream.get_context_state({"client_id": "1"})
+
+
+def test_first_sync_queries_every_resource(api):
+    api["campaigns"] = [campaign(1), campaign(2)]
+
+    records, state = sync_campaigns(SAMPLE_CONFIG)
+
+    assert len(records) == 2
+    assert len(api["queries"]) == 1
+    assert "IN" not in api["queries"][0]
+    day_ago = datetime.now(timezone.utc) - timedelta(days=1, minutes=1)
+    assert state["change_status_bookmark"] > day_ago.strftime("%Y-%m-%d %H:%M:%S")
+
+
+def test_only_changed_resources_are_queried(api):
+    changed_at = (datetime.now(timezone.utc) + timedelta(hours=2)).strftime(
+        "%Y-%m-%d %H:%M:%S.%f"
+    )
+    api["changes"] = [change(3, changed_at), change(1, changed_at)]
+    api["campaigns"] = [campaign(1), campaign(3)]
+    bookmark = (datetime.now(timezone.utc) - timedelta(days=3)).strftime(
+        "%Y-%m-%d %H:%M:%S"
+    )
+
+    records, state = sync_campaigns(SAMPLE_CONFIG, campaign_state(bookmark))
+
+    change_query, campaign_query = api["queries"]
+    assert "FROM change_status" in change_query
+    assert f"BETWEEN '{bookmark}'" in change_query
+    assert parse_gaql(campaign_query).clauses == (
+        "WHERE campaign.resource_name IN "
+        "('customers/1/campaigns/1', 'customers/1/campaigns/3') "
+        "ORDER BY campaign.id"
+    )
+    assert len(records) == 2
+    assert state["change_status_bookmark"] == changed_at
+
+
+def test_nothing_changed(api):
+    bookmark = (datetime.now(timezone.utc) - timedelta(days=3)).strftime(
+        "%Y-%m-%d %H:%M:%S"
+    )
+
+    records, state = sync_campaigns(SAMPLE_CONFIG, campaign_state(bookmark))
+
+    assert records == []
+    assert len(api["queries"]) == 1
+    assert state["change_status_bookmark"] > bookmark
+
+
+def test_old_bookmark_queries_every_resource(api):
+    api["campaigns"] = [campaign(1)]
+
+    records, _ = sync_campaigns(SAMPLE_CONFIG, campaign_state("2020-01-01 00:00:00"))
+
+    assert len(records) == 1
+    assert len(api["queries"]) == 1
+    assert "change_status" not in api["queries"][0]
+
+
+def test_unchanged_records_are_not_tombstoned(api, tmp_path):
+    config = {
+        **SAMPLE_CONFIG,
+        "cache_dir": str(tmp_path),
+        "change_detection": True,
+        "change_detection_tombstones": True,
+    }
+    api["campaigns"] = [campaign(1), campaign(2)]
+    _, state = sync_campaigns(config)
+
+    api["changes"] = [change(2, state["change_status_bookmark"])]
+    api["campaigns"] = [campaign(2)]
+    records, _ = sync_campaigns(
+        config,
+        campaign_state(
+            state["change_status_bookmark"],
+            fingerprint_generation=state["fingerprint_generation"],
+        ),
+    )
+
+    # campaign 2 is unchanged, and campaign 1 wasn't queried
+    assert records == []
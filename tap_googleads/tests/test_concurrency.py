@@ -0,0 +1,262 @@
+"""Tests concurrent per-customer syncing of report streams."""
+
+import datetime
+import json
+import re
+import sys
+import threading
+import time
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+import responses
+
+import tap_googleads.tap
+from tap_googleads.client import (
+    PREFETCH_CHUNK_SIZE,
+    PREFETCH_MAX_CHUNKS,
+    PrefetchedRecords,
+)
+
+SAMPLE_CONFIG = {
+    "start_date": datetime.datetime.now(datetime.timezone.utc).strftime(
+        "%Y-%m-%dT%H:%M:%SZ"
+    ),
+    "client_id": "12345",
+    "client_secret": "12345",
+    "developer_token": "12345",
+    "refresh_token": "12345",
+    "customer_id": "12345",
+    "login_customer_id": "12345",
+    "max_concurrent_customers": 2,
+}
+
+CUSTOMER_IDS = ["1", "2", "3"]
+
+
+@pytest.fixture
+def mocked_responses():
+    with responses.RequestsMock(assert_all_requests_are_fired=False) as rsps:
+        yield rsps
+
+
+def search_callback(request):
+    if "customer_client" in request.url:
+        results = [
+            {"customerClient": {"id": customer_id, "manager": False}}
+            for customer_id in CUSTOMER_IDS
+        ]
+    else:
+        customer_id = re.search(r"/customers/(\d+)/", request.url).group(1)
+        # Same resource names for every stream, so any stream can parse them
+        resources = [
+            {"resourceName": f"customers/{customer_id}/campaigns/{i}"} for i in range(3)
+        ]
+        results = [
+            {"campaign": resource, "adGroup": resource, "geoTargetConstant": resource}
+            for resource in resources
+        ]
+    return 200, {}, json.dumps({"results": results})
+
+
+def test_concurrent_customers_keep_message_order(mocked_responses, capsys):
+    mocked_responses.add(
+        responses.POST,
+        re.compile(r"https://www.googleapis.com/oauth2/v4/token.*"),
+        json={"access_token": "access_granted", "expires_in": 3600},
+    )
+    mocked_responses.add_callback(
+        responses.POST,
+        re.compile(r"https://googleads.googleapis.com/v14/customers/\d+/googleAds:.*"),
+        callback=search_callback,
+        content_type="application/json",
+    )
+    tap = tap_googleads.tap.TapGoogleAds(config=SAMPLE_CONFIG, parse_env_config=False)
+    hierarchy_stream = tap.streams["customer_hierarchy"]
+    for stream in hierarchy_stream.child_streams:
+        stream.selected = stream.name == "campaign"
+
+    hierarchy_stream.sync({"resourceNames": ["customers/12345"]})
+
+    messages = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    campaign_keys = [
+        message["record"]["_sdc_primary_key"]
+        for message in messages
+        if message["type"] == "RECORD" and message["stream"] == "campaign"
+    ]
+    assert campaign_keys == [
+        f"customers/{customer_id}/campaigns/{i}"
+        for customer_id in CUSTOMER_IDS
+        for i in range(3)
+    ]
+
+
+def test_children_sync_while_hierarchy_is_read(mocked_responses, capsys, monkeypatch):
+    customer_ids = ["1", "2", "3", "4", "5"]
+    monkeypatch.setattr(sys.modules[__name__], "CUSTOMER_IDS", customer_ids)
+    mocked_responses.add(
+        responses.POST,
+        re.compile(r"https://www.googleapis.com/oauth2/v4/token.*"),
+        json={"access_token": "access_granted", "expires_in": 3600},
+    )
+    mocked_responses.add_callback(
+        responses.POST,
+        re.compile(r"https://googleads.googleapis.com/v14/customers/\d+/googleAds:.*"),
+        callback=search_callback,
+        content_type="application/json",
+    )
+    tap = tap_googleads.tap.TapGoogleAds(config=SAMPLE_CONFIG, parse_env_config=False)
+    hierarchy_stream = tap.streams["customer_hierarchy"]
+    for stream in hierarchy_stream.child_streams:
+        stream.selected = stream.name == "campaign"
+
+    hierarchy_stream.sync({"resourceNames": ["customers/12345"]})
+
+    messages = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    records = [
+        (message["stream"], message["record"]["_sdc_primary_key"])
+        for message in messages
+        if message["type"] == "RECORD"
+    ]
+    streams = [stream_name for stream_name, _ in records]
+    # Customer 1 is synced once 2 more customers are fetching ahead
+    assert streams.index("campaign") < len(streams) - streams[::-1].index(
+        "customer_hierarchy"
+    )
+    assert [key for stream_name, key in records if stream_name == "campaign"] == [
+        f"customers/{customer_id}/campaigns/{i}"
+        for customer_id in customer_ids
+        for i in range(3)
+    ]
+
+
+def test_concurrent_streams_keep_message_order(mocked_responses, capsys):
+    mocked_responses.add(
+        responses.POST,
+        re.compile(r"https://www.googleapis.com/oauth2/v4/token.*"),
+        json={"access_token": "access_granted", "expires_in": 3600},
+    )
+    mocked_responses.add(
+        responses.GET,
+        "https://googleads.googleapis.com/v14/customers:listAccessibleCustomers",
+        json={"resourceNames": ["customers/12345"]},
+    )
+    mocked_responses.add_callback(
+        responses.POST,
+        re.compile(r"https://googleads.googleapis.com/v14/customers/\d+/googleAds:.*"),
+        callback=search_callback,
+        content_type="application/json",
+    )
+    config = {
+        **SAMPLE_CONFIG,
+        "max_concurrent_customers": 1,
+        "max_concurrent_streams": 3,
+    }
+    tap = tap_googleads.tap.TapGoogleAds(config=config, parse_env_config=False)
+    for stream in tap.streams.values():
+        stream.selected = stream.name in ("campaign", "ad_group", "geo_target_constant")
+
+    tap.sync_all()
+
+    messages = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    records = [
+        (message["stream"], message["record"]["_sdc_primary_key"])
+        for message in messages
+        if message["type"] == "RECORD"
+    ]
+    assert records == [
+        (stream_name, f"customers/{customer_id}/campaigns/{i}")
+        for customer_id in CUSTOMER_IDS
+        for stream_name in ("campaign", "ad_group")
+        for i in range(3)
+    ] + [("geo_target_constant", f"customers/12345/campaigns/{i}") for i in range(3)]
+
+
+def test_failed_sync_stops_concurrent_streams(mocked_responses, capsys):
+    mocked_responses.add(
+        responses.POST,
+        re.compile(r"https://www.googleapis.com/oauth2/v4/token.*"),
+        json={"access_token": "access_granted", "expires_in": 3600},
+    )
+    mocked_responses.add(
+        responses.GET,
+        "https://googleads.googleapis.com/v14/customers:listAccessibleCustomers",
+        json={"resourceNames": ["customers/12345"]},
+    )
+    # More geo targets than a prefetching worker holds before waiting
+    geo_targets = [
+        {"geoTargetConstant": {"resourceName": f"geoTargetConstants/{i}"}}
+        for i in range((PREFETCH_MAX_CHUNKS + 2) * PREFETCH_CHUNK_SIZE)
+    ]
+    mocked_responses.add(
+        responses.POST,
+        re.compile(r".*/googleAds:.*"),
+        match=[_query_matcher("FROM geo_target_constant")],
+        json={"results": geo_targets},
+    )
+    mocked_responses.add(
+        responses.POST,
+        re.compile(r".*/googleAds:.*"),
+        status=400,
+        json={"error": {"message": "Bad request"}},
+    )
+    config = {**SAMPLE_CONFIG, "max_concurrent_streams": 2}
+    tap = tap_googleads.tap.TapGoogleAds(config=config, parse_env_config=False)
+    for stream in tap.streams.values():
+        stream.selected = stream.name in ("campaign", "geo_target_constant")
+    errors = []
+
+    def sync():
+        try:
+            tap.sync_all()
+        except Exception as e:
+            errors.append(e)
+
+    syncing = threading.Thread(target=sync, daemon=True)
+    syncing.start()
+    syncing.join(timeout=30)
+
+    assert not syncing.is_alive()
+    assert [type(e).__name__ for e in errors] == ["FatalAPIError"]
+
+
+def _query_matcher(text: str):
+    def match(request):
+        query = parse_qs(urlparse(request.url).query).get("query", [""])[0]
+        return text in query, f"{text} not in query"
+
+    return match
+
+
+def test_prefetched_records_are_bounded():
+    fetched = []
+
+    def records(batch: int):
+        for i in range(5000):
+            fetched.append(i)
+            yield {"batch": batch, "i": i}
+
+    prefetched = PrefetchedRecords(max_chunks=2)
+    worker = threading.Thread(target=prefetched.fill, args=([records(0), records(1)],))
+    worker.start()
+    time.sleep(0.5)
+
+    # Two queued chunks, plus the one waiting to be queued
+    assert len(fetched) <= 3 * PREFETCH_CHUNK_SIZE
+    batches = [list(batch) for batch in prefetched.batches()]
+    worker.join(timeout=5)
+    assert [len(batch) for batch in batches] == [5000, 5000]
+    assert batches[1][0] == {"batch": 1, "i": 0}
+
+
+def test_cancelled_prefetch_stops_the_worker():
+    prefetched = PrefetchedRecords(max_chunks=1)
+    worker = threading.Thread(
+        target=prefetched.fill, args=([({"i": i} for i in range(10**6))],)
+    )
+    worker.start()
+
+    prefetched.cancel()
+    worker.join(timeout=5)
+
+    assert not worker.is_alive()
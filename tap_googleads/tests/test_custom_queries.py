@@ -0,0 +1,113 @@
+"""Tests report streams defined by the custom_queries setting."""
+
+import json
+import re
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+import responses
+
+import tap_googleads.tap
+from singer_sdk.exceptions import ConfigValidationError
+
+SAMPLE_CONFIG = {
+    "start_date": "2023-01-01T00:00:00Z",
+    "end_date": "2023-01-31T00:00:00Z",
+    "client_id": "12345",
+    "client_secret": "12345",
+    "developer_token": "12345",
+    "refresh_token": "12345",
+    "customer_id": "12345",
+    "login_customer_id": "12345",
+    "custom_queries": [
+        {
+            "name": "campaign_clicks_by_network",
+            "resource": "campaign",
+            "fields": ["campaign.name", "campaign.labels", "metrics.clicks"],
+            "segments": ["segments.date", "segments.ad_network_type"],
+            "conditions": ["campaign.status = 'ENABLED'"],
+        },
+        {
+            "name": "labels",
+            "resource": "label",
+            "fields": ["label.id", "label.name"],
+        },
+    ],
+}
+
+
+@pytest.fixture
+def mocked_responses():
+    with responses.RequestsMock(assert_all_requests_are_fired=False) as rsps:
+        rsps.add(
+            responses.POST,
+            re.compile(r"https://www.googleapis.com/oauth2/v4/token.*"),
+            json={"access_token": "access_granted", "expires_in": 3600},
+        )
+        yield rsps
+
+
+def test_custom_query_streams():
+    tap = tap_googleads.tap.TapGoogleAds(config=SAMPLE_CONFIG, parse_env_config=False)
+    stream = tap.streams["campaign_clicks_by_network"]
+
+    assert stream in tap.streams["customer_hierarchy"].child_streams
+    assert stream.replication_key == "segments_date"
+    assert stream.primary_keys_jsonpaths == [
+        "campaign.resourceName",
+        "segments.date",
+        "segments.adNetworkType",
+    ]
+    properties = stream.schema["properties"]
+    assert properties["campaign"]["properties"] == {
+        "resourceName": {"type": "string"},
+        "name": {"type": "string"},
+        "labels": {"type": "array", "items": {"type": "string"}},
+    }
+    assert properties["metrics"]["properties"]["clicks"] == {"type": "string"}
+    assert stream.get_gaql({"client_id": "1"}) == (
+        "SELECT campaign.name, campaign.labels, metrics.clicks, segments.date, "
+        "segments.ad_network_type FROM campaign WHERE campaign.status = 'ENABLED' "
+        "AND segments.date BETWEEN '2023-01-01' AND '2023-01-31'"
+    )
+
+    labels = tap.streams["labels"]
+    assert labels.replication_key is None
+    assert labels.get_gaql(None) == "SELECT label.id, label.name FROM label"
+
+
+def test_custom_query_records(mocked_responses):
+    row = {
+        "campaign": {"resourceName": "customers/1/campaigns/2", "name": "Campaign"},
+        "metrics": {"clicks": "3"},
+        "segments": {"date": "2023-01-02", "adNetworkType": "SEARCH"},
+    }
+    mocked_responses.add(
+        responses.POST,
+        re.compile(r"https://googleads.googleapis.com/v14/customers/1/.*"),
+        json={"results": [row]},
+    )
+    tap = tap_googleads.tap.TapGoogleAds(config=SAMPLE_CONFIG, parse_env_config=False)
+
+    records = list(
+        tap.streams["campaign_clicks_by_network"].get_records({"client_id": "1"})
+    )
+
+    query = parse_qs(urlparse(mocked_responses.calls[-1].request.url).query)["query"]
+    assert "FROM campaign" in query[0]
+    assert records[0]["_sdc_primary_key"] == (
+        "customers/1/campaigns/2:2023-01-02:SEARCH"
+    )
+    assert records[0]["segments_date"] == "2023-01-02"
+
+
+def test_custom_query_names_are_unique():
+    config = {
+        **SAMPLE_CONFIG,
+        "custom_queries": [
+            {"name": "campaign", "resource": "campaign", "fields": ["campaign.id"]}
+        ],
+    }
+
+    with pytest.raises(ConfigValidationError):
+        tap_googleads.tap.TapGoogleAds(config=config, parse_env_config=False)
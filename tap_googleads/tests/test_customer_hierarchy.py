@@ -0,0 +1,73 @@
+"""Tests the customer hierarchy walk."""
+
+import json
+import re
+
+import pytest
+import responses
+
+import tap_googleads.tap
+
+SAMPLE_CONFIG = {
+    "client_id": "12345",
+    "client_secret": "12345",
+    "developer_token": "12345",
+    "refresh_token": "12345",
+    "customer_id": "100",
+    "login_customer_id": "100",
+    "max_concurrent_customers": 2,
+}
+
+# manager id -> [(client id, is manager)], level 0 is the manager itself
+HIERARCHY = {
+    "100": [("100", True), ("200", True), ("1", False), ("400", True)],
+    "200": [("200", True), ("1", False), ("2", False), ("300", True)],
+    "300": [("300", True), ("3", False)],
+    "400": [("400", True), ("300", True)],
+}
+
+
+@pytest.fixture
+def mocked_responses():
+    with responses.RequestsMock(assert_all_requests_are_fired=False) as rsps:
+        yield rsps
+
+
+def hierarchy_callback(request):
+    manager_id = re.search(r"/customers/(\d+)/", request.url).group(1)
+    results = [
+        {"customerClient": {"id": client_id, "manager": manager}}
+        for client_id, manager in HIERARCHY[manager_id]
+    ]
+    return 200, {}, json.dumps({"results": results})
+
+
+def test_nested_managers_are_expanded_once(mocked_responses):
+    mocked_responses.add(
+        responses.POST,
+        re.compile(r"https://www.googleapis.com/oauth2/v4/token.*"),
+        json={"access_token": "access_granted", "expires_in": 3600},
+    )
+    mocked_responses.add_callback(
+        responses.POST,
+        re.compile(r"https://googleads.googleapis.com/v14/customers/\d+/.*"),
+        callback=hierarchy_callback,
+        content_type="application/json",
+    )
+    tap = tap_googleads.tap.TapGoogleAds(config=SAMPLE_CONFIG, parse_env_config=False)
+    stream = tap.streams["customer_hierarchy"]
+
+    records = list(stream.get_records({"resourceNames": ["customers/100"]}))
+
+    assert [r["customerClient"]["id"] for r in records] == ["1", "2", "3"]
+    assert {r["login_customer_id"] for r in records} == {"100"}
+    search_calls = [
+        call for call in mocked_responses.calls if "googleAds" in call.request.url
+    ]
+    assert sorted(
+        re.search(r"/customers/(\d+)/", call.request.url).group(1)
+        for call in search_calls
+    ) == ["100", "200", "300", "400"]
+    assert {call.request.headers["login-customer-id"] for call in search_calls} == {
+        "100"
+    }
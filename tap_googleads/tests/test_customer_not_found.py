@@ -25,15 +25,8 @@ SAMPLE_CONFIG = {
 
 @pytest.fixture
 def mocked_responses():
-    # Assert all reqests are fired is turned off because we have some issues with the Authenticator singleton.
-    # Easiest way to explain the issue is to give steps to reproduce
-    # Set assert_all_requests_are_fired to True
-    # Run poetry run pytest (runs core tests, and test_customer_not_enabled
-    # This job will fail
-    # Run poetry run pytest test_customer_not_found.py
-    # Test will pass
-    # Ends up being due to the modules for the GoogleAdsTap not being reloaded, and how the authenticator metaclass we're using works
-    with responses.RequestsMock(assert_all_requests_are_fired=False) as rsps:
+    # Each test's tap has its own authenticator, which requests its own token
+    with responses.RequestsMock() as rsps:
         yield rsps
 
 
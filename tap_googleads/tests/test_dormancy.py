@@ -0,0 +1,127 @@
+"""Tests skipping the performance streams of dormant customers."""
+
+import json
+import re
+from datetime import date, datetime, timedelta, timezone
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+import responses
+
+import tap_googleads.tap
+
+TODAY = date.today()
+
+SAMPLE_CONFIG = {
+    "start_date": f"{TODAY - timedelta(days=90)}T00:00:00Z",
+    "end_date": f"{TODAY}T00:00:00Z",
+    "client_id": "12345",
+    "client_secret": "12345",
+    "developer_token": "12345",
+    "refresh_token": "12345",
+    "customer_id": "12345",
+    "login_customer_id": "12345",
+    "lookback_window_days": 3,
+    "skip_dormant_customers": True,
+}
+
+
+@pytest.fixture
+def api():
+    api = {"impressions": [], "queries": []}
+
+    def search(request):
+        query = parse_qs(urlparse(request.url).query)["query"][0]
+        api["queries"].append(query)
+        rows = api["impressions"] if "FROM customer " in query else []
+        return 200, {}, json.dumps({"results": rows})
+
+    with responses.RequestsMock(assert_all_requests_are_fired=False) as rsps:
+        rsps.add(
+            responses.POST,
+            re.compile(r"https://www.googleapis.com/oauth2/v4/token.*"),
+            json={"access_token": "access_granted", "expires_in": 3600},
+        )
+        rsps.add_callback(
+            responses.POST,
+            re.compile(r"https://googleads.googleapis.com/v14/customers/1/.*"),
+            callback=search,
+            content_type="application/json",
+        )
+        yield api
+
+
+def performance_state(bookmark: date, last_synced_at: datetime) -> dict:
+    partition = {
+        "context": {"client_id": "1"},
+        "replication_key": "segments_date",
+        "replication_key_value": bookmark.isoformat(),
+        "last_synced_at": last_synced_at.isoformat(),
+    }
+    return {"bookmarks": {"campaign_performance": {"partitions": [partition]}}}
+
+
+def sync_performance(state: dict = None, **config):
+    tap = tap_googleads.tap.TapGoogleAds(
+        config={**SAMPLE_CONFIG, **config}, state=state, parse_env_config=False
+    )
+    stream = tap.streams["campaign_performance"]
+    list(stream.get_records({"client_id": "1"}))
+    return stream.get_context_state({"client_id": "1"})
+
+
+def test_dormant_customer_is_skipped(api):
+    synced_at = datetime.now(timezone.utc) - timedelta(days=1)
+
+    state = sync_performance(performance_state(TODAY, synced_at))
+
+    assert len(api["queries"]) == 1
+    assert "FROM customer " in api["queries"][0]
+    assert state["last_synced_at"] == synced_at.isoformat()
+
+
+def test_active_customer_is_synced(api):
+    api["impressions"] = [{"metrics": {"impressions": "12"}}]
+    synced_at = datetime.now(timezone.utc) - timedelta(days=1)
+
+    state = sync_performance(performance_state(TODAY, synced_at))
+
+    assert "FROM campaign " in api["queries"][-1]
+    assert state["last_synced_at"] > synced_at.isoformat()
+
+
+def test_dormant_customer_is_swept(api):
+    synced_at = datetime.now(timezone.utc) - timedelta(days=8)
+
+    state = sync_performance(performance_state(TODAY, synced_at))
+
+    assert len(api["queries"]) == 1
+    assert "FROM campaign " in api["queries"][0]
+    assert state["last_synced_at"] > synced_at.isoformat()
+
+
+def test_customer_dormant_for_months_is_skipped(api):
+    synced_at = datetime.now(timezone.utc) - timedelta(days=1)
+    bookmark = TODAY - timedelta(days=120)
+
+    sync_performance(performance_state(bookmark, synced_at))
+
+    assert len(api["queries"]) == 1
+    assert "FROM customer " in api["queries"][0]
+
+
+def test_dates_before_the_window_are_synced(api):
+    # Less the lookback window, the last sync is 31 days ago
+    synced_at = datetime.now(timezone.utc) - timedelta(days=28)
+
+    sync_performance(performance_state(TODAY, synced_at), dormant_sweep_days=60)
+
+    assert len(api["queries"]) == 1
+    assert "FROM campaign " in api["queries"][0]
+
+
+def test_first_sync_is_never_skipped(api):
+    state = sync_performance()
+
+    assert len(api["queries"]) == 1
+    assert "last_synced_at" in state
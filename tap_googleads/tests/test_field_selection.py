@@ -0,0 +1,63 @@
+"""Tests leaving deselected fields out of the GAQL SELECT list."""
+
+from tap_googleads.tap import TapGoogleAds
+from tap_googleads.utils import parse_gaql
+
+SAMPLE_CONFIG = {
+    "start_date": "2023-01-01T00:00:00Z",
+    "end_date": "2023-01-31T00:00:00Z",
+    "client_id": "12345",
+    "client_secret": "12345",
+    "developer_token": "12345",
+    "refresh_token": "12345",
+    "customer_id": "12345",
+    "login_customer_id": "12345",
+}
+
+
+def get_selected_fields(stream_name: str, deselected: list) -> list:
+    catalog = TapGoogleAds(config=SAMPLE_CONFIG, parse_env_config=False).catalog_dict
+    for catalog_entry in catalog["streams"]:
+        if catalog_entry["tap_stream_id"] != stream_name:
+            continue
+        for metadata in catalog_entry["metadata"]:
+            if metadata["breadcrumb"] in deselected:
+                metadata["metadata"]["selected"] = False
+
+    tap = TapGoogleAds(config=SAMPLE_CONFIG, catalog=catalog, parse_env_config=False)
+    stream = tap.streams[stream_name]
+    return parse_gaql(stream.get_query({"client_id": "1"})).fields
+
+
+def test_undeclared_fields_are_not_requested():
+    fields = get_selected_fields("ad_group", [])
+
+    assert "ad_group.name" in fields
+    assert "ad_group.labels" not in fields
+    assert "ad_group.url_custom_parameters" not in fields
+
+
+def test_deselected_fields_are_not_requested():
+    fields = get_selected_fields("campaign_performance", [["properties", "campaign"]])
+
+    assert not any(field.startswith("campaign.") for field in fields)
+    assert "metrics.clicks" in fields
+    assert fields.count("segments.device") == 1
+
+
+def test_segments_and_a_metric_are_kept():
+    fields = get_selected_fields(
+        "campaign_performance",
+        [["properties", "metrics"], ["properties", "segments"]],
+    )
+
+    assert "segments.device" in fields and "segments.date" in fields
+    assert [field for field in fields if field.startswith("metrics.")] == [
+        "metrics.conversions"
+    ]
+
+
+def test_key_fields_are_kept():
+    fields = get_selected_fields("ad_group_performance", [["properties", "adGroup"]])
+
+    assert "ad_group.id" in fields
@@ -0,0 +1,108 @@
+"""Tests aggregating report streams over fewer segments."""
+
+import re
+
+import pytest
+import responses
+from singer_sdk.exceptions import ConfigValidationError
+
+import tap_googleads.tap
+from tap_googleads.utils import parse_gaql
+
+SAMPLE_CONFIG = {
+    "start_date": "2023-01-04T00:00:00Z",
+    "end_date": "2023-01-31T00:00:00Z",
+    "client_id": "12345",
+    "client_secret": "12345",
+    "developer_token": "12345",
+    "refresh_token": "12345",
+    "customer_id": "12345",
+    "login_customer_id": "12345",
+    "stream_granularity": [
+        {
+            "stream": "campaign_performance",
+            "drop_segments": ["segments.device"],
+            "date_granularity": "week",
+        }
+    ],
+}
+
+
+@pytest.fixture
+def mocked_responses():
+    with responses.RequestsMock(assert_all_requests_are_fired=False) as rsps:
+        rsps.add(
+            responses.POST,
+            re.compile(r"https://www.googleapis.com/oauth2/v4/token.*"),
+            json={"access_token": "access_granted", "expires_in": 3600},
+        )
+        yield rsps
+
+
+def test_segments_are_dropped_and_rolled_up():
+    tap = tap_googleads.tap.TapGoogleAds(config=SAMPLE_CONFIG, parse_env_config=False)
+    stream = tap.streams["campaign_performance"]
+
+    query = parse_gaql(stream.get_query({"client_id": "1"}))
+
+    segments = [field for field in query.fields if field.startswith("segments.")]
+    assert segments == ["segments.week"]
+    # Whole weeks, from the Monday before start_date
+    assert "segments.date BETWEEN '2023-01-02' AND '2023-01-31'" in query.clauses
+    assert stream.primary_keys_jsonpaths == ["campaign.resourceName", "segments.week"]
+    assert stream.replication_key_jsonpath == "segments.week"
+    assert set(stream.schema["properties"]["segments"]["properties"]) == {"week"}
+
+
+def test_weekly_records(mocked_responses):
+    mocked_responses.add(
+        responses.POST,
+        re.compile(r"https://googleads.googleapis.com/v14/customers/1/.*"),
+        json={
+            "results": [
+                {
+                    "campaign": {"resourceName": "customers/1/campaigns/2"},
+                    "segments": {"week": "2023-01-02"},
+                    "metrics": {"clicks": "10"},
+                }
+            ]
+        },
+    )
+    tap = tap_googleads.tap.TapGoogleAds(config=SAMPLE_CONFIG, parse_env_config=False)
+
+    records = list(tap.streams["campaign_performance"].get_records({"client_id": "1"}))
+
+    assert records[0]["_sdc_primary_key"] == "customers/1/campaigns/2:2023-01-02"
+    assert records[0]["segments_date"] == "2023-01-02"
+
+
+def test_date_windows_follow_granularity():
+    config = {
+        **SAMPLE_CONFIG,
+        "date_window_size": "day",
+        "stream_granularity": [
+            {"stream": "campaign_performance", "date_granularity": "month"}
+        ],
+    }
+    tap = tap_googleads.tap.TapGoogleAds(config=config, parse_env_config=False)
+
+    contexts = tap.streams["campaign_performance"].get_request_contexts(None)
+
+    assert [(c["start_date"], c["end_date"]) for c in contexts] == [
+        ("2023-01-01", "2023-01-31")
+    ]
+
+
+@pytest.mark.parametrize(
+    "granularity",
+    [
+        {"stream": "campaign_performance", "drop_segments": ["segments.date"]},
+        {"stream": "campaign_performance", "drop_segments": ["campaign.name"]},
+        {"stream": "campaign", "date_granularity": "week"},
+    ],
+)
+def test_invalid_granularity(granularity):
+    config = {**SAMPLE_CONFIG, "stream_granularity": [granularity]}
+
+    with pytest.raises(ConfigValidationError):
+        tap_googleads.tap.TapGoogleAds(config=config, parse_env_config=False)
@@ -0,0 +1,124 @@
+"""Tests incremental replication of the performance streams."""
+
+import json
+import re
+from urllib.parse import parse_qs, urlparse
+
+import responses
+
+import tap_googleads.tap
+
+SAMPLE_CONFIG = {
+    "start_date": "2023-01-01T00:00:00Z",
+    "end_date": "2023-03-31T00:00:00Z",
+    "client_id": "12345",
+    "client_secret": "12345",
+    "developer_token": "12345",
+    "refresh_token": "12345",
+    "customer_id": "12345",
+    "login_customer_id": "12345",
+    "lookback_window_days": 3,
+}
+
+SAMPLE_STATE = {
+    "bookmarks": {
+        "campaign_performance": {
+            "partitions": [
+                {
+                    "context": {"client_id": "1"},
+                    "replication_key": "segments_date",
+                    "replication_key_value": "2023-03-20",
+                }
+            ]
+        }
+    }
+}
+
+
+def test_start_date_from_customer_bookmark():
+    tap = tap_googleads.tap.TapGoogleAds(
+        config=SAMPLE_CONFIG, state=SAMPLE_STATE, parse_env_config=False
+    )
+    stream = tap.streams["campaign_performance"]
+
+    assert stream.get_start_date({"client_id": "1"}) == "2023-03-17"
+    assert stream.get_start_date({"client_id": "2"}) == "2023-01-01"
+
+
+def test_replication_key_copied_to_root():
+    tap = tap_googleads.tap.TapGoogleAds(config=SAMPLE_CONFIG, parse_env_config=False)
+    stream = tap.streams["campaign_performance"]
+    row = {
+        "campaign": {"resourceName": "customers/1/campaigns/2"},
+        "segments": {"date": "2023-03-20"},
+    }
+
+    res = stream.post_process(row)
+
+    assert res["segments_date"] == "2023-03-20"
+    assert res["_sdc_primary_key"] == "customers/1/campaigns/2:2023-03-20"
+
+
+def test_date_windows_start_from_bookmark():
+    config = {**SAMPLE_CONFIG, "date_window_size": "month"}
+    tap = tap_googleads.tap.TapGoogleAds(
+        config=config, state=SAMPLE_STATE, parse_env_config=False
+    )
+    stream = tap.streams["campaign_performance"]
+
+    res = stream.get_request_contexts({"client_id": "2"})
+
+    assert [(c["start_date"], c["end_date"]) for c in res] == [
+        ("2023-01-01", "2023-01-31"),
+        ("2023-02-01", "2023-02-28"),
+        ("2023-03-01", "2023-03-31"),
+    ]
+    assert "BETWEEN '2023-02-01' AND '2023-02-28'" in stream.get_gaql(res[1])
+    assert stream.get_request_contexts({"client_id": "1"}) == [
+        {"client_id": "1", "start_date": "2023-03-17", "end_date": "2023-03-31"}
+    ]
+
+
+def test_checkpoints_dont_move_the_bookmark_back(capsys):
+    config = {
+        **SAMPLE_CONFIG,
+        "end_date": "2023-03-22T00:00:00Z",
+        "date_window_size": "day",
+        "lookback_window_days": 5,
+    }
+
+    def search(request):
+        query = parse_qs(urlparse(request.url).query)["query"][0]
+        day = re.search(r"BETWEEN '([0-9-]+)'", query).group(1)
+        row = {
+            "campaign": {"resourceName": "customers/1/campaigns/2"},
+            "segments": {"date": day},
+        }
+        return 200, {}, json.dumps({"results": [row]})
+
+    with responses.RequestsMock(assert_all_requests_are_fired=False) as rsps:
+        rsps.add(
+            responses.POST,
+            re.compile(r"https://www.googleapis.com/oauth2/v4/token.*"),
+            json={"access_token": "access_granted", "expires_in": 3600},
+        )
+        rsps.add_callback(
+            responses.POST,
+            re.compile(r"https://googleads.googleapis.com/v14/customers/1/.*"),
+            callback=search,
+            content_type="application/json",
+        )
+        tap = tap_googleads.tap.TapGoogleAds(
+            config=config, state=SAMPLE_STATE, parse_env_config=False
+        )
+        tap.streams["campaign_performance"].sync({"client_id": "1"})
+        tap.message_writer.flush()
+
+    bookmarks = [
+        message["value"]["bookmarks"]["campaign_performance"]["partitions"][0]
+        for message in map(json.loads, capsys.readouterr().out.splitlines())
+        if message["type"] == "STATE"
+    ]
+    assert len(bookmarks) > 1
+    assert all(b["replication_key_value"] >= "2023-03-20" for b in bookmarks)
+    assert bookmarks[-1]["replication_key_value"] == "2023-03-22"
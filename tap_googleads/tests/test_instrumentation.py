@@ -0,0 +1,109 @@
+"""Tests per stream and customer metrics."""
+
+import datetime
+import json
+import re
+
+import pytest
+import responses
+from singer_sdk import metrics
+
+import tap_googleads.tap
+from tap_googleads.instrumentation import StreamMetric, write_prometheus_textfile
+from tap_googleads.tests.test_concurrency import CUSTOMER_IDS, search_callback
+
+SAMPLE_CONFIG = {
+    "start_date": datetime.datetime.now(datetime.timezone.utc).strftime(
+        "%Y-%m-%dT%H:%M:%SZ"
+    ),
+    "client_id": "12345",
+    "client_secret": "12345",
+    "developer_token": "12345",
+    "refresh_token": "12345",
+    "customer_id": "12345",
+    "login_customer_id": "12345",
+}
+
+
+@pytest.fixture
+def mocked_responses():
+    with responses.RequestsMock(assert_all_requests_are_fired=False) as rsps:
+        rsps.add(
+            responses.POST,
+            re.compile(r"https://www.googleapis.com/oauth2/v4/token.*"),
+            json={"access_token": "access_granted", "expires_in": 3600},
+        )
+        rsps.add(
+            responses.GET,
+            "https://googleads.googleapis.com/v14/customers:listAccessibleCustomers",
+            json={"resourceNames": ["customers/12345"]},
+        )
+        rsps.add_callback(
+            responses.POST,
+            re.compile(r"https://googleads.googleapis.com/v14/customers/\d+/.*"),
+            callback=search_callback,
+            content_type="application/json",
+        )
+        yield rsps
+
+
+def test_metrics_per_stream_and_customer(mocked_responses, tmp_path):
+    config = {
+        **SAMPLE_CONFIG,
+        "metrics_log_path": str(tmp_path / "metrics.jsonl"),
+        "metrics_prometheus_path": str(tmp_path / "metrics.prom"),
+    }
+    tap = tap_googleads.tap.TapGoogleAds(config=config, parse_env_config=False)
+    for stream in tap.streams.values():
+        stream.selected = stream.name in ("customer_hierarchy", "campaign")
+
+    tap.sync_all()
+
+    with open(tmp_path / "metrics.jsonl") as metrics_file:
+        points = [json.loads(line) for line in metrics_file]
+    campaign = {
+        (point["tags"]["client_id"], point["metric"]): point["value"]
+        for point in points
+        if point["tags"]["stream"] == "campaign" and "quantile" not in point["tags"]
+    }
+    for customer_id in CUSTOMER_IDS:
+        assert campaign[(customer_id, "request_count")] == 1
+        assert campaign[(customer_id, "page_count")] == 1
+        assert campaign[(customer_id, "row_count")] == 3
+        assert campaign[(customer_id, "response_bytes")] > 0
+        assert campaign[(customer_id, "retry_count")] == 0
+        assert campaign[(customer_id, "post_process_duration")] > 0
+    quantiles = {
+        point["tags"]["quantile"]
+        for point in points
+        if point["metric"] == "request_latency"
+    }
+    assert quantiles == {0.5, 0.9, 0.99}
+
+    prometheus = (tmp_path / "metrics.prom").read_text()
+    assert "# TYPE tap_googleads_row_count_total counter" in prometheus
+    assert (
+        'tap_googleads_row_count_total{stream="campaign",client_id="1"} 3' in prometheus
+    )
+    assert "# TYPE tap_googleads_request_latency gauge" in prometheus
+    assert re.search(
+        r'tap_googleads_request_latency\{stream="campaign",client_id="1",'
+        r'quantile="0.5"\} \S+',
+        prometheus,
+    )
+
+
+def test_prometheus_label_values_are_escaped(tmp_path):
+    path = tmp_path / "metrics.prom"
+    point = metrics.Point(
+        "counter",
+        StreamMetric.ROW_COUNT,
+        1,
+        {metrics.Tag.STREAM: 'custom\\"query"\n'},
+    )
+
+    write_prometheus_textfile(path, [point])
+
+    assert path.read_text().splitlines()[1] == (
+        'tap_googleads_row_count_total{stream="custom\\\\\\"query\\"\\n"} 1'
+    )
@@ -0,0 +1,128 @@
+"""Tests writing records to stdout in batches and to BATCH files."""
+
+import gzip
+import io
+import json
+import re
+import sys
+from decimal import Decimal
+from urllib.parse import urlparse
+
+import pytest
+import responses
+from singer_sdk._singerlib import RecordMessage
+
+import tap_googleads.tap
+from tap_googleads.output import MessageWriter, serialize
+
+SAMPLE_CONFIG = {
+    "start_date": "2023-01-01T00:00:00Z",
+    "end_date": "2023-01-31T00:00:00Z",
+    "client_id": "12345",
+    "client_secret": "12345",
+    "developer_token": "12345",
+    "refresh_token": "12345",
+    "customer_id": "12345",
+    "login_customer_id": "12345",
+}
+
+ROWS = [
+    {
+        "campaign": {
+            "resourceName": f"customers/1/campaigns/{i}",
+            "id": str(i),
+            "name": "Campaign",
+            "labels": ["undeclared"],
+        }
+    }
+    for i in range(5)
+]
+
+
+@pytest.fixture
+def mocked_responses():
+    with responses.RequestsMock(assert_all_requests_are_fired=False) as rsps:
+        rsps.add(
+            responses.POST,
+            re.compile(r"https://www.googleapis.com/oauth2/v4/token.*"),
+            json={"access_token": "access_granted", "expires_in": 3600},
+        )
+        rsps.add(
+            responses.POST,
+            re.compile(r"https://googleads.googleapis.com/v14/customers/1/.*"),
+            json={"results": ROWS},
+        )
+        yield rsps
+
+
+def sync_campaigns(config: dict, capsys) -> list:
+    tap = tap_googleads.tap.TapGoogleAds(config=config, parse_env_config=False)
+    tap.streams["campaign"].sync({"client_id": "1"})
+    tap.message_writer.flush()
+    return [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+
+
+def test_batched_stdout_keeps_messages(mocked_responses, capsys):
+    unbatched = sync_campaigns(SAMPLE_CONFIG, capsys)
+    batched = sync_campaigns({**SAMPLE_CONFIG, "stdout_batch_size": 2}, capsys)
+
+    def without_time_extracted(messages):
+        return [
+            {k: v for k, v in message.items() if k != "time_extracted"}
+            for message in messages
+        ]
+
+    assert without_time_extracted(batched) == without_time_extracted(unbatched)
+    assert [message["type"] for message in batched] == (
+        ["SCHEMA"] + ["RECORD"] * 5 + ["STATE"]
+    )
+
+
+def test_records_are_written_after_text_messages(monkeypatch):
+    stdout = io.TextIOWrapper(io.BytesIO(), encoding="utf-8")
+    monkeypatch.setattr(sys, "stdout", stdout)
+    writer = MessageWriter()
+
+    stdout.write('{"type": "SCHEMA"}\n')
+    writer.write_record(RecordMessage(stream="campaign", record={"id": 1}))
+    stdout.write('{"type": "STATE"}\n')
+    stdout.flush()
+
+    lines = stdout.buffer.getvalue().decode("utf-8").splitlines()
+    assert [json.loads(line)["type"] for line in lines] == [
+        "SCHEMA",
+        "RECORD",
+        "STATE",
+    ]
+
+
+def test_batch_messages(mocked_responses, capsys, tmp_path):
+    config = {
+        **SAMPLE_CONFIG,
+        "batch_config": {
+            "encoding": {"format": "jsonl", "compression": "gzip"},
+            "storage": {"root": f"file://{tmp_path}", "prefix": "campaign-"},
+            "batch_size": 3,
+        },
+    }
+
+    messages = sync_campaigns(config, capsys)
+
+    batches = [message for message in messages if message["type"] == "BATCH"]
+    assert len(batches) == 2
+    records = []
+    for batch in batches:
+        for url in batch["manifest"]:
+            with gzip.open(urlparse(url).path) as batch_file:
+                records.extend(json.loads(line) for line in batch_file)
+    assert [record["_sdc_primary_key"] for record in records] == [
+        row["campaign"]["resourceName"] for row in ROWS
+    ]
+    # Conformed to the schema like RECORD messages
+    assert "labels" not in records[0]["campaign"]
+    assert messages[-1]["type"] == "STATE"
+
+
+def test_serialize_falls_back_for_decimals():
+    assert serialize({"value": Decimal("1.10")}) == b'{"value": 1.10}\n'
+    assert json.loads(serialize({"value": 1})) == {"value": 1}
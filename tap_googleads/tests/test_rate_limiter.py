@@ -0,0 +1,113 @@
+"""Tests the request rate limiter."""
+
+import json
+import time
+
+import pytest
+import requests
+from singer_sdk.exceptions import RetriableAPIError
+
+from tap_googleads.auth import GoogleAdsAuthenticator
+from tap_googleads.rate_limiter import AdaptiveRateLimiter, get_retry_delay
+from tap_googleads.tap import TapGoogleAds
+
+QUOTA_ERROR = {
+    "error": {
+        "code": 429,
+        "status": "RESOURCE_EXHAUSTED",
+        "details": [
+            {
+                "@type": "type.googleapis.com/google.ads.googleads.v14.errors.GoogleAdsFailure",  # noqa: E501
+                "errors": [
+                    {
+                        "errorCode": {"quotaError": "RESOURCE_EXHAUSTED"},
+                        "details": {
+                            "quotaErrorDetails": {
+                                "rateScope": "DEVELOPER",
+                                "retryDelay": "27s",
+                            }
+                        },
+                    }
+                ],
+            }
+        ],
+    }
+}
+
+
+def make_response(body, headers=None) -> requests.Response:
+    response = requests.Response()
+    response.status_code = 429
+    response._content = json.dumps(body).encode("utf-8")
+    response.headers.update(headers or {})
+    return response
+
+
+def test_get_retry_delay_from_quota_error():
+    assert get_retry_delay(make_response(QUOTA_ERROR)) == 27
+    assert get_retry_delay(make_response([QUOTA_ERROR])) == 27
+    assert get_retry_delay(make_response({}, {"Retry-After": "5"})) == 5
+    assert get_retry_delay(make_response({})) is None
+
+
+def test_concurrent_throttles_halve_rate_once():
+    limiter = AdaptiveRateLimiter(max_rate=8)
+    sent_at = [limiter.acquire() for _ in range(4)]
+
+    for request_sent_at in sent_at:
+        limiter.throttled(request_sent_at)
+
+    assert limiter.rate == 2
+    limiter.throttled(limiter.acquire())
+    assert limiter.rate == 1
+
+
+def test_rate_recovers_up_to_max_rate():
+    limiter = AdaptiveRateLimiter(max_rate=2)
+    limiter.throttled(limiter.acquire())
+
+    for _ in range(200):
+        limiter.succeeded()
+
+    assert limiter.rate == 2
+
+
+def test_acquire_waits_for_retry_delay():
+    limiter = AdaptiveRateLimiter()
+    limiter.throttled(limiter.acquire(), retry_delay=0.2)
+
+    start = time.monotonic()
+    limiter.acquire()
+
+    assert time.monotonic() - start >= 0.2
+
+
+def test_server_errors_dont_raise_the_rate(monkeypatch):
+    config = {
+        "client_id": "12345",
+        "client_secret": "12345",
+        "developer_token": "12345",
+        "refresh_token": "12345",
+        "customer_id": "12345",
+        "login_customer_id": "12345",
+        "max_requests_per_second": 8,
+    }
+    tap = TapGoogleAds(config=config, parse_env_config=False)
+    stream = tap.streams["campaign"]
+    monkeypatch.setattr(GoogleAdsAuthenticator, "auth_headers", {})
+
+    def send(request, **kwargs):
+        response = requests.Response()
+        response.status_code = 503
+        response._content = b"{}"
+        return response
+
+    monkeypatch.setattr(tap.requests_session, "send", send)
+    tap.rate_limiter.throttled(tap.rate_limiter.acquire())
+    throttled_rate = tap.rate_limiter.rate
+    context = {"client_id": "1"}
+
+    with pytest.raises(RetriableAPIError):
+        stream._request(stream.prepare_request(context, None), context)
+
+    assert tap.rate_limiter.rate == throttled_rate
@@ -0,0 +1,157 @@
+"""Tests the HTTP session shared by the streams."""
+
+import io
+import json
+import threading
+
+import backoff
+import pytest
+import requests
+
+from tap_googleads.auth import GoogleAdsAuthenticator
+from tap_googleads.session import build_session, get_connection_stats
+from tap_googleads.tap import TapGoogleAds
+from tap_googleads.tests.benchmarks.mock_server import MockGoogleAdsServer, MockSettings
+
+QUERY = "SELECT campaign.id FROM campaign"
+
+
+@pytest.fixture
+def server():
+    server = MockGoogleAdsServer(MockSettings(rows_per_customer=3))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.mark.parametrize("use_http2", [False, True])
+def test_connections_are_reused(server, use_http2):
+    # The mock server only speaks HTTP/1.1, which HTTP2Adapter falls back to
+    if use_http2:
+        pytest.importorskip("httpx")
+    session = build_session({"use_http2": use_http2, "tcp_keepalive_seconds": 30})
+    url = f"{server.url}/v14/customers/1/googleAds:searchStream"
+
+    for _ in range(3):
+        response = session.post(url, json={"query": QUERY}, stream=True)
+        body = b"".join(response.iter_content(chunk_size=16))
+        assert b"customers/1/campaign/2" in body
+
+    assert get_connection_stats(session) == {
+        "requests": 3,
+        "connections": 1,
+        "reused": 2,
+    }
+
+
+def test_http2_adapter_sends_through_proxies(server):
+    pytest.importorskip("httpx")
+    session = build_session({"use_http2": True})
+
+    response = session.post(
+        "http://googleads.invalid/v14/customers/1/googleAds:searchStream",
+        json={"query": QUERY},
+        proxies={"http": server.url},
+    )
+
+    assert b"customers/1/campaign/2" in response.content
+
+
+@pytest.mark.parametrize(
+    "error, body_error, expected",
+    [
+        ("ConnectError", None, requests.exceptions.ConnectionError),
+        ("ConnectTimeout", None, requests.exceptions.ConnectTimeout),
+        ("ReadTimeout", None, requests.exceptions.ReadTimeout),
+        ("RemoteProtocolError", None, requests.exceptions.ConnectionError),
+        (None, "RemoteProtocolError", requests.exceptions.ChunkedEncodingError),
+        (None, "ReadTimeout", requests.exceptions.ConnectionError),
+    ],
+)
+def test_http2_adapter_raises_requests_errors(monkeypatch, error, body_error, expected):
+    httpx = pytest.importorskip("httpx")
+
+    class BrokenStream(httpx.SyncByteStream):
+        def __iter__(self):
+            yield b'{"results": ['
+            raise getattr(httpx, body_error)("Connection broken")
+
+    def handle(request):
+        if error:
+            raise getattr(httpx, error)("Connection broken", request=request)
+        return httpx.Response(200, stream=BrokenStream())
+
+    session = build_session({"use_http2": True})
+    adapter = session.get_adapter("https://googleads.googleapis.com")
+    client = httpx.Client(transport=httpx.MockTransport(handle))
+    monkeypatch.setattr(adapter, "_get_client", lambda *args: client)
+
+    with pytest.raises(expected):
+        session.post("https://googleads.googleapis.com/v14", json={}).content
+
+
+def test_pool_size_follows_concurrency():
+    session = build_session({"max_concurrent_customers": 32})
+
+    assert session.get_adapter("https://googleads.googleapis.com")._pool_maxsize == 32
+
+
+class _BrokenBody:
+    """Response body whose connection drops after the first chunk."""
+
+    def __init__(self, body: bytes):
+        self.chunks = [body[: len(body) // 2]]
+
+    def read(self, chunk_size: int = -1, decode_content: bool = True) -> bytes:
+        if self.chunks:
+            return self.chunks.pop(0)
+        raise requests.exceptions.ChunkedEncodingError("Connection broken")
+
+    def close(self) -> None:
+        pass
+
+
+def test_broken_off_search_response_is_retried(monkeypatch):
+    config = {
+        "client_id": "12345",
+        "client_secret": "12345",
+        "developer_token": "12345",
+        "refresh_token": "12345",
+        "customer_id": "12345",
+        "login_customer_id": "12345",
+    }
+    tap = TapGoogleAds(config=config, parse_env_config=False)
+    stream = tap.streams["campaign"]
+    monkeypatch.setattr(GoogleAdsAuthenticator, "auth_headers", {})
+    rows = [
+        {"campaign": {"resourceName": f"customers/1/campaigns/{i}"}} for i in range(3)
+    ]
+    body = json.dumps({"results": rows}).encode("utf-8")
+    sent = []
+
+    def send(request, **kwargs):
+        sent.append(request)
+        response = requests.Response()
+        response.status_code = 200
+        response.raw = _BrokenBody(body) if len(sent) == 1 else io.BytesIO(body)
+        return response
+
+    monkeypatch.setattr(tap.requests_session, "send", send)
+    monkeypatch.setattr(
+        stream, "backoff_wait_generator", lambda: backoff.constant(interval=0)
+    )
+
+    records = []
+    for record in stream.get_records({"client_id": "1"}):
+        records.append(record)
+        if len(records) == 1:
+            # Yielded from the first response, before it broke off
+            assert len(sent) == 1
+
+    assert len(sent) == 2
+    # The rows yielded before the retry aren't yielded again
+    assert [record["_sdc_primary_key"] for record in records] == [
+        f"customers/1/campaigns/{i}" for i in range(3)
+    ]
@@ -0,0 +1,148 @@
+"""Tests splitting customers across shards and merging their states."""
+
+import datetime
+import json
+import re
+
+import pytest
+import responses
+
+import tap_googleads.tap
+from tap_googleads.sharding import merge_states
+from tap_googleads.tests.test_concurrency import CUSTOMER_IDS, search_callback
+
+SAMPLE_CONFIG = {
+    "start_date": datetime.datetime.now(datetime.timezone.utc).strftime(
+        "%Y-%m-%dT%H:%M:%SZ"
+    ),
+    "client_id": "12345",
+    "client_secret": "12345",
+    "developer_token": "12345",
+    "refresh_token": "12345",
+    "customer_id": "12345",
+    "login_customer_id": "12345",
+    "shard_count": 2,
+}
+
+
+@pytest.fixture
+def mocked_responses():
+    with responses.RequestsMock(assert_all_requests_are_fired=False) as rsps:
+        rsps.add(
+            responses.POST,
+            re.compile(r"https://www.googleapis.com/oauth2/v4/token.*"),
+            json={"access_token": "access_granted", "expires_in": 3600},
+        )
+        rsps.add_callback(
+            responses.POST,
+            re.compile(r"https://googleads.googleapis.com/v14/customers/\d+/.*"),
+            callback=search_callback,
+            content_type="application/json",
+        )
+        yield rsps
+
+
+def sync_shard(shard_index: int, capsys) -> list:
+    config = {**SAMPLE_CONFIG, "shard_index": shard_index}
+    tap = tap_googleads.tap.TapGoogleAds(config=config, parse_env_config=False)
+    hierarchy_stream = tap.streams["customer_hierarchy"]
+    for stream in hierarchy_stream.child_streams:
+        stream.selected = stream.name == "campaign"
+    hierarchy_stream.sync({"resourceNames": ["customers/12345"]})
+
+    messages = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    return [
+        message["record"]["_sdc_primary_key"].split("/")[1]
+        for message in messages
+        if message["type"] == "RECORD" and message["stream"] == "campaign"
+    ]
+
+
+def test_shards_sync_disjoint_customers(mocked_responses, capsys):
+    first = set(sync_shard(0, capsys))
+    second = set(sync_shard(1, capsys))
+
+    assert first == {"2"}
+    assert second == {"1", "3"}
+    assert first | second == set(CUSTOMER_IDS)
+
+
+def test_shard_index_out_of_range():
+    config = {**SAMPLE_CONFIG, "shard_index": 2}
+    tap = tap_googleads.tap.TapGoogleAds(config=config, parse_env_config=False)
+
+    with pytest.raises(Exception, match="shard_index"):
+        tap.sync_all()
+
+
+def partition(client_id: str, **values) -> dict:
+    return {"context": {"client_id": client_id}, **values}
+
+
+def test_merge_states():
+    first = {
+        "bookmarks": {
+            "campaign_performance": {
+                "partitions": [
+                    partition("2", replication_key_value="2023-01-03"),
+                    # Of a customer shard 1 no longer syncs
+                    partition("3", replication_key_value="2023-01-02"),
+                ]
+            },
+            "geo_target_constant": {"starting_replication_value": None},
+        }
+    }
+    second = {
+        "bookmarks": {
+            "campaign_performance": {
+                "partitions": [
+                    partition("1", replication_key_value="2023-01-03"),
+                    partition("2", replication_key_value="2023-01-01"),
+                ]
+            }
+        }
+    }
+
+    merged = merge_states([first, second])
+
+    partitions = merged["bookmarks"]["campaign_performance"]["partitions"]
+    assert {
+        partition["context"]["client_id"]: partition["replication_key_value"]
+        for partition in partitions
+    } == {"1": "2023-01-03", "2": "2023-01-03", "3": "2023-01-02"}
+    assert merged["bookmarks"]["geo_target_constant"] == {
+        "starting_replication_value": None
+    }
+
+
+def test_merge_states_prefers_the_shard_syncing_the_customer():
+    # Each shard started from the merged state, so the state of shard 0 still
+    # holds what shard 1 had synced of customer 1 on the previous run
+    first = {
+        "bookmarks": {
+            "campaign": {
+                "partitions": [
+                    partition("1", fingerprint_generation="old"),
+                    partition("2", fingerprint_generation="fresh"),
+                ]
+            }
+        }
+    }
+    second = {
+        "bookmarks": {
+            "campaign": {
+                "partitions": [
+                    partition("1", fingerprint_generation="new"),
+                    partition("2", fingerprint_generation="stale"),
+                ]
+            }
+        }
+    }
+
+    merged = merge_states([first, second])
+
+    partitions = merged["bookmarks"]["campaign"]["partitions"]
+    assert {
+        partition["context"]["client_id"]: partition["fingerprint_generation"]
+        for partition in partitions
+    } == {"1": "new", "2": "fresh"}
@@ -0,0 +1,202 @@
+"""Tests sharing one GAQL query between report streams."""
+
+import json
+import re
+from typing import Optional
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+import responses
+
+import tap_googleads.tap
+from tap_googleads.client import SharedQuery
+from tap_googleads.streams import SCHEMAS_DIR, ReportsStream
+
+SAMPLE_CONFIG = {
+    "start_date": "2023-01-01T00:00:00Z",
+    "end_date": "2023-01-31T00:00:00Z",
+    "client_id": "12345",
+    "client_secret": "12345",
+    "developer_token": "12345",
+    "refresh_token": "12345",
+    "customer_id": "12345",
+    "login_customer_id": "12345",
+}
+
+
+class CampaignClicks(ReportsStream):
+    """Same rows as CampaignPerformance, fewer fields."""
+
+    def get_gaql(self, context: Optional[dict]) -> str:
+        return f"""
+            SELECT campaign.id
+                 , segments.device
+                 , segments.date
+                 , metrics.clicks
+            FROM campaign
+            WHERE segments.date {self.get_between_filter(context)}
+            """
+
+    name = "campaign_clicks"
+    primary_keys_jsonpaths = ["campaign.resourceName", "segments.date"]
+    primary_keys = ["_sdc_primary_key"]
+    replication_key = "segments_date"
+    replication_key_jsonpath = "segments.date"
+    schema_filepath = SCHEMAS_DIR / "campaign_performance.json"
+
+
+@pytest.fixture
+def mocked_responses():
+    with responses.RequestsMock(assert_all_requests_are_fired=False) as rsps:
+        rsps.add(
+            responses.POST,
+            re.compile(r"https://www.googleapis.com/oauth2/v4/token.*"),
+            json={"access_token": "access_granted", "expires_in": 3600},
+        )
+        rsps.add_callback(
+            responses.POST,
+            re.compile(r"https://googleads.googleapis.com/v14/customers/1/.*"),
+            callback=search_callback,
+            content_type="application/json",
+        )
+        yield rsps
+
+
+def search_callback(request):
+    query = parse_qs(urlparse(request.url).query)["query"][0]
+    row = {
+        "campaign": {
+            "resourceName": "customers/1/campaigns/2",
+            "id": "2",
+            "name": "Campaign",
+        },
+        "segments": {"device": "MOBILE", "date": "2023-01-02"},
+        "metrics": {"clicks": "3", "impressions": "4"},
+    }
+    if "campaign.name" not in query:
+        del row["campaign"]["name"]
+    return 200, {}, json.dumps({"results": [row]})
+
+
+def search_queries(mocked_responses):
+    return [
+        parse_qs(urlparse(call.request.url).query)["query"][0]
+        for call in mocked_responses.calls
+        if "googleAds" in call.request.url
+    ]
+
+
+def test_streams_share_one_query(mocked_responses):
+    tap = tap_googleads.tap.TapGoogleAds(config=SAMPLE_CONFIG, parse_env_config=False)
+    performance = tap.streams["campaign_performance"]
+    clicks = CampaignClicks(tap=tap)
+    shared_query = SharedQuery([performance, clicks])
+    performance.shared_query = clicks.shared_query = shared_query
+
+    clicks_records = list(clicks.get_records({"client_id": "1"}))
+    performance_records = list(performance.get_records({"client_id": "1"}))
+
+    queries = search_queries(mocked_responses)
+    assert len(queries) == 1
+    assert "campaign.name" in queries[0] and "metrics.clicks" in queries[0]
+    # campaign.id isn't a property of the schema, so it isn't requested
+    assert "campaign.id" not in queries[0]
+    assert clicks_records == [
+        {
+            "campaign": {"resourceName": "customers/1/campaigns/2"},
+            "segments": {"device": "MOBILE", "date": "2023-01-02"},
+            "metrics": {"clicks": "3"},
+            "_sdc_primary_key": "customers/1/campaigns/2:2023-01-02",
+            "segments_date": "2023-01-02",
+        }
+    ]
+    assert performance_records[0]["campaign"]["name"] == "Campaign"
+    assert performance_records[0]["metrics"] == {"clicks": "3", "impressions": "4"}
+
+
+def test_streams_with_different_bookmarks_query_alone(mocked_responses):
+    state = {
+        "bookmarks": {
+            "campaign_clicks": {
+                "partitions": [
+                    {
+                        "context": {"client_id": "1"},
+                        "replication_key": "segments_date",
+                        "replication_key_value": "2023-01-20",
+                    }
+                ]
+            }
+        }
+    }
+    tap = tap_googleads.tap.TapGoogleAds(
+        config=SAMPLE_CONFIG, state=state, parse_env_config=False
+    )
+    performance = tap.streams["campaign_performance"]
+    clicks = CampaignClicks(tap=tap)
+    shared_query = SharedQuery([performance, clicks])
+    performance.shared_query = clicks.shared_query = shared_query
+
+    list(performance.get_records({"client_id": "1"}))
+    list(clicks.get_records({"client_id": "1"}))
+
+    queries = search_queries(mocked_responses)
+    assert len(queries) == 2
+    assert "campaign.name" not in queries[1]
+    assert "BETWEEN '2023-01-06' AND '2023-01-31'" in queries[1]
+
+
+def test_streams_with_different_segments_are_not_grouped():
+    config = {**SAMPLE_CONFIG, "share_report_queries": True}
+    tap = tap_googleads.tap.TapGoogleAds(config=config, parse_env_config=False)
+    hierarchy = tap.streams["customer_hierarchy"]
+
+    hierarchy._plan_shared_queries()
+
+    assert all(stream.shared_query is None for stream in hierarchy.child_streams)
+
+
+def test_custom_query_shares_with_a_built_in_stream(mocked_responses):
+    config = {
+        **SAMPLE_CONFIG,
+        "share_report_queries": True,
+        "custom_queries": [
+            {
+                "name": "campaign_clicks",
+                "resource": "campaign",
+                "fields": ["metrics.clicks"],
+                "segments": ["segments.device", "segments.date"],
+            }
+        ],
+    }
+    tap = tap_googleads.tap.TapGoogleAds(config=config, parse_env_config=False)
+    performance = tap.streams["campaign_performance"]
+    clicks = tap.streams["campaign_clicks"]
+
+    tap.streams["customer_hierarchy"]._plan_shared_queries()
+    clicks_records = list(clicks.get_records({"client_id": "1"}))
+    performance_records = list(performance.get_records({"client_id": "1"}))
+
+    assert performance.shared_query is clicks.shared_query is not None
+    assert len(search_queries(mocked_responses)) == 1
+    assert clicks_records[0]["metrics"] == {"clicks": "3"}
+    assert performance_records[0]["campaign"]["name"] == "Campaign"
+
+
+def test_queries_are_not_shared_by_default():
+    config = {
+        **SAMPLE_CONFIG,
+        "custom_queries": [
+            {
+                "name": "campaign_clicks",
+                "resource": "campaign",
+                "fields": ["metrics.clicks"],
+                "segments": ["segments.device", "segments.date"],
+            }
+        ],
+    }
+    tap = tap_googleads.tap.TapGoogleAds(config=config, parse_env_config=False)
+    hierarchy = tap.streams["customer_hierarchy"]
+
+    hierarchy._plan_shared_queries()
+
+    assert all(stream.shared_query is None for stream in hierarchy.child_streams)
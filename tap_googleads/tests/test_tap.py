@@ -0,0 +1,68 @@
+"""Tests creating the streams of the tap."""
+
+import tap_googleads.tap
+
+SAMPLE_CONFIG = {
+    "start_date": "2023-01-01T00:00:00Z",
+    "end_date": "2023-01-31T00:00:00Z",
+    "client_id": "12345",
+    "client_secret": "12345",
+    "developer_token": "12345",
+    "refresh_token": "12345",
+    "customer_id": "12345",
+    "login_customer_id": "12345",
+    "custom_queries": [
+        {
+            "name": "labels",
+            "resource": "label",
+            "fields": ["label.id", "label.name"],
+        },
+    ],
+}
+
+
+def select(catalog: dict, stream_name: str) -> dict:
+    for entry in catalog["streams"]:
+        for metadata in entry["metadata"]:
+            if not metadata["breadcrumb"]:
+                metadata["metadata"]["selected"] = entry["tap_stream_id"] == stream_name
+    return catalog
+
+
+def test_every_stream_is_discovered():
+    tap = tap_googleads.tap.TapGoogleAds(config=SAMPLE_CONFIG, parse_env_config=False)
+
+    assert len(tap.catalog_dict["streams"]) == 13
+
+
+def test_only_streams_to_sync_are_created():
+    tap = tap_googleads.tap.TapGoogleAds(config=SAMPLE_CONFIG, parse_env_config=False)
+    catalog = select(tap.catalog_dict, "campaign_performance")
+
+    tap = tap_googleads.tap.TapGoogleAds(
+        config=SAMPLE_CONFIG, catalog=catalog, parse_env_config=False
+    )
+
+    assert sorted(tap.streams) == [
+        "accessible_customers",
+        "campaign_performance",
+        "customer_hierarchy",
+    ]
+    assert tap.streams["customer_hierarchy"].child_streams == [
+        tap.streams["campaign_performance"]
+    ]
+
+
+def test_custom_queries_to_sync_are_created():
+    tap = tap_googleads.tap.TapGoogleAds(config=SAMPLE_CONFIG, parse_env_config=False)
+    catalog = select(tap.catalog_dict, "labels")
+
+    tap = tap_googleads.tap.TapGoogleAds(
+        config=SAMPLE_CONFIG, catalog=catalog, parse_env_config=False
+    )
+
+    assert sorted(tap.streams) == [
+        "accessible_customers",
+        "customer_hierarchy",
+        "labels",
+    ]
@@ -1,4 +1,15 @@
-from tap_googleads.utils import replicate_pk_at_root
+import json
+from datetime import date
+
+import pytest
+
+from tap_googleads.utils import (
+    compile_pk_builder,
+    iter_date_windows,
+    iter_search_results,
+    parse_gaql,
+    replicate_pk_at_root,
+)
 
 
 def test_replicate_pk_at_root_composite():
@@ -30,3 +41,75 @@ def test_replicate_pk_at_root_no_jsonpath():
     res = replicate_pk_at_root(d, pk)
 
     assert res == {"bar": 15}
+
+
+def test_compile_pk_builder_composite():
+    build_pk = compile_pk_builder(["foo.id", "bar"])
+
+    assert build_pk({"foo": {"level": "1", "id": 10}, "bar": 15}) == "10:15"
+
+
+def test_compile_pk_builder_missing_field():
+    build_pk = compile_pk_builder(["foo.id", "bar"])
+
+    with pytest.raises(KeyError, match="foo.id"):
+        build_pk({"foo": None, "bar": 15})
+
+
+def test_iter_search_results_across_chunks():
+    body = json.dumps(
+        [
+            {"results": [{"id": i} for i in range(3)], "fieldMask": "id"},
+            {"results": [{"id": 1234}], "requestId": "abc"},
+        ]
+    ).encode("utf-8")
+    chunks = (body[i : i + 5] for i in range(0, len(body), 5))
+    metadata = {}
+
+    res = list(iter_search_results(chunks, metadata))
+
+    assert res == [{"id": 0}, {"id": 1}, {"id": 2}, {"id": 1234}]
+    assert metadata == {"fieldMask": "id", "requestId": "abc"}
+
+
+def test_iter_search_results_page():
+    body = json.dumps(
+        {"results": [{"id": 1}, {"id": 2}], "nextPageToken": "next", "fieldMask": "id"}
+    )
+    metadata = {}
+
+    res = list(iter_search_results([body[:7], body[7:30], body[30:]], metadata))
+
+    assert res == [{"id": 1}, {"id": 2}]
+    assert metadata == {"nextPageToken": "next", "fieldMask": "id"}
+
+
+def test_iter_date_windows_month():
+    res = list(iter_date_windows(date(2023, 1, 15), date(2023, 3, 10), "month"))
+
+    assert res == [
+        (date(2023, 1, 15), date(2023, 1, 31)),
+        (date(2023, 2, 1), date(2023, 2, 28)),
+        (date(2023, 3, 1), date(2023, 3, 10)),
+    ]
+
+
+def test_iter_date_windows_week():
+    res = list(iter_date_windows(date(2023, 3, 1), date(2023, 3, 10), "week"))
+
+    assert res == [
+        (date(2023, 3, 1), date(2023, 3, 5)),
+        (date(2023, 3, 6), date(2023, 3, 10)),
+    ]
+
+
+def test_gaql_with_condition():
+    query = parse_gaql("SELECT campaign.id FROM campaign ORDER BY campaign.id")
+
+    assert query.with_condition("campaign.id = 1").clauses == (
+        "WHERE campaign.id = 1 ORDER BY campaign.id"
+    )
+    filtered = parse_gaql("SELECT campaign.id FROM campaign WHERE campaign.id > 1")
+    assert filtered.with_condition("campaign.id < 5").clauses == (
+        "WHERE campaign.id < 5 AND campaign.id > 1"
+    )
@@ -1,6 +1,24 @@
 """Utility functions for tap functionality"""
 
-from typing import Optional
+import calendar
+import codecs
+import json
+import re
+from datetime import date, timedelta
+from typing import (
+    Any,
+    Callable,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Tuple,
+    Union,
+)
+
+_JSON_DECODER = json.JSONDecoder()
+_JSON_WHITESPACE = " \t\n\r"
 
 
 def replicate_pk_at_root(data: dict, jsonpaths: Optional[list]) -> dict:
@@ -32,3 +50,381 @@ def replicate_pk_at_root(data: dict, jsonpaths: Optional[list]) -> dict:
     new_data["_sdc_primary_key"] = pk_str
 
     return new_data
+
+
+def compile_pk_builder(
+    jsonpaths: Optional[List[str]],
+) -> Optional[Callable[[dict], str]]:
+    """Compiles primary key json paths into a function building the key value.
+
+    Values are joined with ':' into the `_sdc_primary_key` value. The paths
+    are only split once, when compiling.
+
+    Arguments:
+        jsonpaths: A list of json paths in format 'level1.level2.etc'.
+
+    Returns:
+        A function taking a record and returning its primary key, or None if
+        there are no json paths.
+    """
+    if not jsonpaths:
+        return None
+    paths = [(path, tuple(path.split("."))) for path in jsonpaths]
+
+    def build_pk(data: dict) -> str:
+        values = []
+        for path, levels in paths:
+            value: Any = data
+            try:
+                for level in levels:
+                    value = value[level]
+            except (KeyError, TypeError):
+                raise KeyError(f"Primary key field '{path}' is missing from record")
+            values.append(str(value))
+        return ":".join(values)
+
+    return build_pk
+
+
+def context_key(context: Optional[dict]) -> str:
+    """Returns a hashable key identifying a stream context.
+
+    Arguments:
+        context: Stream partition or context dictionary.
+
+    Returns:
+        The context serialized with sorted keys.
+    """
+    return json.dumps(context, sort_keys=True, default=str)
+
+
+def camel_case(name: str) -> str:
+    """Returns the camelCase JSON name of a snake_case GAQL field level."""
+    first, *rest = name.split("_")
+    return first + "".join(word.capitalize() for word in rest)
+
+
+def camel_case_field(field: str) -> str:
+    """Returns the camelCase JSON path of a GAQL field, e.g. segments.adNetworkType."""
+    return ".".join(map(camel_case, field.split(".")))
+
+
+class GAQLQuery(NamedTuple):
+    """A GAQL query split into its SELECT list, FROM resource and other clauses."""
+
+    fields: List[str]
+    resource: str
+    clauses: str
+
+    @property
+    def shape(self) -> tuple:
+        """What decides which rows the query returns, regardless of its fields.
+
+        Selecting more attributes of the resource, or of resources it is
+        attributed to, doesn't change the rows. Segments split them, and
+        selecting any metric leaves out rows without metrics.
+        """
+        segments = frozenset(f for f in self.fields if f.startswith("segments."))
+        has_metrics = any(f.startswith("metrics.") for f in self.fields)
+        return (self.resource, segments, has_metrics, self.clauses)
+
+    def to_gaql(self) -> str:
+        return f"SELECT {', '.join(self.fields)} FROM {self.resource} {self.clauses}"
+
+    def with_condition(self, condition: str) -> "GAQLQuery":
+        """Returns the query with `condition` added to its WHERE clause."""
+        if self.clauses.upper().startswith("WHERE "):
+            clauses = f"WHERE {condition} AND {self.clauses[len('WHERE '):]}"
+        else:
+            # WHERE comes before any ORDER BY, LIMIT or PARAMETERS clause
+            clauses = f"WHERE {condition} {self.clauses}".rstrip()
+        return self._replace(clauses=clauses)
+
+
+_GAQL_RE = re.compile(r"^\s*SELECT\s+(.*?)\s+FROM\s+(\w+)\s*(.*?)\s*$", re.S | re.I)
+
+
+def parse_gaql(query: str) -> GAQLQuery:
+    """Parses a GAQL query into a GAQLQuery, collapsing whitespace in its clauses.
+
+    Arguments:
+        query: A GAQL query.
+
+    Returns:
+        The parsed query.
+    """
+    match = _GAQL_RE.match(query)
+    if not match:
+        raise ValueError(f"Could not parse GAQL query: {query}")
+    fields = [field.strip() for field in match.group(1).split(",")]
+    return GAQLQuery(fields, match.group(2), " ".join(match.group(3).split()))
+
+
+def is_field_selected(field: str, schema: dict, mask: dict) -> bool:
+    """Returns whether a GAQL field ends up in the records of a stream.
+
+    A field is selected if its property is declared in the stream schema, and
+    neither it nor any of its parents is deselected in the catalog. Fields
+    below an object declared without properties are kept whole by the SDK.
+
+    Arguments:
+        field: A GAQL field, e.g. ad_group.target_cpa_micros.
+        schema: The stream schema.
+        mask: The selection mask of the stream, keyed by breadcrumb.
+
+    Returns:
+        Whether the field is selected.
+    """
+    breadcrumb: tuple = ()
+    selected = mask.get(breadcrumb, True)
+    node = schema
+    for level in field.split("."):
+        properties = node.get("properties")
+        if properties is None:
+            return selected
+        node = properties.get(camel_case(level))
+        if node is None:
+            # Dropped by the SDK, which only keeps properties of the schema
+            return False
+        breadcrumb += ("properties", camel_case(level))
+        selected = mask.get(breadcrumb, selected)
+        if not selected:
+            return False
+    return selected
+
+
+def compile_row_projector(query: GAQLQuery) -> Callable[[dict], dict]:
+    """Compiles a function keeping only the fields of `query` in a result row.
+
+    The resource names the API adds for the FROM resource and for every
+    selected resource are kept too, as they would be returned by `query`
+    on its own.
+
+    Arguments:
+        query: The query whose fields are kept.
+
+    Returns:
+        A function taking a result row and returning a new, projected row.
+    """
+    paths = [
+        [camel_case(level) for level in field.split(".")] for field in query.fields
+    ]
+    resources = [camel_case(query.resource)] + [
+        levels[0] for levels in paths if levels[0] not in ("metrics", "segments")
+    ]
+    paths += [[resource, "resourceName"] for resource in resources]
+    unique_paths = list(dict.fromkeys(tuple(levels) for levels in paths))
+
+    def project(row: dict) -> dict:
+        projected: dict = {}
+        for levels in unique_paths:
+            value: Any = row
+            for level in levels:
+                value = value.get(level) if isinstance(value, dict) else None
+                if value is None:
+                    break
+            else:
+                node = projected
+                for level in levels[:-1]:
+                    node = node.setdefault(level, {})
+                node[levels[-1]] = value
+        return projected
+
+    return project
+
+
+def iter_date_windows(
+    start: date, end: date, window_size: str
+) -> Iterator[Tuple[date, date]]:
+    """Splits a date range into consecutive calendar windows.
+
+    Arguments:
+        start: First date of the range.
+        end: Last date of the range, inclusive.
+        window_size: One of "day", "week" (Monday to Sunday) or "month".
+
+    Returns:
+        An iterator of inclusive (first, last) date pairs covering the range.
+    """
+    while start <= end:
+        if window_size == "day":
+            window_end = start
+        elif window_size == "week":
+            window_end = start + timedelta(days=6 - start.weekday())
+        elif window_size == "month":
+            last_day = calendar.monthrange(start.year, start.month)[1]
+            window_end = start.replace(day=last_day)
+        else:
+            raise ValueError(f"Unknown date window size: {window_size}")
+        window_end = min(window_end, end)
+        yield start, window_end
+        start = window_end + timedelta(days=1)
+
+
+# The segment splitting rows by each date granularity, see stream_granularity
+DATE_SEGMENTS = {
+    "day": "segments.date",
+    "week": "segments.week",
+    "month": "segments.month",
+}
+
+
+def floor_date(day: date, granularity: str) -> date:
+    """Returns the first day of the week (Monday) or month of a date.
+
+    Arguments:
+        day: A date.
+        granularity: One of "day", "week" or "month".
+
+    Returns:
+        The first date of the `granularity` period holding `day`.
+    """
+    if granularity == "week":
+        return day - timedelta(days=day.weekday())
+    if granularity == "month":
+        return day.replace(day=1)
+    return day
+
+
+class JSONStreamReader:
+    """Incrementally decodes a JSON document from an iterable of chunks.
+
+    Only the containers the caller steps into are walked piece by piece, every
+    other value is decoded whole once enough of it has been read.
+    """
+
+    def __init__(self, chunks: Iterable[Union[str, bytes]]):
+        self._chunks = iter(chunks)
+        self._decoder = codecs.getincrementaldecoder("utf-8")()
+        self._buffer = ""
+        self._pos = 0
+        self._eof = False
+
+    def _read_more(self) -> bool:
+        for chunk in self._chunks:
+            if isinstance(chunk, bytes):
+                chunk = self._decoder.decode(chunk)
+            if chunk:
+                self._buffer = self._buffer[self._pos :] + chunk
+                self._pos = 0
+                return True
+        self._eof = True
+        return False
+
+    def peek(self) -> str:
+        """Returns the next non-whitespace character, or "" at the end of input."""
+        while True:
+            while (
+                self._pos < len(self._buffer)
+                and self._buffer[self._pos] in _JSON_WHITESPACE
+            ):
+                self._pos += 1
+            if self._pos < len(self._buffer):
+                return self._buffer[self._pos]
+            if not self._read_more():
+                return ""
+
+    def expect(self, char: str) -> None:
+        """Consumes `char`, raising a ValueError if it is not the next character."""
+        found = self.peek()
+        if found != char:
+            raise ValueError(f"Expected {char!r} in JSON stream, found {found!r}")
+        self._pos += 1
+
+    def read_value(self) -> Any:
+        """Decodes and returns the whole value at the current position."""
+        self.peek()
+        while True:
+            try:
+                value, end = _JSON_DECODER.raw_decode(self._buffer, self._pos)
+            except json.JSONDecodeError:
+                if self._read_more():
+                    continue
+                raise
+            # A number at the end of the buffer may continue in the next chunk
+            if (
+                end == len(self._buffer)
+                and isinstance(value, (int, float))
+                and self._read_more()
+            ):
+                continue
+            self._pos = end
+            return value
+
+    def iter_array(self) -> Iterator[None]:
+        """Steps into the array at the current position.
+
+        Yields once per item with the reader positioned at that item, which the
+        caller must consume before asking for the next one.
+        """
+        self.expect("[")
+        if self.peek() == "]":
+            self._pos += 1
+            return
+        while True:
+            yield
+            if self._end_item("]"):
+                return
+
+    def iter_object(self) -> Iterator[str]:
+        """Steps into the object at the current position.
+
+        Yields each key with the reader positioned at its value, which the
+        caller must consume before asking for the next key.
+        """
+        self.expect("{")
+        if self.peek() == "}":
+            self._pos += 1
+            return
+        while True:
+            key = self.read_value()
+            self.expect(":")
+            yield key
+            if self._end_item("}"):
+                return
+
+    def _end_item(self, closing: str) -> bool:
+        found = self.peek()
+        if found not in (",", closing):
+            raise ValueError(
+                f"Expected ',' or {closing!r} in JSON stream, found {found!r}"
+            )
+        self._pos += 1
+        return found == closing
+
+
+def iter_search_results(
+    chunks: Iterable[Union[str, bytes]], metadata: Optional[dict] = None
+) -> Iterator[dict]:
+    """Yields the rows of a googleAds:search or searchStream response as they are read.
+
+    A search page is a single object holding `results`, a searchStream response
+    is an array of such objects (batches).
+
+    Arguments:
+        chunks: The response body, e.g. `response.iter_content(chunk_size)`.
+        metadata: Optional dict updated with the keys of each page or batch other
+            than `results`, such as `nextPageToken`, `fieldMask` or `error`.
+
+    Returns:
+        An iterator over the `results` rows, in order.
+    """
+    reader = JSONStreamReader(chunks)
+    if reader.peek() == "[":
+        for _ in reader.iter_array():
+            yield from _iter_batch_results(reader, metadata)
+    else:
+        yield from _iter_batch_results(reader, metadata)
+
+
+def _iter_batch_results(
+    reader: JSONStreamReader, metadata: Optional[dict]
+) -> Iterator[dict]:
+    for key in reader.iter_object():
+        if key == "results":
+            for _ in reader.iter_array():
+                yield reader.read_value()
+        elif metadata is not None:
+            metadata[key] = reader.read_value()
+        else:
+            reader.read_value()